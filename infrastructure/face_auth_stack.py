@@ -25,6 +25,7 @@ from aws_cdk import (
     aws_cloudfront_origins as origins,
     aws_s3_deployment as s3deploy,
     aws_wafv2 as wafv2,
+    aws_secretsmanager as secretsmanager,
     CfnOutput,
     Fn
 )
@@ -492,6 +493,21 @@ class FaceAuthStack(Stack):
             projection_type=dynamodb.ProjectionType.ALL
         )
 
+        # Sparse index over active employees: only active records carry active_index
+        # (run scripts/backfill_active_index.py once on existing tables)
+        self.employee_faces_table.add_global_secondary_index(
+            index_name="ActiveEmployeesIndex",
+            partition_key=dynamodb.Attribute(
+                name="active_index",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="employee_id",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.ALL
+        )
+
         # Authentication Sessions table for session management
         self.auth_sessions_table = dynamodb.Table(
             self, "AuthSessionsTable",
@@ -523,6 +539,20 @@ class FaceAuthStack(Stack):
             )
         )
 
+        # Rate limit counters shared by the auth handlers (shared/rate_limiter.py)
+        self.rate_limit_table = dynamodb.Table(
+            self, "RateLimitTable",
+            table_name="FaceAuth-RateLimits",
+            partition_key=dynamodb.Attribute(
+                name="identifier",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            encryption=dynamodb.TableEncryption.AWS_MANAGED,
+            removal_policy=RemovalPolicy.RETAIN,
+            time_to_live_attribute="ttl"
+        )
+
         # Global Secondary Index for employee_id queries (for audit and debugging)
         self.liveness_sessions_table.add_global_secondary_index(
             index_name="EmployeeIdIndex",
@@ -578,6 +608,19 @@ class FaceAuthStack(Stack):
             refresh_token_validity=Duration.days(30)
         )
 
+        # Secret from which Lambda derives per-employee Cognito passwords,
+        # so token issuance needs a single AdminInitiateAuth call
+        self.cognito_password_secret = secretsmanager.Secret(
+            self, "CognitoPasswordSecret",
+            secret_name="FaceAuth/CognitoPasswordSecret",
+            description="HMAC key for deriving Face-Auth Cognito user passwords",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                password_length=64,
+                exclude_punctuation=True
+            ),
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
         # Create Identity Pool for FaceLivenessDetector
         # This provides temporary AWS credentials for unauthenticated users
         # to call Rekognition Face Liveness APIs from the frontend
@@ -709,6 +752,7 @@ class FaceAuthStack(Stack):
                         self.employee_faces_table.table_arn,
                         self.auth_sessions_table.table_arn,
                         self.liveness_sessions_table.table_arn,
+                        self.rate_limit_table.table_arn,
                         f"{self.card_templates_table.table_arn}/index/*",
                         f"{self.employee_faces_table.table_arn}/index/*",
                         f"{self.liveness_sessions_table.table_arn}/index/*"
@@ -720,8 +764,14 @@ class FaceAuthStack(Stack):
                     actions=[
                         "rekognition:DetectFaces",
                         "rekognition:SearchFacesByImage",
+                        "rekognition:SearchUsersByImage",
+                        "rekognition:CompareFaces",
                         "rekognition:IndexFaces",
                         "rekognition:DeleteFaces",
+                        "rekognition:ListFaces",
+                        "rekognition:CreateUser",
+                        "rekognition:AssociateFaces",
+                        "rekognition:DisassociateFaces",
                         "rekognition:CreateCollection",
                         "rekognition:DeleteCollection",
                         "rekognition:ListCollections",
@@ -755,6 +805,14 @@ class FaceAuthStack(Stack):
                     ],
                     resources=[self.user_pool.user_pool_arn]
                 ),
+                # Secrets Manager permissions (Cognito password derivation key)
+                iam.PolicyStatement(
+                    effect=iam.Effect.ALLOW,
+                    actions=[
+                        "secretsmanager:GetSecretValue"
+                    ],
+                    resources=[self.cognito_password_secret.secret_arn]
+                ),
                 # CloudWatch Logs permissions
                 iam.PolicyStatement(
                     effect=iam.Effect.ALLOW,
@@ -803,13 +861,22 @@ class FaceAuthStack(Stack):
                 "EMPLOYEE_FACES_TABLE": self.employee_faces_table.table_name,
                 "AUTH_SESSIONS_TABLE": self.auth_sessions_table.table_name,
                 "LIVENESS_SESSIONS_TABLE": self.liveness_sessions_table.table_name,
+                "RATE_LIMIT_TABLE": self.rate_limit_table.table_name,
+                "FACE_LOGIN_MAX_ATTEMPTS": "60",  # Face login attempts per kiosk (per source IP without kiosk_id) per minute
                 "COGNITO_USER_POOL_ID": self.user_pool.user_pool_id,
                 "COGNITO_CLIENT_ID": self.user_pool_client.user_pool_client_id,
+                "COGNITO_PASSWORD_SECRET_ARN": self.cognito_password_secret.secret_arn,
                 "REKOGNITION_COLLECTION_ID": "face-auth-employees",
+                # 'faces' until every employee has a Rekognition user: opt in with FACE_SEARCH_MODE=users
+                # only after scripts/backfill_rekognition_users.py has run on existing collections
+                "FACE_SEARCH_MODE": os.getenv("FACE_SEARCH_MODE", "faces"),
+                # Kiosk ID -> collection shards as JSON (empty: every kiosk uses REKOGNITION_COLLECTION_ID)
+                "COLLECTION_ROUTING": os.getenv("COLLECTION_ROUTING", ""),
                 "LIVENESS_CONFIDENCE_THRESHOLD": "90.0",  # 90% confidence threshold for liveness
                 "AD_TIMEOUT": "10",  # 10-second AD timeout
                 "LAMBDA_TIMEOUT": "15",  # 15-second Lambda timeout
                 "SESSION_TIMEOUT_HOURS": "8",  # 8-hour session timeout
+                "LAST_LOGIN_GRANULARITY_SECONDS": "300",  # At most one last_login write per employee per 5 minutes
                 # AD Configuration (Mock mode by default)
                 "USE_MOCK_AD": os.getenv("USE_MOCK_AD", "true"),  # Use mock AD by default
                 "AD_SERVER_URL": os.getenv("AD_SERVER_URL", "ldaps://ad.company.com:636"),
@@ -17,17 +17,18 @@ import sys
 import base64
 import logging
 from typing import Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Import from shared modules (bundled with function)
 from shared.ocr_service import OCRService
 from shared.ad_connector_mock import create_ad_connector
 from shared.cognito_service import CognitoService
 from shared.error_handler import ErrorHandler
-from shared.timeout_manager import TimeoutManager
+from shared.timeout_manager import TimeoutManager, is_timeout_error
 from shared.dynamodb_service import DynamoDBService
 from shared.liveness_service import LivenessService, SessionNotFoundError, SessionExpiredError
 from shared.models import ErrorCodes
+from shared.service_registry import get_registry
 
 # Configure logging
 logger = logging.getLogger()
@@ -43,11 +44,11 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
     Handle emergency authentication request
     
     Flow:
-    1. Check rate limiting (max 5 attempts per 15 minutes)
+    1. Check rate limiting (max 5 attempts per sliding 15 minutes)
     2. Process ID card with OCR (Textract)
     3. Verify AD password (with 10-second timeout)
     4. Create Cognito authentication session
-    5. Update rate limiting counter
+    5. Reset rate limiting counter on success
     
     Args:
         event: API Gateway event containing emergency auth request
@@ -57,7 +58,7 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         API Gateway response with authentication result
     """
     # Initialize timeout manager
-    timeout_manager = TimeoutManager()
+    timeout_manager = TimeoutManager.from_lambda_context(context)
     request_id = context.aws_request_id
     
     try:
@@ -110,57 +111,37 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         
         # Initialize services
         logger.info("Initializing services for emergency authentication")
-        ocr_service = OCRService(region_name=region)
-        ad_connector = ADConnector()
-        cognito_service = CognitoService(user_pool_id, client_id, region)
-        error_handler = ErrorHandler()
-        db_service = DynamoDBService(region_name=region)
-        db_service.initialize_tables(card_templates_table, employee_faces_table, auth_sessions_table)
+        registry = get_registry()
+        ocr_service = registry.ocr_service(card_templates_table, employee_faces_table,
+                                           auth_sessions_table, region, timeout_manager.require_budget('ocr'))        
+        # Initialize AD Connector (Mock or Real based on environment)
+        ad_connector = create_ad_connector(
+            use_mock=os.environ.get('USE_MOCK_AD', 'true').lower() == 'true',
+            server_url=os.environ.get('AD_SERVER_URL', 'ldaps://ad.company.com'),
+            base_dn=os.environ.get('AD_BASE_DN', 'DC=company,DC=com'),
+            timeout=min(int(os.environ.get('AD_TIMEOUT', '10')), timeout_manager.budget('ad'))
+        )
         
-        # Initialize OCR service with DynamoDB tables
-        ocr_service.initialize_db_service(card_templates_table, employee_faces_table, auth_sessions_table)
+        cognito_service = registry.cognito_service(user_pool_id, client_id, region,
+                                                   timeout_manager.require_budget('session'))
+        error_handler = registry.error_handler()
+        db_service = registry.dynamodb_service(card_templates_table, employee_faces_table,
+                                               auth_sessions_table, region)
         
-        # Step 1: Check rate limiting
+        # Step 1: Check rate limiting (counts this attempt atomically)
         logger.info(f"Step 1: Checking rate limiting for IP {ip_address}")
-        rate_limit_key = f"rate_limit_{ip_address}" if ip_address else f"rate_limit_{request_id}"
-        
-        # Use DynamoDB to track rate limiting
-        dynamodb = boto3.resource('dynamodb', region_name=region)
-        rate_limit_table_name = os.environ.get('RATE_LIMIT_TABLE', 'EmergencyAuthRateLimit')
+        rate_limit_key = f"emergency#{ip_address or request_id}"
+        rate_limiter = registry.rate_limiter(
+            os.environ.get('RATE_LIMIT_TABLE', 'EmergencyAuthRateLimit'),
+            MAX_ATTEMPTS, RATE_LIMIT_WINDOW_MINUTES * 60, region
+        )
         
-        try:
-            rate_limit_table = dynamodb.Table(rate_limit_table_name)
-            
-            # Get current attempt count
-            response = rate_limit_table.get_item(Key={'identifier': rate_limit_key})
-            
-            if 'Item' in response:
-                item = response['Item']
-                attempt_count = item.get('attempt_count', 0)
-                window_start = datetime.fromisoformat(item.get('window_start'))
-                
-                # Check if we're still in the same window
-                now = datetime.now()
-                if now - window_start < timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES):
-                    if attempt_count >= MAX_ATTEMPTS:
-                        logger.warning(f"Rate limit exceeded for {rate_limit_key}")
-                        return _error_response(429, ErrorCodes.GENERIC_ERROR,
-                                             "너무 많은 시도가 있었습니다. 잠시 후 다시 시도해주세요",
-                                             f"Rate limit exceeded: {attempt_count} attempts", request_id)
-                else:
-                    # Window expired, reset counter
-                    attempt_count = 0
-                    window_start = now
-            else:
-                # First attempt
-                attempt_count = 0
-                window_start = datetime.now()
-                
-        except Exception as e:
-            # If rate limit table doesn't exist or error, log and continue
-            logger.warning(f"Rate limiting check failed: {str(e)}, continuing without rate limit")
-            attempt_count = 0
-            window_start = datetime.now()
+        rate_limit = rate_limiter.check(rate_limit_key)
+        if not rate_limit.allowed:
+            return _error_response(429, ErrorCodes.GENERIC_ERROR,
+                                 "너무 많은 시도가 있었습니다. 잠시 후 다시 시도해주세요",
+                                 f"Rate limit exceeded: {rate_limit.attempts:.1f} attempts, "
+                                 f"retry after {rate_limit.retry_after}s", request_id)
         
         # Step 2: Process ID card with OCR
         logger.info("Step 2: Processing ID card with OCR")
@@ -170,10 +151,12 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
                                  "Timeout before OCR processing", request_id)
         
         employee_info, ocr_error = ocr_service.extract_id_card_info(id_card_image, request_id)
+        if getattr(ocr_error, 'error_code', None) == ErrorCodes.TIMEOUT_ERROR:
+            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                 "処理時間が超過しました",
+                                 ocr_error.system_reason, request_id)
         if ocr_error or not employee_info:
             logger.warning(f"OCR processing failed: {ocr_error}")
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
-            
             error_response = error_handler.handle_error(
                 ErrorCodes.ID_CARD_FORMAT_MISMATCH,
                 {'request_id': request_id, 'detail': ocr_error}
@@ -187,8 +170,6 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         # Validate extracted employee info
         if not employee_info.validate():
             logger.warning(f"Employee info validation failed for {employee_info.employee_id}")
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
-            
             error_response = error_handler.handle_error(
                 ErrorCodes.ID_CARD_FORMAT_MISMATCH,
                 {'request_id': request_id, 'employee_id': employee_info.employee_id}
@@ -201,7 +182,6 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         logger.info(f"Step 3: Verifying AD password for {employee_info.employee_id}")
         if not timeout_manager.check_ad_timeout():
             logger.warning("AD timeout limit reached before authentication")
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
             return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
                                  "認証サーバー接続タイムアウト",
                                  "AD timeout before authentication", request_id)
@@ -212,8 +192,6 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
             
             if not auth_success:
                 logger.warning(f"AD password authentication failed for {employee_info.employee_id}")
-                _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
-                
                 error_response = error_handler.handle_error(
                     ErrorCodes.REGISTRATION_INFO_MISMATCH,
                     {'request_id': request_id, 'employee_id': employee_info.employee_id}
@@ -239,7 +217,7 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
                                  "Timeout before liveness verification", request_id)
         
         try:
-            liveness_service = LivenessService()
+            liveness_service = registry.liveness_service(region, timeout_manager.require_budget('liveness'))
             liveness_result = liveness_service.get_session_result(liveness_session_id)
             
             if not liveness_result.is_live:
@@ -247,8 +225,6 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
                     f"Liveness verification failed: confidence {liveness_result.confidence}, "
                     f"threshold {liveness_service.confidence_threshold}"
                 )
-                _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
-                
                 error_response = error_handler.handle_error(
                     ErrorCodes.LIVENESS_FAILED,
                     {
@@ -268,21 +244,22 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
             
         except SessionNotFoundError as e:
             logger.warning(f"Liveness session not found: {liveness_session_id}")
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
             return _error_response(404, ErrorCodes.INVALID_REQUEST,
                                  "Liveness検証セッションが見つかりません",
                                  f"Session not found: {str(e)}", request_id)
         
         except SessionExpiredError as e:
             logger.warning(f"Liveness session expired: {liveness_session_id}")
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
             return _error_response(410, ErrorCodes.TIMEOUT_ERROR,
                                  "Liveness検証セッションが期限切れです",
                                  f"Session expired: {str(e)}", request_id)
         
         except Exception as e:
+            if is_timeout_error(e):
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     f"Deadline exceeded: {str(e)}", request_id)
             logger.error(f"Liveness verification error: {str(e)}", exc_info=True)
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
             return _error_response(500, ErrorCodes.GENERIC_ERROR,
                                  "Liveness検証に失敗しました",
                                  f"Liveness verification error: {str(e)}", request_id)
@@ -303,7 +280,6 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         
         if error or not session:
             logger.error(f"Failed to create authentication session: {error}")
-            _increment_rate_limit(rate_limit_table, rate_limit_key, attempt_count + 1, window_start)
             return _error_response(500, ErrorCodes.GENERIC_ERROR,
                                  "인증 세션 생성에 실패했습니다",
                                  f"Session creation error: {error}", request_id)
@@ -313,10 +289,7 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         
         # Step 6: Reset rate limiting on successful authentication
         logger.info("Step 6: Resetting rate limit counter after successful authentication")
-        try:
-            rate_limit_table.delete_item(Key={'identifier': rate_limit_key})
-        except Exception as e:
-            logger.warning(f"Failed to reset rate limit: {str(e)}")
+        rate_limiter.reset(rate_limit_key)
         
         logger.info(f"Emergency authentication completed successfully for employee {employee_info.employee_id}")
         
@@ -343,44 +316,16 @@ def handle_emergency_auth(event: Dict[str, Any], context: Any) -> Dict[str, Any]
         }
         
     except Exception as e:
+        if is_timeout_error(e):
+            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                 "処理時間が超過しました",
+                                 f"Deadline exceeded: {str(e)}", request_id)
         logger.error(f"Unexpected error in emergency auth handler: {str(e)}", exc_info=True)
         return _error_response(500, ErrorCodes.GENERIC_ERROR,
                              "시스템 오류가 발생했습니다",
                              f"Unexpected error: {str(e)}", request_id)
 
 
-def _increment_rate_limit(
-    rate_limit_table: Any, 
-    identifier: str, 
-    attempt_count: int, 
-    window_start: datetime
-) -> None:
-    """
-    Increment rate limit counter in DynamoDB
-    
-    Args:
-        rate_limit_table: DynamoDB table resource
-        identifier: Rate limit identifier (IP or request ID)
-        attempt_count: Current attempt count
-        window_start: Start of rate limit window
-    """
-    try:
-        # Calculate TTL (window start + 15 minutes + 1 hour buffer)
-        ttl = int((window_start + timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES + 60)).timestamp())
-        
-        rate_limit_table.put_item(
-            Item={
-                'identifier': identifier,
-                'attempt_count': attempt_count,
-                'window_start': window_start.isoformat(),
-                'ttl': ttl
-            }
-        )
-        logger.info(f"Rate limit updated: {identifier} - {attempt_count} attempts")
-    except Exception as e:
-        logger.warning(f"Failed to update rate limit: {str(e)}")
-
-
 def _error_response(status_code: int, error_code: str, user_message: str,
                    system_reason: str, request_id: str) -> Dict[str, Any]:
     """
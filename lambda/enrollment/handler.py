@@ -25,10 +25,14 @@ from shared.ad_connector_mock import create_ad_connector
 from shared.face_recognition_service import FaceRecognitionService
 from shared.thumbnail_processor import ThumbnailProcessor
 from shared.error_handler import ErrorHandler
-from shared.timeout_manager import TimeoutManager
+from shared.timeout_manager import TimeoutManager, is_timeout_error
 from shared.dynamodb_service import DynamoDBService
 from shared.liveness_service import LivenessService, SessionNotFoundError, SessionExpiredError
 from shared.models import EmployeeFaceRecord, FaceData, EmployeeInfo, ErrorCodes
+from shared.image_quality import evaluate_image_quality
+from shared.image_pipeline import process_face_image
+from shared.service_registry import get_registry
+from shared.step_executor import StepGraph
 
 # Configure logging
 logger = logging.getLogger()
@@ -42,10 +46,11 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Flow:
     1. Process ID card with OCR (Textract)
     2. Verify employee info with Active Directory
-    3. Capture face image and perform liveness detection
-    4. Generate 200x200 thumbnail
-    5. Store thumbnail in S3 enroll/ folder
-    6. Index face in Rekognition collection
+    3. Capture face image and perform liveness detection (face_image is optional;
+       the Liveness reference image in S3 is used when it is omitted)
+    4. Validate and index face in Rekognition collection (single IndexFaces call)
+    5. Generate 200x200 thumbnail
+    6. Store thumbnail in S3 enroll/ folder
     7. Create EmployeeFaceRecord in DynamoDB
     
     Args:
@@ -56,7 +61,7 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         API Gateway response with enrollment result
     """
     # Initialize timeout manager
-    timeout_manager = TimeoutManager()
+    timeout_manager = TimeoutManager.from_lambda_context(context)
     request_id = context.aws_request_id
     
     try:
@@ -81,12 +86,13 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         id_card_image_b64 = body.get('id_card_image')
         face_image_b64 = body.get('face_image')
         liveness_session_id = body.get('liveness_session_id')  # New: Liveness session ID
+        kiosk_id = body.get('kiosk_id')  # Selects the home collection (COLLECTION_ROUTING)
         
-        if not id_card_image_b64 or not face_image_b64:
+        if not id_card_image_b64:
             logger.warning("Missing required images in request")
             return _error_response(400, ErrorCodes.INVALID_REQUEST,
                                  "社員証と顔画像が必要です", 
-                                 "Missing id_card_image or face_image", request_id)
+                                 "Missing id_card_image", request_id)
         
         if not liveness_session_id:
             logger.warning("Missing liveness_session_id in request")
@@ -97,7 +103,8 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Decode base64 images
         try:
             id_card_image = base64.b64decode(id_card_image_b64)
-            face_image = base64.b64decode(face_image_b64)
+            # face_image is optional: the Liveness reference image is used otherwise
+            face_image = base64.b64decode(face_image_b64) if face_image_b64 else None
         except Exception as e:
             logger.error(f"Failed to decode base64 images: {str(e)}")
             return _error_response(400, ErrorCodes.INVALID_REQUEST,
@@ -106,7 +113,9 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Initialize services
         logger.info("Initializing services for enrollment")
-        ocr_service = OCRService(region_name=region)
+        registry = get_registry()
+        ocr_service = registry.ocr_service(card_templates_table, employee_faces_table,
+                                           auth_sessions_table, region, timeout_manager.require_budget('ocr'))
         
         # Initialize AD Connector (Mock or Real based on environment)
         ad_server_url = os.environ.get('AD_SERVER_URL', 'ldaps://ad.company.com')
@@ -118,17 +127,33 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             use_mock=use_mock_ad,
             server_url=ad_server_url,
             base_dn=ad_base_dn,
-            timeout=ad_timeout
+            timeout=min(ad_timeout, timeout_manager.budget('ad'))
         )
         
-        face_service = FaceRecognitionService(collection_id=collection_id, region_name=region)
-        thumbnail_processor = ThumbnailProcessor(bucket_name=bucket_name, region_name=region)
-        error_handler = ErrorHandler()
-        db_service = DynamoDBService(region_name=region)
-        db_service.initialize_tables(card_templates_table, employee_faces_table, auth_sessions_table)
-        
-        # Initialize OCR service with DynamoDB tables
-        ocr_service.initialize_db_service(card_templates_table, employee_faces_table, auth_sessions_table)
+        enrollment_collection = registry.collection_router(collection_id).enrollment_collection(kiosk_id)
+        face_service = registry.face_recognition_service(enrollment_collection, region,
+                                                         timeout_manager.require_budget('search'))
+        thumbnail_processor = registry.thumbnail_processor(bucket_name, region)
+        error_handler = registry.error_handler()
+        db_service = registry.dynamodb_service(card_templates_table, employee_faces_table,
+                                               auth_sessions_table, region)
+        
+        # Decode the uploaded frame once: search image, thumbnail and quality metrics
+        processed_image = None
+        if face_image is not None:
+            try:
+                processed_image = process_face_image(face_image)
+            except ValueError as e:
+                return _error_response(400, ErrorCodes.INVALID_REQUEST,
+                                     "画像形式が正しくありません",
+                                     str(e), request_id)
+            
+            # Reject hopeless frames locally before paying for any Rekognition call
+            quality_issue = evaluate_image_quality(processed_image.quality)
+            if quality_issue:
+                return _error_response(400, ErrorCodes.LIVENESS_FAILED,
+                                     error_handler.error_mappings[ErrorCodes.LIVENESS_FAILED]['user_message'],
+                                     quality_issue, request_id)
         
         # Step 1: Process ID card with OCR
         logger.info("Step 1: Processing ID card with OCR")
@@ -137,148 +162,202 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                                  "処理時間が超過しました",
                                  "Timeout before OCR processing", request_id)
         
-        employee_info, ocr_error = ocr_service.extract_id_card_info(id_card_image, request_id)
-        if ocr_error or not employee_info:
-            logger.warning(f"OCR processing failed: {ocr_error}")
-            error_response = error_handler.handle_error(
-                ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                {'request_id': request_id, 'detail': str(ocr_error)}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        logger.info(f"OCR extracted employee_id: {employee_info.employee_id}, name: {employee_info.name}")
-        
-        # Validate extracted employee info
-        if not employee_info.validate():
-            logger.warning(f"Employee info validation failed for {employee_info.employee_id}")
-            error_response = error_handler.handle_error(
-                ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                {'request_id': request_id, 'employee_id': employee_info.employee_id}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        # Step 2: Verify with Active Directory (or Mock)
-        logger.info(f"Step 2: Verifying employee {employee_info.employee_id} with AD")
-        if not timeout_manager.check_ad_timeout():
-            logger.warning("AD timeout limit reached before verification")
-            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
-                                 "認証サーバー接続タイムアウト",
-                                 "AD timeout before verification", request_id)
-        
-        ad_result = ad_connector.verify_employee(employee_info.employee_id, employee_info)
+        # OCR and the Liveness session result are independent: fetch the session
+        # while OCR and AD run, and collect it at Step 3
+        liveness_service = registry.liveness_service(region, timeout_manager.require_budget('liveness'))
+        steps = StepGraph()
+        steps.add('ocr', lambda: ocr_service.extract_id_card_info(id_card_image, request_id))
+        steps.add('liveness', lambda: liveness_service.get_session_result(liveness_session_id))
+        steps.start()
         
-        if not ad_result.success:
-            logger.warning(f"AD verification failed: {ad_result.reason}")
-            
-            # Map AD errors to appropriate error codes
-            if ad_result.reason == ErrorCodes.ACCOUNT_DISABLED:
+        try:
+            employee_info, ocr_error = steps.result('ocr', timeout_manager.budget('ocr'))
+            if getattr(ocr_error, 'error_code', None) == ErrorCodes.TIMEOUT_ERROR:
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     ocr_error.system_reason, request_id)
+            if ocr_error or not employee_info:
+                logger.warning(f"OCR processing failed: {ocr_error}")
                 error_response = error_handler.handle_error(
-                    ErrorCodes.ACCOUNT_DISABLED,
-                    {'request_id': request_id, 'employee_id': employee_info.employee_id}
+                    ErrorCodes.ID_CARD_FORMAT_MISMATCH,
+                    {'request_id': request_id, 'detail': str(ocr_error)}
                 )
-            elif ad_result.reason == ErrorCodes.REGISTRATION_INFO_MISMATCH:
+                return _error_response(400, error_response.error_code,
+                                     error_response.user_message,
+                                     error_response.system_reason, request_id)
+            
+            logger.info(f"OCR extracted employee_id: {employee_info.employee_id}, name: {employee_info.name}")
+            
+            # Validate extracted employee info
+            if not employee_info.validate():
+                logger.warning(f"Employee info validation failed for {employee_info.employee_id}")
                 error_response = error_handler.handle_error(
-                    ErrorCodes.REGISTRATION_INFO_MISMATCH,
+                    ErrorCodes.ID_CARD_FORMAT_MISMATCH,
                     {'request_id': request_id, 'employee_id': employee_info.employee_id}
                 )
-            else:
-                error_response = error_handler.handle_error(
-                    ErrorCodes.AD_CONNECTION_ERROR,
-                    {'request_id': request_id, 'detail': ad_result.error}
-                )
+                return _error_response(400, error_response.error_code,
+                                     error_response.user_message,
+                                     error_response.system_reason, request_id)
             
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        logger.info(f"AD verification successful for {employee_info.employee_id}")
-        
-        # Step 3: Verify Liveness session (NEW - First step before face processing)
-        logger.info(f"Step 3: Verifying Liveness session {liveness_session_id}")
-        if not timeout_manager.should_continue(buffer_seconds=3.0):
-            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
-                                 "処理時間が超過しました",
-                                 "Timeout before liveness verification", request_id)
-        
-        try:
-            liveness_service = LivenessService()
-            liveness_result = liveness_service.get_session_result(liveness_session_id)
+            # Step 2: Verify with Active Directory (or Mock)
+            logger.info(f"Step 2: Verifying employee {employee_info.employee_id} with AD")
+            if not timeout_manager.check_ad_timeout():
+                logger.warning("AD timeout limit reached before verification")
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "認証サーバー接続タイムアウト",
+                                     "AD timeout before verification", request_id)
             
-            if not liveness_result.is_live:
-                logger.warning(
-                    f"Liveness verification failed: confidence {liveness_result.confidence}, "
-                    f"threshold {liveness_service.confidence_threshold}"
-                )
-                error_response = error_handler.handle_error(
-                    ErrorCodes.LIVENESS_FAILED,
-                    {
-                        'request_id': request_id,
-                        'confidence': liveness_result.confidence,
-                        'threshold': liveness_service.confidence_threshold
-                    }
-                )
-                return _error_response(401, error_response.error_code,
+            ad_result = ad_connector.verify_employee(employee_info.employee_id, employee_info)
+            
+            if not ad_result.success:
+                logger.warning(f"AD verification failed: {ad_result.reason}")
+                
+                # Map AD errors to appropriate error codes
+                if ad_result.reason == ErrorCodes.ACCOUNT_DISABLED:
+                    error_response = error_handler.handle_error(
+                        ErrorCodes.ACCOUNT_DISABLED,
+                        {'request_id': request_id, 'employee_id': employee_info.employee_id}
+                    )
+                elif ad_result.reason == ErrorCodes.REGISTRATION_INFO_MISMATCH:
+                    error_response = error_handler.handle_error(
+                        ErrorCodes.REGISTRATION_INFO_MISMATCH,
+                        {'request_id': request_id, 'employee_id': employee_info.employee_id}
+                    )
+                else:
+                    error_response = error_handler.handle_error(
+                        ErrorCodes.AD_CONNECTION_ERROR,
+                        {'request_id': request_id, 'detail': ad_result.error}
+                    )
+                
+                return _error_response(400, error_response.error_code,
                                      error_response.user_message,
                                      error_response.system_reason, request_id)
             
-            logger.info(
-                f"Liveness verification passed: confidence {liveness_result.confidence}, "
-                f"session_id {liveness_session_id}"
-            )
+            logger.info(f"AD verification successful for {employee_info.employee_id}")
             
-        except SessionNotFoundError as e:
-            logger.warning(f"Liveness session not found: {liveness_session_id}")
-            return _error_response(404, ErrorCodes.INVALID_REQUEST,
-                                 "Liveness検証セッションが見つかりません",
-                                 f"Session not found: {str(e)}", request_id)
-        
-        except SessionExpiredError as e:
-            logger.warning(f"Liveness session expired: {liveness_session_id}")
-            return _error_response(410, ErrorCodes.TIMEOUT_ERROR,
-                                 "Liveness検証セッションが期限切れです",
-                                 f"Session expired: {str(e)}", request_id)
-        
-        except Exception as e:
-            logger.error(f"Liveness verification error: {str(e)}", exc_info=True)
-            return _error_response(500, ErrorCodes.GENERIC_ERROR,
-                                 "Liveness検証に失敗しました",
-                                 f"Liveness verification error: {str(e)}", request_id)
-        
-        # Step 4: Process face image (removed old liveness detection)
-        logger.info("Step 4: Processing face image")
+            # Step 3: Verify Liveness session (NEW - First step before face processing)
+            logger.info(f"Step 3: Verifying Liveness session {liveness_session_id}")
+            if not timeout_manager.should_continue(buffer_seconds=3.0):
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     "Timeout before liveness verification", request_id)
+            
+            try:
+                liveness_result = steps.result('liveness', timeout_manager.budget('liveness'))
+                
+                if not liveness_result.is_live:
+                    logger.warning(
+                        f"Liveness verification failed: confidence {liveness_result.confidence}, "
+                        f"threshold {liveness_service.confidence_threshold}"
+                    )
+                    error_response = error_handler.handle_error(
+                        ErrorCodes.LIVENESS_FAILED,
+                        {
+                            'request_id': request_id,
+                            'confidence': liveness_result.confidence,
+                            'threshold': liveness_service.confidence_threshold
+                        }
+                    )
+                    return _error_response(401, error_response.error_code,
+                                         error_response.user_message,
+                                         error_response.system_reason, request_id)
+                
+                logger.info(
+                    f"Liveness verification passed: confidence {liveness_result.confidence}, "
+                    f"session_id {liveness_session_id}"
+                )
+                
+            except SessionNotFoundError as e:
+                logger.warning(f"Liveness session not found: {liveness_session_id}")
+                return _error_response(404, ErrorCodes.INVALID_REQUEST,
+                                     "Liveness検証セッションが見つかりません",
+                                     f"Session not found: {str(e)}", request_id)
+            
+            except SessionExpiredError as e:
+                logger.warning(f"Liveness session expired: {liveness_session_id}")
+                return _error_response(410, ErrorCodes.TIMEOUT_ERROR,
+                                     "Liveness検証セッションが期限切れです",
+                                     f"Session expired: {str(e)}", request_id)
+            
+            except Exception as e:
+                if is_timeout_error(e):
+                    return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                         "処理時間が超過しました",
+                                         f"Deadline exceeded: {str(e)}", request_id)
+                logger.error(f"Liveness verification error: {str(e)}", exc_info=True)
+                return _error_response(500, ErrorCodes.GENERIC_ERROR,
+                                     "Liveness検証に失敗しました",
+                                     f"Liveness verification error: {str(e)}", request_id)
+        finally:
+            # If OCR or AD rejected the request, liveness may still be queued on the shared pool
+            steps.cancel()
+        
+        # Step 4: Validate and index face image (removed old liveness detection)
+        logger.info("Step 4: Validating and indexing face image")
         if not timeout_manager.should_continue(buffer_seconds=3.0):
             return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
                                  "処理時間が超過しました",
                                  "Timeout before face processing", request_id)
         
-        # Detect face for bounding box and landmarks (no liveness check)
-        face_details = face_service.detect_faces(face_image)
-        if not face_details:
-            logger.warning("No face detected in image")
-            error_response = error_handler.handle_error(
-                ErrorCodes.FACE_NOT_DETECTED,
-                {'request_id': request_id}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
+        reference_image = None
+        if face_image is None:
+            if not liveness_result.reference_image_s3_key:
+                logger.warning(f"No face_image and no reference image for session {liveness_session_id}")
+                return _error_response(400, ErrorCodes.INVALID_REQUEST,
+                                     "社員証と顔画像が必要です",
+                                     "Missing face_image and liveness reference image", request_id)
+            reference_image = {'Bucket': bucket_name, 'Name': liveness_result.reference_image_s3_key}
+        
+        # Validate and index the face in one IndexFaces call (no separate DetectFaces)
+        search_image = processed_image.search_image if processed_image is not None else None
+        indexed_face, rejection = face_service.enroll_face(
+            search_image, employee_info.employee_id, request_id, s3_object=reference_image,
+            attribute_profile='presence-only'
+        )
+        if rejection:
+            return _error_response(400, ErrorCodes.LIVENESS_FAILED,
+                                 error_handler.error_mappings[ErrorCodes.LIVENESS_FAILED]['user_message'],
+                                 rejection, request_id)
+        
+        face_id = indexed_face.face_id
+        logger.info(f"Face indexed with face_id: {face_id}")
         
-        face_detail = face_details[0]
-        logger.info(f"Face detected with confidence {face_detail.get('Confidence', 0)}")
+        face_ids = [face_id]
+        if face_service.search_mode == 'users':
+            # Index the other Liveness frames too and aggregate every vector under the employee's user
+            # ('faces' mode searches single vectors, so the extra Rekognition calls would be wasted)
+            if timeout_manager.should_continue(buffer_seconds=5.0):
+                extra_images = [
+                    {'Bucket': bucket_name, 'Name': key}
+                    for key in (liveness_result.reference_image_s3_key, liveness_result.audit_image_s3_key)
+                    if key and (reference_image is None or key != reference_image['Name'])
+                ]
+                face_ids += face_service.enroll_additional_faces(employee_info.employee_id, extra_images,
+                                                                 request_id)
+            
+            if face_id not in face_service.enroll_user(employee_info.employee_id, face_ids):
+                face_service.delete_faces_by_employee_id(employee_info.employee_id, request_id, face_ids=face_ids)
+                return _error_response(500, ErrorCodes.GENERIC_ERROR,
+                                     "登録処理に失敗しました",
+                                     "Failed to associate faces with Rekognition user", request_id)
+        logger.info(f"Enrolled {len(face_ids)} face vector(s) for employee {employee_info.employee_id}")
         
         # Step 5: Generate 200x200 thumbnail
         logger.info("Step 5: Generating thumbnail")
-        thumbnail_bytes = thumbnail_processor.create_thumbnail(face_image)
+        s3_client = registry.client('s3', region)
+        if reference_image is not None:
+            # The stored enrollment thumbnail still comes from the reference image
+            reference_bytes = s3_client.get_object(
+                Bucket=reference_image['Bucket'], Key=reference_image['Name']
+            )['Body'].read()
+            thumbnail_bytes = thumbnail_processor.create_thumbnail(reference_bytes)
+        else:
+            thumbnail_bytes = processed_image.thumbnail
         
         # Step 6: Store thumbnail in S3 enroll/ folder
         logger.info(f"Step 6: Storing thumbnail in S3 for employee {employee_info.employee_id}")
         s3_key = f"enroll/{employee_info.employee_id}/face_thumbnail.jpg"
         
-        s3_client = boto3.client('s3', region_name=region)
         s3_client.put_object(
             Bucket=bucket_name,
             Key=s3_key,
@@ -289,32 +368,38 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         logger.info(f"Thumbnail stored at s3://{bucket_name}/{s3_key}")
         
-        # Step 7: Index face in Rekognition collection
-        logger.info("Step 7: Indexing face in Rekognition collection")
-        if not timeout_manager.should_continue(buffer_seconds=2.0):
-            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
-                                 "処理時間が超過しました",
-                                 "Timeout before face indexing", request_id)
-        
-        face_id = face_service.index_face(thumbnail_bytes, employee_info.employee_id)
-        if not face_id:
-            logger.error("Failed to index face in Rekognition")
-            return _error_response(500, ErrorCodes.GENERIC_ERROR,
-                                 "얼굴 등록에 실패했습니다",
-                                 "Rekognition face indexing failed", request_id)
-        
-        logger.info(f"Face indexed with face_id: {face_id}")
+        # Keep the full-resolution face as the 1:1 verification target for badge-tap kiosks
+        # (the 200x200 thumbnail is too small for CompareFaces at the verification threshold)
+        face_image_s3_key = f"enroll/{employee_info.employee_id}/face.jpg"
+        if reference_image is not None:
+            # Server-side copy: Liveness reference images expire with liveness-audit/
+            s3_client.copy_object(
+                Bucket=bucket_name,
+                Key=face_image_s3_key,
+                CopySource={'Bucket': reference_image['Bucket'], 'Key': reference_image['Name']},
+                ContentType='image/jpeg',
+                MetadataDirective='REPLACE',
+                ServerSideEncryption='AES256'
+            )
+        else:
+            s3_client.put_object(
+                Bucket=bucket_name,
+                Key=face_image_s3_key,
+                Body=processed_image.search_image,
+                ContentType='image/jpeg',
+                ServerSideEncryption='AES256'
+            )
         
-        # Step 8: Create EmployeeFaceRecord in DynamoDB
-        logger.info("Step 8: Creating EmployeeFaceRecord in DynamoDB")
+        # Step 7: Create EmployeeFaceRecord in DynamoDB
+        logger.info("Step 7: Creating EmployeeFaceRecord in DynamoDB")
         
         # Create FaceData object
         face_data = FaceData(
             face_id=face_id,
             employee_id=employee_info.employee_id,
-            bounding_box=face_detail.get('BoundingBox', {}),
+            bounding_box=indexed_face.bounding_box,
             confidence=liveness_result.confidence,  # Use Liveness API confidence
-            landmarks=face_detail.get('Landmarks', []),
+            landmarks=indexed_face.landmarks,
             thumbnail_s3_key=s3_key
         )
         
@@ -327,7 +412,10 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             thumbnail_s3_key=s3_key,
             is_active=True,
             re_enrollment_count=0,
-            face_data=face_data
+            face_data=face_data,
+            face_ids=face_ids,
+            collection_id=face_service.collection_id,
+            face_image_s3_key=face_image_s3_key
         )
         
         # Store in DynamoDB
@@ -338,6 +426,19 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             employee_record.re_enrollment_count = 1
             db_service.update_employee_face_record(employee_record)
         
+        # Step 8: Provision the Cognito user now so face login mints tokens in one call
+        user_pool_id = os.environ.get('COGNITO_USER_POOL_ID')
+        client_id = os.environ.get('COGNITO_CLIENT_ID')
+        if user_pool_id and client_id and timeout_manager.should_continue(buffer_seconds=1.0):
+            cognito_service = registry.cognito_service(user_pool_id, client_id, region,
+                                                       timeout_manager.require_budget('session'))
+            provisioned, provision_error = cognito_service.provision_user(
+                employee_info.employee_id, employee_info.name
+            )
+            if not provisioned:
+                # Not fatal: the first login provisions the user instead
+                logger.warning(f"Cognito provisioning deferred for {employee_info.employee_id}: {provision_error}")
+        
         logger.info(f"Enrollment completed successfully for employee {employee_info.employee_id}")
         
         # Return success response
@@ -361,6 +462,10 @@ def handle_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        if is_timeout_error(e):
+            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                 "処理時間が超過しました",
+                                 f"Deadline exceeded: {str(e)}", request_id)
         logger.error(f"Unexpected error in enrollment handler: {str(e)}", exc_info=True)
         return _error_response(500, ErrorCodes.GENERIC_ERROR,
                              "시스템 오류가 발생했습니다",
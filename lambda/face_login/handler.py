@@ -24,15 +24,25 @@ from shared.face_recognition_service import FaceRecognitionService
 from shared.thumbnail_processor import ThumbnailProcessor
 from shared.cognito_service import CognitoService
 from shared.error_handler import ErrorHandler
-from shared.timeout_manager import TimeoutManager
+from shared.timeout_manager import TimeoutManager, is_timeout_error
 from shared.dynamodb_service import DynamoDBService
 from shared.liveness_service import LivenessService, SessionNotFoundError, SessionExpiredError
 from shared.models import ErrorCodes
+from shared.image_quality import evaluate_image_quality
+from shared.image_pipeline import process_face_image
+from shared.service_registry import get_registry
+from shared.step_executor import StepGraph, StepFailedError
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Rate limiting configuration. Kiosks behind one NAT egress share a source IP,
+# so attempts are counted per kiosk_id within the source IP when one is sent
+# (kiosk_id is client-supplied, so it never escapes its IP's scope).
+FACE_LOGIN_RATE_LIMIT_WINDOW_SECONDS = 60
+DEFAULT_RATE_LIMIT_TABLE = 'FaceAuth-RateLimits'
+
 
 def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -40,9 +50,14 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     Flow:
     1. Perform liveness detection on face image
-    2. Search faces in Rekognition collection (1:N matching)
-    3. If match found, create Cognito authentication session
-    4. Update last_login timestamp in DynamoDB
+    2. Search faces in Rekognition collection (1:N matching), using the
+       Liveness reference image in S3 when no face_image is uploaded.
+       With claimed_employee_id (badge-tap kiosks) the face is verified 1:1
+       against that employee instead; 1:N search is the fallback when the
+       claim cannot be verified.
+    3. If match found, stamp last_login with one write conditional on the
+       employee being active (no tokens are issued otherwise)
+    4. Create Cognito authentication session and store it in DynamoDB
     5. If no match, store failed attempt image in S3 logins/ folder
     
     Args:
@@ -53,7 +68,7 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         API Gateway response with authentication result
     """
     # Initialize timeout manager
-    timeout_manager = TimeoutManager()
+    timeout_manager = TimeoutManager.from_lambda_context(context)
     request_id = context.aws_request_id
     
     try:
@@ -79,12 +94,8 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Extract and validate request data
         face_image_b64 = body.get('face_image')
         liveness_session_id = body.get('liveness_session_id')  # New: Liveness session ID
-        
-        if not face_image_b64:
-            logger.warning("Missing face image in request")
-            return _error_response(400, ErrorCodes.INVALID_REQUEST,
-                                 "顔画像が必要です",
-                                 "Missing face_image", request_id)
+        kiosk_id = body.get('kiosk_id')  # Selects the collections searched (COLLECTION_ROUTING)
+        claimed_employee_id = body.get('claimed_employee_id')  # Badge-tap kiosks: 1:1 verification
         
         if not liveness_session_id:
             logger.warning("Missing liveness_session_id in request")
@@ -92,9 +103,11 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                                  "Liveness検証が必要です",
                                  "Missing liveness_session_id", request_id)
         
-        # Decode base64 image
+        # Decode base64 image (optional: the Liveness reference image is used otherwise)
+        face_image = None
         try:
-            face_image = base64.b64decode(face_image_b64)
+            if face_image_b64:
+                face_image = base64.b64decode(face_image_b64)
         except Exception as e:
             logger.error(f"Failed to decode base64 image: {str(e)}")
             return _error_response(400, ErrorCodes.INVALID_REQUEST,
@@ -107,12 +120,47 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Initialize services
         logger.info("Initializing services for face login")
-        face_service = FaceRecognitionService(collection_id=collection_id, region_name=region)
-        thumbnail_processor = ThumbnailProcessor()
-        cognito_service = CognitoService(user_pool_id, client_id, region)
-        error_handler = ErrorHandler()
-        db_service = DynamoDBService(region_name=region)
-        db_service.initialize_tables(card_templates_table, employee_faces_table, auth_sessions_table)
+        registry = get_registry()
+        face_service = registry.face_recognition_service(collection_id, region,
+                                                         timeout_manager.require_budget('search'))
+        cognito_service = registry.cognito_service(user_pool_id, client_id, region,
+                                                   timeout_manager.require_budget('session'))
+        error_handler = registry.error_handler()
+        db_service = registry.dynamodb_service(card_templates_table, employee_faces_table,
+                                               auth_sessions_table, region)
+        
+        # Throttle repeated attempts before paying for any Rekognition call
+        rate_limiter = registry.rate_limiter(
+            os.environ.get('RATE_LIMIT_TABLE', DEFAULT_RATE_LIMIT_TABLE),
+            int(os.environ.get('FACE_LOGIN_MAX_ATTEMPTS', '60')),
+            FACE_LOGIN_RATE_LIMIT_WINDOW_SECONDS, region
+        )
+        rate_limit_key = f"face_login#{ip_address or request_id}"
+        if kiosk_id:
+            rate_limit_key += f"#{kiosk_id}"
+        rate_limit = rate_limiter.check(rate_limit_key)
+        if not rate_limit.allowed:
+            return _error_response(429, ErrorCodes.GENERIC_ERROR,
+                                 "試行回数が多すぎます。しばらくしてから再度お試しください",
+                                 f"Rate limit exceeded: {rate_limit.attempts:.1f} attempts, "
+                                 f"retry after {rate_limit.retry_after}s", request_id)
+        
+        # Decode the uploaded frame once: search image, thumbnail and quality metrics
+        processed_image = None
+        if face_image is not None:
+            try:
+                processed_image = process_face_image(face_image)
+            except ValueError as e:
+                return _error_response(400, ErrorCodes.INVALID_REQUEST,
+                                     "画像形式が正しくありません",
+                                     str(e), request_id)
+            
+            # Reject hopeless frames locally before paying for any Rekognition call
+            quality_issue = evaluate_image_quality(processed_image.quality)
+            if quality_issue:
+                return _error_response(400, ErrorCodes.LIVENESS_FAILED,
+                                     error_handler.error_mappings[ErrorCodes.LIVENESS_FAILED]['user_message'],
+                                     quality_issue, request_id)
         
         # Step 1: Verify Liveness session (NEW - First step)
         logger.info(f"Step 1: Verifying Liveness session {liveness_session_id}")
@@ -121,9 +169,23 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                                  "処理時間が超過しました",
                                  "Timeout before liveness verification", request_id)
         
+        # Shards routed to this kiosk are searched concurrently, bounded by the time left
+        search_collections = registry.collection_router(collection_id).search_collections(kiosk_id)
+        
+        liveness_service = registry.liveness_service(region, timeout_manager.require_budget('liveness'))
+        steps = StepGraph()
+        steps.add('liveness', lambda: liveness_service.get_session_result(liveness_session_id))
+        if processed_image is not None and not claimed_employee_id:
+            # An uploaded frame does not depend on the session: search while it is fetched.
+            # Matches are only used once liveness has passed.
+            steps.add('search', lambda: face_service.search_faces(
+                processed_image.search_image, request_id, collection_ids=search_collections,
+                timeout_seconds=timeout_manager.budget('search')
+            ))
+        steps.start()
+        
         try:
-            liveness_service = LivenessService()
-            liveness_result = liveness_service.get_session_result(liveness_session_id)
+            liveness_result = steps.result('liveness', timeout_manager.budget('liveness'))
             
             if not liveness_result.is_live:
                 logger.warning(
@@ -138,6 +200,7 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'threshold': liveness_service.confidence_threshold
                     }
                 )
+                steps.cancel()
                 return _error_response(401, error_response.error_code,
                                      error_response.user_message,
                                      error_response.system_reason, request_id)
@@ -149,17 +212,36 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
         except SessionNotFoundError as e:
             logger.warning(f"Liveness session not found: {liveness_session_id}")
+            steps.cancel()
             return _error_response(404, ErrorCodes.INVALID_REQUEST,
                                  "Liveness検証セッションが見つかりません",
                                  f"Session not found: {str(e)}", request_id)
         
         except SessionExpiredError as e:
             logger.warning(f"Liveness session expired: {liveness_session_id}")
+            steps.cancel()
             return _error_response(410, ErrorCodes.TIMEOUT_ERROR,
                                  "Liveness検証セッションが期限切れです",
                                  f"Session expired: {str(e)}", request_id)
         
+        except StepFailedError as e:
+            # Liveness was cancelled before it started because another step failed
+            steps.cancel()
+            if is_timeout_error(e.error):
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     f"Deadline exceeded in {e.step}: {str(e.error)}", request_id)
+            logger.error(f"Face login step {e.step} failed: {str(e.error)}")
+            return _error_response(500, ErrorCodes.GENERIC_ERROR,
+                                 "시스템 오류가 발생했습니다",
+                                 f"Step {e.step} error: {str(e.error)}", request_id)
+        
         except Exception as e:
+            steps.cancel()
+            if is_timeout_error(e):
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     f"Deadline exceeded: {str(e)}", request_id)
             logger.error(f"Liveness verification error: {str(e)}", exc_info=True)
             return _error_response(500, ErrorCodes.GENERIC_ERROR,
                                  "Liveness検証に失敗しました",
@@ -168,15 +250,56 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Step 2: Perform 1:N face matching (removed old liveness detection)
         logger.info("Step 2: Performing 1:N face matching")
         if not timeout_manager.should_continue(buffer_seconds=3.0):
+            steps.cancel()
             return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
                                  "処理時間が超過しました",
                                  "Timeout before face matching", request_id)
         
-        # Generate thumbnail for search
-        thumbnail_bytes = thumbnail_processor.create_thumbnail(face_image)
+        reference_image = None
+        thumbnail_bytes = None
+        search_image = None
+        if processed_image is not None:
+            # Thumbnail is kept for the failed-attempt archive
+            thumbnail_bytes = processed_image.thumbnail
+            search_image = processed_image.search_image
+        elif liveness_result.reference_image_s3_key:
+            # Match with the image captured by the Liveness session (no upload, no decode)
+            reference_image = {'Bucket': bucket_name, 'Name': liveness_result.reference_image_s3_key}
+        else:
+            logger.warning(f"No face_image and no reference image for session {liveness_session_id}")
+            return _error_response(400, ErrorCodes.INVALID_REQUEST,
+                                 "顔画像が必要です",
+                                 "Missing face_image and liveness reference image", request_id)
+        
+        matches = None
+        employee_record = None
+        if claimed_employee_id:
+            # Badge-tap kiosk: compare against the claimed employee's full-resolution enrollment face.
+            # Records enrolled before it was kept have none and go to the 1:N search.
+            employee_record = db_service.get_employee_face_record(claimed_employee_id)
+            if employee_record and employee_record.is_active and employee_record.face_image_s3_key:
+                match, verify_error = face_service.verify_face(
+                    claimed_employee_id,
+                    {'Bucket': bucket_name, 'Name': employee_record.face_image_s3_key},
+                    search_image, request_id, s3_object=reference_image,
+                    face_id=employee_record.face_id
+                )
+                if verify_error is None:
+                    matches = [match] if match else []
+            if matches is None:
+                logger.info(f"Claimed employee {claimed_employee_id} cannot be verified 1:1, "
+                            f"falling back to 1:N search")
+                employee_record = None
         
-        # Search for matching face
-        matches = face_service.search_faces(thumbnail_bytes)
+        if 'search' in steps:
+            # Wait only for the search budget left now that liveness has passed
+            matches, search_error = steps.result('search', timeout_manager.budget('search'))
+        elif matches is None:
+            # Search for matching face
+            matches, search_error = face_service.search_faces(search_image, request_id,
+                                                              s3_object=reference_image,
+                                                              collection_ids=search_collections,
+                                                              timeout_seconds=timeout_manager.budget('search'))
         
         if not matches or len(matches) == 0:
             logger.info("No face match found, storing failed attempt")
@@ -186,14 +309,25 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             date_folder = datetime.now().strftime('%Y-%m-%d')
             s3_key = f"logins/{date_folder}/{timestamp}_unknown.jpg"
             
-            s3_client = boto3.client('s3', region_name=region)
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=s3_key,
-                Body=thumbnail_bytes,
-                ContentType='image/jpeg',
-                ServerSideEncryption='AES256'
-            )
+            s3_client = registry.client('s3', region)
+            if reference_image is not None:
+                # Server-side copy of the reference image; nothing is downloaded
+                s3_client.copy_object(
+                    Bucket=bucket_name,
+                    Key=s3_key,
+                    CopySource={'Bucket': reference_image['Bucket'], 'Key': reference_image['Name']},
+                    ContentType='image/jpeg',
+                    MetadataDirective='REPLACE',
+                    ServerSideEncryption='AES256'
+                )
+            else:
+                s3_client.put_object(
+                    Bucket=bucket_name,
+                    Key=s3_key,
+                    Body=thumbnail_bytes,
+                    ContentType='image/jpeg',
+                    ServerSideEncryption='AES256'
+                )
             
             logger.info(f"Failed attempt stored at s3://{bucket_name}/{s3_key}")
             
@@ -207,14 +341,14 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Get best match
         best_match = matches[0]
-        employee_id = best_match['external_image_id']
-        similarity = best_match['similarity']
+        employee_id = best_match.employee_id
+        similarity = best_match.similarity
         
         logger.info(f"Face match found: employee_id={employee_id}, similarity={similarity}")
         
-        # Verify employee record exists and is active
-        employee_record = db_service.get_employee_face_record(employee_id)
-        if not employee_record or not employee_record.is_active:
+        # Step 3: Stamp last_login, conditional on is_active, before any token is issued
+        logger.info(f"Step 3: Authorizing login for {employee_id}")
+        if not db_service.authorize_login(employee_id, datetime.now()):
             logger.warning(f"Employee {employee_id} not found or inactive")
             error_response = error_handler.handle_error(
                 ErrorCodes.ACCOUNT_DISABLED,
@@ -224,8 +358,8 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                                  error_response.user_message,
                                  error_response.system_reason, request_id)
         
-        # Step 3: Create Cognito authentication session
-        logger.info(f"Step 3: Creating authentication session for {employee_id}")
+        # Step 4: Create Cognito authentication session
+        logger.info(f"Step 4: Creating authentication session for {employee_id}")
         if not timeout_manager.should_continue(buffer_seconds=2.0):
             return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
                                  "処理時間が超過しました",
@@ -247,10 +381,6 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Store session in DynamoDB
         db_service.create_auth_session(session)
         
-        # Step 4: Update last_login timestamp
-        logger.info(f"Step 4: Updating last_login for {employee_id}")
-        db_service.update_last_login(employee_id, datetime.now())
-        
         logger.info(f"Face login completed successfully for employee {employee_id}")
         
         # Return success response with tokens
@@ -276,6 +406,10 @@ def handle_face_login(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        if is_timeout_error(e):
+            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                 "処理時間が超過しました",
+                                 f"Deadline exceeded: {str(e)}", request_id)
         logger.error(f"Unexpected error in face login handler: {str(e)}", exc_info=True)
         return _error_response(500, ErrorCodes.GENERIC_ERROR,
                              "시스템 오류가 발생했습니다",
@@ -26,10 +26,14 @@ from shared.ad_connector_mock import create_ad_connector
 from shared.face_recognition_service import FaceRecognitionService
 from shared.thumbnail_processor import ThumbnailProcessor
 from shared.error_handler import ErrorHandler
-from shared.timeout_manager import TimeoutManager
+from shared.timeout_manager import TimeoutManager, is_timeout_error
 from shared.dynamodb_service import DynamoDBService
 from shared.liveness_service import LivenessService, SessionNotFoundError, SessionExpiredError
 from shared.models import EmployeeFaceRecord, FaceData, EmployeeInfo, ErrorCodes
+from shared.image_quality import evaluate_image_quality
+from shared.image_pipeline import process_face_image
+from shared.service_registry import get_registry
+from shared.step_executor import StepGraph
 
 # Configure logging
 logger = logging.getLogger()
@@ -45,8 +49,8 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     2. Verify employee info with Active Directory
     3. Check that employee has existing enrollment
     4. Capture new face image and perform liveness detection
-    5. Delete old face from Rekognition collection
-    6. Index new face in Rekognition collection
+    5. Validate and index new face in Rekognition collection (single IndexFaces call)
+    6. Delete old face from Rekognition collection
     7. Generate new 200x200 thumbnail
     8. Update S3 with new thumbnail (replace old one)
     9. Update EmployeeFaceRecord in DynamoDB (increment re_enrollment_count)
@@ -60,7 +64,7 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         API Gateway response with re-enrollment result
     """
     # Initialize timeout manager
-    timeout_manager = TimeoutManager()
+    timeout_manager = TimeoutManager.from_lambda_context(context)
     request_id = context.aws_request_id
     
     try:
@@ -110,16 +114,39 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Initialize services
         logger.info("Initializing services for re-enrollment")
-        ocr_service = OCRService(region_name=region)
-        ad_connector = ADConnector()
-        face_service = FaceRecognitionService(collection_id=collection_id, region_name=region)
-        thumbnail_processor = ThumbnailProcessor()
-        error_handler = ErrorHandler()
-        db_service = DynamoDBService(region_name=region)
-        db_service.initialize_tables(card_templates_table, employee_faces_table, auth_sessions_table)
+        registry = get_registry()
+        ocr_service = registry.ocr_service(card_templates_table, employee_faces_table,
+                                           auth_sessions_table, region, timeout_manager.require_budget('ocr'))        
+        # Initialize AD Connector (Mock or Real based on environment)
+        ad_connector = create_ad_connector(
+            use_mock=os.environ.get('USE_MOCK_AD', 'true').lower() == 'true',
+            server_url=os.environ.get('AD_SERVER_URL', 'ldaps://ad.company.com'),
+            base_dn=os.environ.get('AD_BASE_DN', 'DC=company,DC=com'),
+            timeout=min(int(os.environ.get('AD_TIMEOUT', '10')), timeout_manager.budget('ad'))
+        )
         
-        # Initialize OCR service with DynamoDB tables
-        ocr_service.initialize_db_service(card_templates_table, employee_faces_table, auth_sessions_table)
+        face_service = registry.face_recognition_service(collection_id, region,
+                                                         timeout_manager.require_budget('search'))
+        error_handler = registry.error_handler()
+        db_service = registry.dynamodb_service(card_templates_table, employee_faces_table,
+                                               auth_sessions_table, region)
+        
+        # Decode the uploaded frame once: search image, thumbnail and quality metrics
+        processed_image = None
+        if face_image is not None:
+            try:
+                processed_image = process_face_image(face_image)
+            except ValueError as e:
+                return _error_response(400, ErrorCodes.INVALID_REQUEST,
+                                     "画像形式が正しくありません",
+                                     str(e), request_id)
+            
+            # Reject hopeless frames locally before paying for any Rekognition call
+            quality_issue = evaluate_image_quality(processed_image.quality)
+            if quality_issue:
+                return _error_response(400, ErrorCodes.LIVENESS_FAILED,
+                                     error_handler.error_mappings[ErrorCodes.LIVENESS_FAILED]['user_message'],
+                                     quality_issue, request_id)
         
         # Step 1: Process ID card with OCR to verify identity
         logger.info("Step 1: Processing ID card with OCR for identity verification")
@@ -128,207 +155,233 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                                  "処理時間が超過しました",
                                  "Timeout before OCR processing", request_id)
         
-        employee_info, ocr_error = ocr_service.extract_id_card_info(id_card_image, request_id)
-        if ocr_error or not employee_info:
-            logger.warning(f"OCR processing failed: {ocr_error}")
-            error_response = error_handler.handle_error(
-                ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                {'request_id': request_id, 'detail': ocr_error}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        logger.info(f"OCR extracted employee_id: {employee_info.employee_id}, name: {employee_info.name}")
-        
-        # Validate extracted employee info
-        if not employee_info.validate():
-            logger.warning(f"Employee info validation failed for {employee_info.employee_id}")
-            error_response = error_handler.handle_error(
-                ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                {'request_id': request_id, 'employee_id': employee_info.employee_id}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        # Step 2: Verify with Active Directory
-        logger.info(f"Step 2: Verifying employee {employee_info.employee_id} with AD")
-        if not timeout_manager.check_ad_timeout():
-            logger.warning("AD timeout limit reached before verification")
-            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
-                                 "認証サーバー接続タイムアウト",
-                                 "AD timeout before verification", request_id)
+        # OCR and the Liveness session result are independent: fetch the session
+        # while identity is verified, and collect it at Step 4
+        liveness_service = registry.liveness_service(region, timeout_manager.require_budget('liveness'))
+        steps = StepGraph()
+        steps.add('ocr', lambda: ocr_service.extract_id_card_info(id_card_image, request_id))
+        steps.add('liveness', lambda: liveness_service.get_session_result(liveness_session_id))
+        steps.start()
         
-        # Note: AD connector may have issues, so we'll handle gracefully
         try:
-            ad_result = ad_connector.verify_employee(employee_info.employee_id, employee_info.to_dict())
+            employee_info, ocr_error = steps.result('ocr', timeout_manager.budget('ocr'))
+            if getattr(ocr_error, 'error_code', None) == ErrorCodes.TIMEOUT_ERROR:
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     ocr_error.system_reason, request_id)
+            if ocr_error or not employee_info:
+                logger.warning(f"OCR processing failed: {ocr_error}")
+                error_response = error_handler.handle_error(
+                    ErrorCodes.ID_CARD_FORMAT_MISMATCH,
+                    {'request_id': request_id, 'detail': ocr_error}
+                )
+                return _error_response(400, error_response.error_code,
+                                     error_response.user_message,
+                                     error_response.system_reason, request_id)
             
-            if not ad_result.success:
-                logger.warning(f"AD verification failed: {ad_result.reason}")
-                
-                # Map AD errors to appropriate error codes
-                if ad_result.reason == "account_disabled":
-                    error_response = error_handler.handle_error(
-                        ErrorCodes.ACCOUNT_DISABLED,
-                        {'request_id': request_id, 'employee_id': employee_info.employee_id}
-                    )
-                elif ad_result.reason == "employee_not_found":
-                    error_response = error_handler.handle_error(
-                        ErrorCodes.REGISTRATION_INFO_MISMATCH,
-                        {'request_id': request_id, 'employee_id': employee_info.employee_id}
-                    )
-                else:
-                    error_response = error_handler.handle_error(
-                        ErrorCodes.AD_CONNECTION_ERROR,
-                        {'request_id': request_id, 'detail': ad_result.reason}
-                    )
-                
+            logger.info(f"OCR extracted employee_id: {employee_info.employee_id}, name: {employee_info.name}")
+            
+            # Validate extracted employee info
+            if not employee_info.validate():
+                logger.warning(f"Employee info validation failed for {employee_info.employee_id}")
+                error_response = error_handler.handle_error(
+                    ErrorCodes.ID_CARD_FORMAT_MISMATCH,
+                    {'request_id': request_id, 'employee_id': employee_info.employee_id}
+                )
                 return _error_response(400, error_response.error_code,
                                      error_response.user_message,
                                      error_response.system_reason, request_id)
             
-            logger.info(f"AD verification successful for {employee_info.employee_id}")
+            # Step 2: Verify with Active Directory
+            logger.info(f"Step 2: Verifying employee {employee_info.employee_id} with AD")
+            if not timeout_manager.check_ad_timeout():
+                logger.warning("AD timeout limit reached before verification")
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "認証サーバー接続タイムアウト",
+                                     "AD timeout before verification", request_id)
             
-        except Exception as ad_error:
-            # AD connector may not be fully functional, log and continue
-            logger.warning(f"AD verification skipped due to error: {str(ad_error)}")
-            logger.info("Continuing re-enrollment without AD verification (AD connector may have issues)")
-        
-        # Step 3: Check that employee has existing enrollment
-        logger.info(f"Step 3: Checking existing enrollment for {employee_info.employee_id}")
-        existing_record = db_service.get_employee_face_record(employee_info.employee_id)
-        
-        if not existing_record:
-            logger.warning(f"No existing enrollment found for {employee_info.employee_id}")
-            return _error_response(404, ErrorCodes.INVALID_REQUEST,
-                                 "등록된 직원 정보를 찾을 수 없습니다",
-                                 f"No existing enrollment for employee {employee_info.employee_id}", request_id)
-        
-        if not existing_record.is_active:
-            logger.warning(f"Employee {employee_info.employee_id} enrollment is inactive")
-            error_response = error_handler.handle_error(
-                ErrorCodes.ACCOUNT_DISABLED,
-                {'request_id': request_id, 'employee_id': employee_info.employee_id}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        old_face_id = existing_record.face_id
-        old_s3_key = existing_record.thumbnail_s3_key
-        logger.info(f"Found existing enrollment: face_id={old_face_id}, re_enrollment_count={existing_record.re_enrollment_count}")
-        
-        # Step 4: Verify Liveness session (NEW - After identity verification)
-        logger.info(f"Step 4: Verifying Liveness session {liveness_session_id}")
-        if not timeout_manager.should_continue(buffer_seconds=3.0):
-            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
-                                 "処理時間が超過しました",
-                                 "Timeout before liveness verification", request_id)
-        
-        try:
-            liveness_service = LivenessService()
-            liveness_result = liveness_service.get_session_result(liveness_session_id)
+            # Note: AD connector may have issues, so we'll handle gracefully
+            try:
+                ad_result = ad_connector.verify_employee(employee_info.employee_id, employee_info.to_dict())
+                
+                if not ad_result.success:
+                    logger.warning(f"AD verification failed: {ad_result.reason}")
+                    
+                    # Map AD errors to appropriate error codes
+                    if ad_result.reason == "account_disabled":
+                        error_response = error_handler.handle_error(
+                            ErrorCodes.ACCOUNT_DISABLED,
+                            {'request_id': request_id, 'employee_id': employee_info.employee_id}
+                        )
+                    elif ad_result.reason == "employee_not_found":
+                        error_response = error_handler.handle_error(
+                            ErrorCodes.REGISTRATION_INFO_MISMATCH,
+                            {'request_id': request_id, 'employee_id': employee_info.employee_id}
+                        )
+                    else:
+                        error_response = error_handler.handle_error(
+                            ErrorCodes.AD_CONNECTION_ERROR,
+                            {'request_id': request_id, 'detail': ad_result.reason}
+                        )
+                    
+                    return _error_response(400, error_response.error_code,
+                                         error_response.user_message,
+                                         error_response.system_reason, request_id)
+                
+                logger.info(f"AD verification successful for {employee_info.employee_id}")
+                
+            except Exception as ad_error:
+                # AD connector may not be fully functional, log and continue
+                logger.warning(f"AD verification skipped due to error: {str(ad_error)}")
+                logger.info("Continuing re-enrollment without AD verification (AD connector may have issues)")
             
-            if not liveness_result.is_live:
-                logger.warning(
-                    f"Liveness verification failed: confidence {liveness_result.confidence}, "
-                    f"threshold {liveness_service.confidence_threshold}"
-                )
+            # Step 3: Check that employee has existing enrollment
+            logger.info(f"Step 3: Checking existing enrollment for {employee_info.employee_id}")
+            existing_record = db_service.get_employee_face_record(employee_info.employee_id)
+            
+            if not existing_record:
+                logger.warning(f"No existing enrollment found for {employee_info.employee_id}")
+                return _error_response(404, ErrorCodes.INVALID_REQUEST,
+                                     "등록된 직원 정보를 찾을 수 없습니다",
+                                     f"No existing enrollment for employee {employee_info.employee_id}", request_id)
+            
+            if not existing_record.is_active:
+                logger.warning(f"Employee {employee_info.employee_id} enrollment is inactive")
                 error_response = error_handler.handle_error(
-                    ErrorCodes.LIVENESS_FAILED,
-                    {
-                        'request_id': request_id,
-                        'confidence': liveness_result.confidence,
-                        'threshold': liveness_service.confidence_threshold
-                    }
+                    ErrorCodes.ACCOUNT_DISABLED,
+                    {'request_id': request_id, 'employee_id': employee_info.employee_id}
                 )
-                return _error_response(401, error_response.error_code,
+                return _error_response(400, error_response.error_code,
                                      error_response.user_message,
                                      error_response.system_reason, request_id)
             
-            logger.info(
-                f"Liveness verification passed: confidence {liveness_result.confidence}, "
-                f"session_id {liveness_session_id}"
-            )
+            old_face_id = existing_record.face_id
+            old_s3_key = existing_record.thumbnail_s3_key
             
-        except SessionNotFoundError as e:
-            logger.warning(f"Liveness session not found: {liveness_session_id}")
-            return _error_response(404, ErrorCodes.INVALID_REQUEST,
-                                 "Liveness検証セッションが見つかりません",
-                                 f"Session not found: {str(e)}", request_id)
-        
-        except SessionExpiredError as e:
-            logger.warning(f"Liveness session expired: {liveness_session_id}")
-            return _error_response(410, ErrorCodes.TIMEOUT_ERROR,
-                                 "Liveness検証セッションが期限切れです",
-                                 f"Session expired: {str(e)}", request_id)
-        
-        except Exception as e:
-            logger.error(f"Liveness verification error: {str(e)}", exc_info=True)
-            return _error_response(500, ErrorCodes.GENERIC_ERROR,
-                                 "Liveness検証に失敗しました",
-                                 f"Liveness verification error: {str(e)}", request_id)
-        
-        # Step 5: Process new face image (removed old liveness detection)
-        logger.info("Step 5: Processing new face image")
+            # New faces go to the collection that holds the old ones
+            if existing_record.collection_id and existing_record.collection_id != face_service.collection_id:
+                face_service = registry.face_recognition_service(existing_record.collection_id, region,
+                                                                 timeout_manager.require_budget('search'))
+            logger.info(f"Found existing enrollment: face_id={old_face_id}, re_enrollment_count={existing_record.re_enrollment_count}")
+            
+            # Step 4: Verify Liveness session (NEW - After identity verification)
+            logger.info(f"Step 4: Verifying Liveness session {liveness_session_id}")
+            if not timeout_manager.should_continue(buffer_seconds=3.0):
+                return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                     "処理時間が超過しました",
+                                     "Timeout before liveness verification", request_id)
+            
+            try:
+                liveness_result = steps.result('liveness', timeout_manager.budget('liveness'))
+                
+                if not liveness_result.is_live:
+                    logger.warning(
+                        f"Liveness verification failed: confidence {liveness_result.confidence}, "
+                        f"threshold {liveness_service.confidence_threshold}"
+                    )
+                    error_response = error_handler.handle_error(
+                        ErrorCodes.LIVENESS_FAILED,
+                        {
+                            'request_id': request_id,
+                            'confidence': liveness_result.confidence,
+                            'threshold': liveness_service.confidence_threshold
+                        }
+                    )
+                    return _error_response(401, error_response.error_code,
+                                         error_response.user_message,
+                                         error_response.system_reason, request_id)
+                
+                logger.info(
+                    f"Liveness verification passed: confidence {liveness_result.confidence}, "
+                    f"session_id {liveness_session_id}"
+                )
+                
+            except SessionNotFoundError as e:
+                logger.warning(f"Liveness session not found: {liveness_session_id}")
+                return _error_response(404, ErrorCodes.INVALID_REQUEST,
+                                     "Liveness検証セッションが見つかりません",
+                                     f"Session not found: {str(e)}", request_id)
+            
+            except SessionExpiredError as e:
+                logger.warning(f"Liveness session expired: {liveness_session_id}")
+                return _error_response(410, ErrorCodes.TIMEOUT_ERROR,
+                                     "Liveness検証セッションが期限切れです",
+                                     f"Session expired: {str(e)}", request_id)
+            
+            except Exception as e:
+                if is_timeout_error(e):
+                    return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                         "処理時間が超過しました",
+                                         f"Deadline exceeded: {str(e)}", request_id)
+                logger.error(f"Liveness verification error: {str(e)}", exc_info=True)
+                return _error_response(500, ErrorCodes.GENERIC_ERROR,
+                                     "Liveness検証に失敗しました",
+                                     f"Liveness verification error: {str(e)}", request_id)
+        finally:
+            # If OCR or AD rejected the request, liveness may still be queued on the shared pool
+            steps.cancel()
+        
+        # Step 5: Validate and index new face image (removed old liveness detection)
+        logger.info("Step 5: Validating and indexing new face image")
         if not timeout_manager.should_continue(buffer_seconds=3.0):
             return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
                                  "処理時間が超過しました",
                                  "Timeout before face processing", request_id)
         
-        # Detect face for bounding box and landmarks (no liveness check)
-        face_details = face_service.detect_faces(face_image)
-        if not face_details:
-            logger.warning("No face detected in image")
-            error_response = error_handler.handle_error(
-                ErrorCodes.FACE_NOT_DETECTED,
-                {'request_id': request_id}
-            )
-            return _error_response(400, error_response.error_code,
-                                 error_response.user_message,
-                                 error_response.system_reason, request_id)
-        
-        face_detail = face_details[0]
-        logger.info(f"Face detected with confidence {face_detail.get('Confidence', 0)}")
-        
-        # Step 6: Delete old face from Rekognition collection
-        logger.info(f"Step 6: Deleting old face {old_face_id} from Rekognition collection")
-        try:
-            face_service.delete_face(old_face_id)
-            logger.info(f"Successfully deleted old face {old_face_id}")
-        except Exception as e:
-            logger.warning(f"Failed to delete old face {old_face_id}: {str(e)}")
-            # Continue anyway - we'll replace with new face
-        
-        # Step 7: Generate new 200x200 thumbnail
-        logger.info("Step 7: Generating new thumbnail")
-        thumbnail_bytes = thumbnail_processor.create_thumbnail(face_image)
+        # One IndexFaces call validates and indexes; the old face stays until this succeeds
+        indexed_face, rejection = face_service.enroll_face(
+            processed_image.search_image, employee_info.employee_id, request_id,
+            attribute_profile='presence-only'
+        )
+        if rejection:
+            return _error_response(400, ErrorCodes.LIVENESS_FAILED,
+                                 error_handler.error_mappings[ErrorCodes.LIVENESS_FAILED]['user_message'],
+                                 rejection, request_id)
         
-        # Step 8: Index new face in Rekognition collection
-        logger.info("Step 8: Indexing new face in Rekognition collection")
-        if not timeout_manager.should_continue(buffer_seconds=2.0):
-            # Rollback: Try to restore old face if possible
-            logger.error("Timeout before indexing new face - attempting rollback")
-            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
-                                 "処理時間が超過しました",
-                                 "Timeout before face indexing", request_id)
+        new_face_id = indexed_face.face_id
+        logger.info(f"New face indexed with face_id: {new_face_id}")
         
-        new_face_id = face_service.index_face(thumbnail_bytes, employee_info.employee_id)
-        if not new_face_id:
-            logger.error("Failed to index new face in Rekognition")
-            # This is a critical failure - existing face data is preserved in DynamoDB
-            return _error_response(500, ErrorCodes.GENERIC_ERROR,
-                                 "얼굴 등록에 실패했습니다",
-                                 "Rekognition face indexing failed", request_id)
+        new_face_ids = [new_face_id]
+        if face_service.search_mode == 'users':
+            # Aggregate the new vectors under the employee's user before the old ones go
+            if liveness_result.audit_image_s3_key and timeout_manager.should_continue(buffer_seconds=5.0):
+                new_face_ids += face_service.enroll_additional_faces(
+                    employee_info.employee_id,
+                    [{'Bucket': bucket_name, 'Name': liveness_result.audit_image_s3_key}],
+                    request_id
+                )
+            
+            if new_face_id not in face_service.enroll_user(employee_info.employee_id, new_face_ids):
+                face_service.delete_faces_by_employee_id(employee_info.employee_id, request_id,
+                                                         face_ids=new_face_ids)
+                return _error_response(500, ErrorCodes.GENERIC_ERROR,
+                                     "再登録処理に失敗しました",
+                                     "Failed to associate faces with Rekognition user", request_id)
+        
+        # Step 6: Delete old faces from Rekognition collection
+        old_face_ids = [face_id for face_id in existing_record.face_ids if face_id not in new_face_ids]
+        logger.info(f"Step 6: Deleting {len(old_face_ids)} old face(s) from Rekognition collection")
+        try:
+            # Face ids come from EmployeeFaces, so no collection scan is needed
+            # (an empty list would fall back to the scan and hit the new faces)
+            if old_face_ids:
+                deleted_count, _ = face_service.delete_faces_by_employee_id(
+                    employee_info.employee_id, request_id, face_ids=old_face_ids
+                )
+                logger.info(f"Deleted {deleted_count} old face(s) for {employee_info.employee_id}")
+        except Exception as e:
+            logger.warning(f"Failed to delete old faces {old_face_ids}: {str(e)}")
+            # Continue anyway - the new face is already indexed
         
-        logger.info(f"New face indexed with face_id: {new_face_id}")
+        # Step 7: New 200x200 thumbnail (already rendered by the image pipeline)
+        logger.info("Step 7: Using new thumbnail")
+        thumbnail_bytes = processed_image.thumbnail
         
-        # Step 9: Update S3 with new thumbnail (replace old one)
-        logger.info(f"Step 9: Updating thumbnail in S3 for employee {employee_info.employee_id}")
+        # Step 8: Update S3 with new thumbnail (replace old one)
+        logger.info(f"Step 8: Updating thumbnail in S3 for employee {employee_info.employee_id}")
         s3_key = f"enroll/{employee_info.employee_id}/face_thumbnail.jpg"
         
-        s3_client = boto3.client('s3', region_name=region)
+        s3_client = registry.client('s3', region)
         s3_client.put_object(
             Bucket=bucket_name,
             Key=s3_key,
@@ -339,16 +392,26 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         logger.info(f"New thumbnail stored at s3://{bucket_name}/{s3_key}")
         
-        # Step 10: Update EmployeeFaceRecord in DynamoDB
-        logger.info("Step 10: Updating EmployeeFaceRecord in DynamoDB")
+        # Replace the full-resolution 1:1 verification target as well
+        face_image_s3_key = f"enroll/{employee_info.employee_id}/face.jpg"
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=face_image_s3_key,
+            Body=processed_image.search_image,
+            ContentType='image/jpeg',
+            ServerSideEncryption='AES256'
+        )
+        
+        # Step 9: Update EmployeeFaceRecord in DynamoDB
+        logger.info("Step 9: Updating EmployeeFaceRecord in DynamoDB")
         
         # Create new FaceData object
         new_face_data = FaceData(
             face_id=new_face_id,
             employee_id=employee_info.employee_id,
-            bounding_box=face_detail.get('BoundingBox', {}),
+            bounding_box=indexed_face.bounding_box,
             confidence=liveness_result.confidence,  # Use Liveness API confidence
-            landmarks=face_detail.get('Landmarks', []),
+            landmarks=indexed_face.landmarks,
             thumbnail_s3_key=s3_key
         )
         
@@ -361,13 +424,16 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             thumbnail_s3_key=s3_key,
             is_active=True,
             re_enrollment_count=existing_record.re_enrollment_count + 1,
-            face_data=new_face_data
+            face_data=new_face_data,
+            face_ids=new_face_ids,
+            collection_id=face_service.collection_id,
+            face_image_s3_key=face_image_s3_key
         )
         
         # Store updated record in DynamoDB
         db_service.update_employee_face_record(updated_record)
         
-        # Step 11: Record audit trail in CloudWatch Logs
+        # Step 10: Record audit trail in CloudWatch Logs
         logger.info(f"Step 10: Recording audit trail for re-enrollment")
         audit_log = {
             'event': 'RE_ENROLLMENT',
@@ -408,6 +474,10 @@ def handle_re_enrollment(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        if is_timeout_error(e):
+            return _error_response(408, ErrorCodes.TIMEOUT_ERROR,
+                                 "処理時間が超過しました",
+                                 f"Deadline exceeded: {str(e)}", request_id)
         logger.error(f"Unexpected error in re-enrollment handler: {str(e)}", exc_info=True)
         return _error_response(500, ErrorCodes.GENERIC_ERROR,
                              "시스템 오류가 발생했습니다",
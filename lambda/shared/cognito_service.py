@@ -11,10 +11,16 @@ Handles:
 Requirements: 2.3, 3.5
 """
 
+import base64
 import boto3
+import hashlib
+import hmac
 import logging
+import threading
+import time
 import uuid
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
 import jwt
@@ -29,6 +35,187 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# JWKS documents are fetched at most once per TTL per user pool (or on an unknown kid)
+JWKS_CACHE_TTL_SECONDS = int(os.getenv('JWKS_CACHE_TTL_SECONDS', '3600'))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', '1024'))
+
+_jwk_clients: Dict[str, PyJWKClient] = {}
+_jwk_clients_lock = threading.Lock()
+
+
+def get_jwk_client(jwks_url: str) -> PyJWKClient:
+    """
+    Get the process-wide PyJWKClient for a JWKS URL
+    
+    The client keeps the JWK set for JWKS_CACHE_TTL_SECONDS and refetches it
+    early only when a token carries an unknown kid (key rotation).
+    
+    Args:
+        jwks_url: Cognito user pool JWKS URL
+        
+    Returns:
+        Shared PyJWKClient instance
+    """
+    with _jwk_clients_lock:
+        client = _jwk_clients.get(jwks_url)
+        if client is None:
+            client = PyJWKClient(
+                jwks_url,
+                cache_keys=True,
+                cache_jwk_set=True,
+                lifespan=JWKS_CACHE_TTL_SECONDS
+            )
+            _jwk_clients[jwks_url] = client
+        return client
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already-verified tokens
+    
+    Entries are keyed by a SHA-256 digest of the token (never the raw token)
+    and expire at the token's own exp claim.
+    """
+    
+    def __init__(self, max_entries: int = VERIFIED_TOKEN_CACHE_SIZE):
+        """
+        Initialize verified token cache
+        
+        Args:
+            max_entries: Maximum number of tokens kept before LRU eviction
+        """
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple[str, str, str], Tuple[float, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(user_pool_id: str, client_id: str, token: str) -> Tuple[str, str, str]:
+        return user_pool_id, client_id, hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def get(self, user_pool_id: str, client_id: str, token: str) -> Optional[Dict]:
+        """
+        Get cached claims for a token that has not expired yet
+        
+        Args:
+            user_pool_id: Cognito User Pool ID
+            client_id: Cognito User Pool Client ID
+            token: Raw JWT
+            
+        Returns:
+            Copy of the verified claims, or None on a miss
+        """
+        key = self._key(user_pool_id, client_id, token)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return dict(claims)
+    
+    def put(self, user_pool_id: str, client_id: str, token: str, claims: Dict) -> None:
+        """
+        Cache verified claims until the token's exp
+        
+        Tokens without a numeric exp claim are not cached.
+        
+        Args:
+            user_pool_id: Cognito User Pool ID
+            client_id: Cognito User Pool Client ID
+            token: Raw JWT
+            claims: Verified claims
+        """
+        expires_at = claims.get('exp')
+        if not isinstance(expires_at, (int, float)) or self.max_entries <= 0:
+            return
+        
+        key = self._key(user_pool_id, client_id, token)
+        
+        with self._lock:
+            self._entries[key] = (float(expires_at), dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached tokens"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_verified_tokens = VerifiedTokenCache()
+
+# Errors from a direct AdminInitiateAuth that mean the user must be (re)provisioned
+PROVISIONING_REQUIRED_ERRORS = frozenset({
+    'UserNotFoundException',
+    'NotAuthorizedException',
+    'PasswordResetRequiredException',
+    'UserNotConfirmedException'
+})
+
+_password_secret: Optional[bytes] = None
+_password_secret_loaded = False
+_password_secret_lock = threading.Lock()
+
+
+def get_password_secret() -> Optional[bytes]:
+    """
+    Get the secret used to derive per-employee Cognito passwords
+    
+    Read once per container from COGNITO_PASSWORD_SECRET, or from the Secrets
+    Manager secret named by COGNITO_PASSWORD_SECRET_ARN.
+    
+    Returns:
+        Secret bytes, or None if password derivation is not configured
+    """
+    global _password_secret, _password_secret_loaded
+    
+    if _password_secret_loaded:
+        return _password_secret
+    
+    with _password_secret_lock:
+        if not _password_secret_loaded:
+            secret = os.getenv('COGNITO_PASSWORD_SECRET')
+            secret_arn = os.getenv('COGNITO_PASSWORD_SECRET_ARN')
+            
+            if not secret and secret_arn:
+                try:
+                    secrets_client = boto3.client('secretsmanager')
+                    secret = secrets_client.get_secret_value(SecretId=secret_arn)['SecretString']
+                except Exception as e:
+                    logger.error(f"Failed to load Cognito password secret: {str(e)}")
+                    secret = None
+            
+            _password_secret = secret.encode('utf-8') if secret else None
+            _password_secret_loaded = True
+    
+    return _password_secret
+
+
+def reset_password_secret() -> None:
+    """Forget the loaded password secret (used in tests and after rotation)"""
+    global _password_secret, _password_secret_loaded
+    
+    with _password_secret_lock:
+        _password_secret = None
+        _password_secret_loaded = False
+
+
+def reset_token_caches() -> None:
+    """Drop the process-wide JWKS clients and verified tokens (used in tests)"""
+    with _jwk_clients_lock:
+        _jwk_clients.clear()
+    _verified_tokens.clear()
+
 
 class CognitoService:
     """
@@ -40,7 +227,8 @@ class CognitoService:
     - Session management
     """
     
-    def __init__(self, user_pool_id: str, client_id: str, region: str = 'us-east-1'):
+    def __init__(self, user_pool_id: str, client_id: str, region: str = 'us-east-1',
+                 cognito_client: Optional[Any] = None):
         """
         Initialize Cognito service
         
@@ -48,15 +236,16 @@ class CognitoService:
             user_pool_id: Cognito User Pool ID
             client_id: Cognito User Pool Client ID
             region: AWS region
+            cognito_client: Boto3 Cognito Identity Provider client (optional, created if not provided)
         """
-        self.cognito_client = boto3.client('cognito-idp', region_name=region)
+        self.cognito_client = cognito_client or boto3.client('cognito-idp', region_name=region)
         self.user_pool_id = user_pool_id
         self.client_id = client_id
         self.region = region
         
         # JWT validation setup
         self.jwks_url = f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json"
-        self.jwk_client = PyJWKClient(self.jwks_url)
+        self.jwk_client = get_jwk_client(self.jwks_url)
         
         # Session configuration
         self.session_duration_hours = int(os.getenv('SESSION_TIMEOUT_HOURS', '8'))
@@ -131,6 +320,69 @@ class CognitoService:
             logger.error(f"Unexpected error creating Cognito user {employee_id}: {str(e)}")
             return False, f"Unexpected error: {str(e)}"
     
+    def provision_user(self, employee_id: str, employee_name: str) -> Tuple[bool, Optional[str]]:
+        """
+        Provision a Cognito user with its derived password ahead of login
+        
+        Called at enrollment so that later logins can mint tokens with a single
+        AdminInitiateAuth call. Existing users get their password re-derived.
+        
+        Args:
+            employee_id: Employee identifier (used as username)
+            employee_name: Employee full name
+            
+        Returns:
+            Tuple of (success: bool, error_message: Optional[str])
+        """
+        password = self._derive_password(employee_id)
+        if password is None:
+            # Password derivation not configured; legacy path provisions at login
+            return self.create_or_get_user(employee_id, employee_name)
+        
+        try:
+            try:
+                self.cognito_client.admin_create_user(
+                    UserPoolId=self.user_pool_id,
+                    Username=employee_id,
+                    UserAttributes=[
+                        {
+                            'Name': 'name',
+                            'Value': employee_name
+                        },
+                        {
+                            'Name': 'custom:employee_id',
+                            'Value': employee_id
+                        }
+                    ],
+                    TemporaryPassword=password,
+                    MessageAction='SUPPRESS'  # Don't send welcome email
+                )
+                logger.info(f"Created Cognito user {employee_id}")
+                
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'UsernameExistsException':
+                    raise
+                logger.info(f"User {employee_id} already exists in Cognito")
+            
+            self.cognito_client.admin_set_user_password(
+                UserPoolId=self.user_pool_id,
+                Username=employee_id,
+                Password=password,
+                Permanent=True
+            )
+            
+            return True, None
+            
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            error_message = e.response['Error']['Message']
+            logger.error(f"Cognito provisioning error for {employee_id}: {error_code} - {error_message}")
+            return False, f"User provisioning failed: {error_message}"
+            
+        except Exception as e:
+            logger.error(f"Unexpected error provisioning Cognito user {employee_id}: {str(e)}")
+            return False, f"Unexpected error: {str(e)}"
+    
     def generate_auth_token(self, employee_id: str, auth_method: str = 'face') -> Tuple[Optional[Dict], Optional[str]]:
         """
         Generate authentication tokens for a user using AdminInitiateAuth
@@ -138,6 +390,11 @@ class CognitoService:
         This method uses the ADMIN_NO_SRP_AUTH flow to generate tokens without
         requiring a password, since face authentication has already verified identity.
         
+        When a password secret is configured, the user's password is derived
+        from it and tokens are minted with a single AdminInitiateAuth call.
+        Users that were never provisioned (or whose password drifted) are
+        provisioned once and retried.
+        
         Args:
             employee_id: Employee identifier (username)
             auth_method: Authentication method used ('face' or 'emergency')
@@ -146,6 +403,9 @@ class CognitoService:
             Tuple of (tokens_dict: Optional[Dict], error_message: Optional[str])
             tokens_dict contains: AccessToken, IdToken, RefreshToken, ExpiresIn
         """
+        if self._derive_password(employee_id) is not None:
+            return self._generate_auth_token_direct(employee_id, auth_method)
+        
         try:
             # For face authentication, we use a custom auth flow
             # Since the user is already verified via face recognition,
@@ -167,33 +427,49 @@ class CognitoService:
                 Permanent=True
             )
             
-            # Initiate authentication
-            response = self.cognito_client.admin_initiate_auth(
-                UserPoolId=self.user_pool_id,
-                ClientId=self.client_id,
-                AuthFlow='ADMIN_NO_SRP_AUTH',
-                AuthParameters={
-                    'USERNAME': employee_id,
-                    'PASSWORD': temp_password
-                }
-            )
+            return self._initiate_auth(employee_id, temp_password, auth_method)
             
-            # Extract tokens from response
-            auth_result = response.get('AuthenticationResult')
-            if not auth_result:
-                logger.error(f"No authentication result in Cognito response for {employee_id}")
-                return None, "Authentication failed: No tokens returned"
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            error_message = e.response['Error']['Message']
+            logger.error(f"Cognito auth error for {employee_id}: {error_code} - {error_message}")
+            return None, f"Authentication failed: {error_message}"
             
-            tokens = {
-                'AccessToken': auth_result['AccessToken'],
-                'IdToken': auth_result['IdToken'],
-                'RefreshToken': auth_result.get('RefreshToken'),
-                'ExpiresIn': auth_result['ExpiresIn'],
-                'TokenType': auth_result['TokenType']
-            }
+        except Exception as e:
+            logger.error(f"Unexpected error generating tokens for {employee_id}: {str(e)}")
+            return None, f"Unexpected error: {str(e)}"
+    
+    def _generate_auth_token_direct(self, employee_id: str,
+                                    auth_method: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Mint tokens with the derived password, provisioning the user only on demand
+        
+        Args:
+            employee_id: Employee identifier (username)
+            auth_method: Authentication method used ('face' or 'emergency')
             
-            logger.info(f"Successfully generated auth tokens for {employee_id} via {auth_method}")
-            return tokens, None
+        Returns:
+            Tuple of (tokens_dict: Optional[Dict], error_message: Optional[str])
+        """
+        password = self._derive_password(employee_id)
+        
+        try:
+            try:
+                return self._initiate_auth(employee_id, password, auth_method)
+                
+            except ClientError as e:
+                if e.response['Error']['Code'] not in PROVISIONING_REQUIRED_ERRORS:
+                    raise
+                logger.info(
+                    f"Direct token issuance failed for {employee_id} "
+                    f"({e.response['Error']['Code']}), provisioning user"
+                )
+            
+            success, error = self.provision_user(employee_id, employee_id)
+            if not success:
+                return None, error
+            
+            return self._initiate_auth(employee_id, password, auth_method)
             
         except ClientError as e:
             error_code = e.response['Error']['Code']
@@ -205,6 +481,49 @@ class CognitoService:
             logger.error(f"Unexpected error generating tokens for {employee_id}: {str(e)}")
             return None, f"Unexpected error: {str(e)}"
     
+    def _initiate_auth(self, employee_id: str, password: str,
+                       auth_method: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Call AdminInitiateAuth and extract the issued tokens
+        
+        Args:
+            employee_id: Employee identifier (username)
+            password: User's current password
+            auth_method: Authentication method used ('face' or 'emergency')
+            
+        Returns:
+            Tuple of (tokens_dict: Optional[Dict], error_message: Optional[str])
+            
+        Raises:
+            ClientError: If Cognito rejects the authentication
+        """
+        response = self.cognito_client.admin_initiate_auth(
+            UserPoolId=self.user_pool_id,
+            ClientId=self.client_id,
+            AuthFlow='ADMIN_NO_SRP_AUTH',
+            AuthParameters={
+                'USERNAME': employee_id,
+                'PASSWORD': password
+            }
+        )
+        
+        # Extract tokens from response
+        auth_result = response.get('AuthenticationResult')
+        if not auth_result:
+            logger.error(f"No authentication result in Cognito response for {employee_id}")
+            return None, "Authentication failed: No tokens returned"
+        
+        tokens = {
+            'AccessToken': auth_result['AccessToken'],
+            'IdToken': auth_result['IdToken'],
+            'RefreshToken': auth_result.get('RefreshToken'),
+            'ExpiresIn': auth_result['ExpiresIn'],
+            'TokenType': auth_result['TokenType']
+        }
+        
+        logger.info(f"Successfully generated auth tokens for {employee_id} via {auth_method}")
+        return tokens, None
+    
     def validate_token(self, access_token: str) -> Tuple[bool, Optional[Dict]]:
         """
         Validate a JWT access token
@@ -214,14 +533,22 @@ class CognitoService:
         - Token expiration
         - Token issuer and audience
         
+        Tokens that already passed verification are served from a process-wide
+        cache until their exp, so repeated status checks skip signature work.
+        
         Args:
             access_token: JWT access token to validate
             
         Returns:
             Tuple of (is_valid: bool, claims: Optional[Dict])
         """
+        cached_claims = _verified_tokens.get(self.user_pool_id, self.client_id, access_token)
+        if cached_claims is not None:
+            logger.debug(f"Token validated from cache for user: {cached_claims.get('username')}")
+            return True, cached_claims
+        
         try:
-            # Get the signing key from Cognito's JWKS
+            # Get the signing key from Cognito's JWKS (cached per user pool)
             signing_key = self.jwk_client.get_signing_key_from_jwt(access_token)
             
             # Decode and verify the token
@@ -233,6 +560,8 @@ class CognitoService:
                 issuer=f"https://cognito-idp.{self.region}.amazonaws.com/{self.user_pool_id}"
             )
             
+            _verified_tokens.put(self.user_pool_id, self.client_id, access_token, claims)
+            
             logger.info(f"Token validated successfully for user: {claims.get('username')}")
             return True, claims
             
@@ -427,6 +756,27 @@ class CognitoService:
             logger.error(f"Unexpected error enabling user {employee_id}: {str(e)}")
             return False, f"Unexpected error: {str(e)}"
     
+    @staticmethod
+    def _derive_password(employee_id: str) -> Optional[str]:
+        """
+        Derive the employee's Cognito password from the password secret
+        
+        The password is an HMAC-SHA256 of the employee ID, prefixed so that it
+        always satisfies the user pool password policy.
+        
+        Args:
+            employee_id: Employee identifier
+            
+        Returns:
+            Derived password, or None if no password secret is configured
+        """
+        secret = get_password_secret()
+        if secret is None:
+            return None
+        
+        digest = hmac.new(secret, employee_id.encode('utf-8'), hashlib.sha256).digest()
+        return 'Fa1!' + base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+    
     @staticmethod
     def _generate_secure_password() -> str:
         """
@@ -0,0 +1,117 @@
+"""
+Face-Auth IdP System - Rekognition Collection Routing
+
+This module maps kiosks onto the Rekognition collections (shards) they use:
+- Face login searches every collection routed to the kiosk
+- Enrollment indexes into the kiosk's home collection (the first one routed)
+- Kiosks without a route use the default route
+
+The routing table comes from the COLLECTION_ROUTING environment variable as a
+JSON object of kiosk ID to collection IDs, for example:
+
+    {"default": ["face-auth-employees"],
+     "tokyo-lobby": ["face-auth-tokyo", "face-auth-employees"]}
+
+Without a table every kiosk uses the single REKOGNITION_COLLECTION_ID
+collection, as before sharding.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_ROUTE = 'default'
+
+
+class CollectionRouter:
+    """
+    Routing table from kiosk ID to Rekognition collection IDs
+
+    Handles:
+    - Parsing and validating the routing table
+    - Resolving search and enrollment collections for a kiosk
+    """
+
+    def __init__(self, routes: Dict[str, List[str]], default_collection: str):
+        """
+        Initialize collection router
+
+        Args:
+            routes: Kiosk ID to collection IDs ('default' applies to unrouted kiosks)
+            default_collection: Collection used when no default route is configured
+        """
+        self.routes = {
+            kiosk_id: list(dict.fromkeys(collections))
+            for kiosk_id, collections in routes.items() if collections
+        }
+        self.routes.setdefault(DEFAULT_ROUTE, [default_collection])
+
+    @classmethod
+    def from_environment(cls, default_collection: str) -> 'CollectionRouter':
+        """
+        Build the router from the COLLECTION_ROUTING environment variable
+
+        A malformed table is logged and ignored so that logins fall back to
+        the default collection instead of failing.
+
+        Args:
+            default_collection: Collection used when no default route is configured
+
+        Returns:
+            CollectionRouter
+        """
+        raw_routes = os.environ.get('COLLECTION_ROUTING', '').strip()
+        if not raw_routes:
+            return cls({}, default_collection)
+
+        try:
+            routes = json.loads(raw_routes)
+            if not isinstance(routes, dict) or not all(
+                isinstance(collections, list) and all(isinstance(c, str) for c in collections)
+                for collections in routes.values()
+            ):
+                raise ValueError("expected an object of kiosk ID to a list of collection IDs")
+        except ValueError as e:
+            logger.error(f"Ignoring invalid COLLECTION_ROUTING: {str(e)}")
+            return cls({}, default_collection)
+
+        return cls(routes, default_collection)
+
+    def search_collections(self, kiosk_id: Optional[str] = None) -> List[str]:
+        """
+        Get the collections a kiosk searches
+
+        Args:
+            kiosk_id: Kiosk identifier from the request (default route if not provided)
+
+        Returns:
+            Collection IDs, home collection first
+        """
+        return list(self.routes.get(kiosk_id or DEFAULT_ROUTE, self.routes[DEFAULT_ROUTE]))
+
+    def enrollment_collection(self, kiosk_id: Optional[str] = None) -> str:
+        """
+        Get the collection new enrollments from a kiosk are indexed into
+
+        Args:
+            kiosk_id: Kiosk identifier from the request (default route if not provided)
+
+        Returns:
+            Home collection ID of the kiosk
+        """
+        return self.search_collections(kiosk_id)[0]
+
+    def all_collections(self) -> List[str]:
+        """
+        Get every collection referenced by the routing table
+
+        Returns:
+            Distinct collection IDs
+        """
+        return list(dict.fromkeys(
+            collection for collections in self.routes.values() for collection in collections
+        ))
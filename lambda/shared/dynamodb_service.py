@@ -9,9 +9,15 @@ Requirements: 5.5, 7.4
 
 import boto3
 from boto3.dynamodb.conditions import Key, Attr
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from botocore.exceptions import ClientError
+from typing import Callable, Dict, Iterator, List, Optional, Any, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import logging
+import os
+import queue
+import threading
+import time
 
 from .models import (
     CardTemplate, 
@@ -23,6 +29,287 @@ from .models import (
 
 logger = logging.getLogger(__name__)
 
+# Attributes read by EmployeeFaceRecord.from_dict; bulk scans project onto these
+EMPLOYEE_RECORD_ATTRIBUTES = (
+    'employee_id', 'face_id', 'enrollment_date', 'last_login', 'thumbnail_s3_key',
+    'is_active', 're_enrollment_count', 'face_data', 'face_ids', 'collection_id',
+    'face_image_s3_key'
+)
+
+# Sparse GSI over active employees: only active records carry ACTIVE_INDEX_ATTRIBUTE,
+# so listing them costs reads proportional to active headcount, not table size
+ACTIVE_EMPLOYEES_INDEX = 'ActiveEmployeesIndex'
+ACTIVE_INDEX_ATTRIBUTE = 'active_index'
+ACTIVE_INDEX_VALUE = 'ACTIVE'
+
+# Scan pages buffered per segment worker; bounds memory when the consumer is slower
+SCAN_PAGES_BUFFERED_PER_SEGMENT = 2
+
+# Marks the end of one scan segment in the page queue
+_SEGMENT_DONE = object()
+
+# Reserved CardTemplates item holding the table-wide change stamp. It has no
+# is_active or card_type attribute, so template scans and CardTypeIndex skip it.
+CARD_TEMPLATES_VERSION_KEY = '__templates_version__'
+
+
+class CardTemplateCache:
+    """
+    Warm-container cache of active card templates
+    
+    Card templates change a few times a year, so the CardTemplates scan is
+    served from memory for ttl_seconds. When the TTL lapses the cache reads
+    the table's version stamp (a single get_item) and only re-scans if the
+    stamp moved. Writers bump the stamp via mark_card_templates_changed().
+    
+    Attributes:
+        ttl_seconds: Seconds a loaded template list is served without revalidation
+        hits: Requests served from memory (including successful revalidations)
+        misses: Requests that required a full table scan
+        revalidations: TTL expiries resolved by an unchanged version stamp
+        invalidations: Explicit local invalidations
+    """
+    
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.invalidations = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, table: Any, loader: Callable[[], List[CardTemplate]]) -> List[CardTemplate]:
+        """
+        Return cached templates for a table, loading them on a miss
+        
+        Args:
+            table: boto3 CardTemplates Table resource
+            loader: Callable performing the full active-template scan
+            
+        Returns:
+            List of active CardTemplate instances
+        """
+        table_name = table.table_name
+        
+        with self._lock:
+            entry = self._entries.get(table_name)
+            if entry and time.monotonic() - entry['loaded_at'] < self.ttl_seconds:
+                self.hits += 1
+                return list(entry['templates'])
+        
+        # TTL lapsed or cold: compare the version stamp before paying for a scan
+        version = read_card_templates_version(table)
+        
+        with self._lock:
+            entry = self._entries.get(table_name)
+            if entry and entry['version'] == version:
+                entry['loaded_at'] = time.monotonic()
+                self.hits += 1
+                self.revalidations += 1
+                return list(entry['templates'])
+            self.misses += 1
+        
+        templates = loader()
+        
+        with self._lock:
+            self._entries[table_name] = {
+                'templates': list(templates),
+                'version': version,
+                'loaded_at': time.monotonic()
+            }
+        
+        logger.info(f"Card template cache loaded {len(templates)} templates "
+                   f"from {table_name} (version {version})")
+        return list(templates)
+    
+    def invalidate(self, table_name: Optional[str] = None) -> None:
+        """
+        Drop cached templates for one table (or all tables)
+        
+        Args:
+            table_name: Table to invalidate; None clears every entry
+        """
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(table_name, None)
+            self.invalidations += 1
+    
+    def reset(self) -> None:
+        """Clear all entries and counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.revalidations = 0
+            self.invalidations = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+        
+        Returns:
+            Dictionary with hits, misses, revalidations, invalidations and hit_rate
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'invalidations': self.invalidations,
+                'hit_rate': (self.hits / total) if total else 0.0,
+                'cached_tables': len(self._entries)
+            }
+
+
+# Shared by every DynamoDBService instance in this container
+_card_template_cache = CardTemplateCache(
+    ttl_seconds=float(os.environ.get('CARD_TEMPLATE_CACHE_TTL_SECONDS', '300'))
+)
+
+
+def read_card_templates_version(table: Any) -> int:
+    """
+    Read the CardTemplates change stamp
+    
+    Args:
+        table: boto3 CardTemplates Table resource
+        
+    Returns:
+        Current version number (0 if the stamp was never written)
+    """
+    response = table.get_item(
+        Key={'pattern_id': CARD_TEMPLATES_VERSION_KEY},
+        ProjectionExpression='#version',
+        ExpressionAttributeNames={'#version': 'version'}
+    )
+    return int(response.get('Item', {}).get('version', 0))
+
+
+def mark_card_templates_changed(table: Any) -> int:
+    """
+    Bump the CardTemplates change stamp so warm containers re-scan
+    
+    Must be called by anything that writes card templates outside
+    DynamoDBService (e.g. scripts/register_card_template.py).
+    
+    Args:
+        table: boto3 CardTemplates Table resource
+        
+    Returns:
+        New version number
+    """
+    response = table.update_item(
+        Key={'pattern_id': CARD_TEMPLATES_VERSION_KEY},
+        UpdateExpression='ADD #version :one SET updated_at = :now',
+        ExpressionAttributeNames={'#version': 'version'},
+        ExpressionAttributeValues={
+            ':one': 1,
+            ':now': datetime.now().isoformat()
+        },
+        ReturnValues='UPDATED_NEW'
+    )
+    _card_template_cache.invalidate(table.table_name)
+    return int(response['Attributes']['version'])
+
+
+def get_card_template_cache_stats() -> Dict[str, Any]:
+    """
+    Get hit/miss counters of the container-wide card template cache
+    
+    Returns:
+        Dictionary of cache counters
+    """
+    return _card_template_cache.stats()
+
+
+def reset_card_template_cache() -> None:
+    """Clear the container-wide card template cache (used by tests)"""
+    _card_template_cache.reset()
+
+
+class LastLoginMemo:
+    """
+    Warm-container memo of recent last_login writes
+    
+    During shift-change bursts the same employees log in over and over. The
+    memo remembers when this container last wrote each employee's last_login
+    so that writes within granularity_seconds of it can be skipped without
+    a DynamoDB round trip.
+    
+    Attributes:
+        granularity_seconds: Minimum age of a stored last_login before it is rewritten (0 disables)
+        max_entries: Employees remembered before the oldest entries are dropped
+        skipped: Writes skipped because of the memo
+    """
+    
+    def __init__(self, granularity_seconds: float = 0.0, max_entries: int = 4096):
+        self.granularity_seconds = granularity_seconds
+        self.max_entries = max_entries
+        self.skipped = 0
+        self._written: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+    
+    def is_fresh(self, employee_id: str, login_time: datetime) -> bool:
+        """
+        Check whether this container wrote the employee's last_login recently enough
+        
+        Args:
+            employee_id: Employee identifier
+            login_time: Timestamp of the login being recorded
+        
+        Returns:
+            bool: True if the write can be skipped
+        """
+        if self.granularity_seconds <= 0:
+            return False
+        
+        with self._lock:
+            written = self._written.get(employee_id)
+            fresh = written is not None and \
+                (login_time - written).total_seconds() < self.granularity_seconds
+            if fresh:
+                self.skipped += 1
+            return fresh
+    
+    def record(self, employee_id: str, login_time: datetime) -> None:
+        """
+        Remember a last_login write
+        
+        Args:
+            employee_id: Employee identifier
+            login_time: Timestamp written (or already stored)
+        """
+        if self.granularity_seconds <= 0:
+            return
+        
+        with self._lock:
+            self._written.pop(employee_id, None)
+            self._written[employee_id] = login_time
+            # Dicts keep insertion order, so the first entries are the oldest writes
+            while len(self._written) > self.max_entries:
+                del self._written[next(iter(self._written))]
+    
+    def reset(self) -> None:
+        """Clear all entries and counters"""
+        with self._lock:
+            self._written.clear()
+            self.skipped = 0
+
+
+# Shared by every DynamoDBService instance in this container
+_last_login_memo = LastLoginMemo(
+    granularity_seconds=float(os.environ.get('LAST_LOGIN_GRANULARITY_SECONDS', '0'))
+)
+
+
+def reset_last_login_memo() -> None:
+    """Clear the container-wide last_login memo (used by tests)"""
+    _last_login_memo.reset()
+
 
 class DynamoDBService:
     """
@@ -34,14 +321,15 @@ class DynamoDBService:
     - AuthSessions table
     """
     
-    def __init__(self, region_name: str = 'us-east-1'):
+    def __init__(self, region_name: str = 'us-east-1', dynamodb_resource: Optional[Any] = None):
         """
         Initialize DynamoDB service
         
         Args:
             region_name: AWS region name
+            dynamodb_resource: Boto3 DynamoDB service resource (optional, created if not provided)
         """
-        self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
+        self.dynamodb = dynamodb_resource or boto3.resource('dynamodb', region_name=region_name)
         self.card_templates_table = None
         self.employee_faces_table = None
         self.auth_sessions_table = None
@@ -86,28 +374,62 @@ class DynamoDBService:
             logger.error(f"Error retrieving card template {pattern_id}: {str(e)}")
             raise
     
-    def get_active_card_templates(self) -> List[CardTemplate]:
+    def get_active_card_templates(self, use_cache: bool = True) -> List[CardTemplate]:
         """
         Retrieve all active card templates
         
+        Served from the container-wide CardTemplateCache unless use_cache is False.
+        
+        Args:
+            use_cache: Whether to use the warm-container template cache
+            
+        Returns:
+            List of active CardTemplate instances
+        """
+        if use_cache:
+            try:
+                return _card_template_cache.get(
+                    self.card_templates_table, self._scan_active_card_templates
+                )
+            except Exception as e:
+                logger.error(f"Error retrieving active card templates: {str(e)}")
+                raise
+        
+        return self._scan_active_card_templates()
+    
+    def _scan_active_card_templates(self) -> List[CardTemplate]:
+        """
+        Scan the CardTemplates table for active templates
+        
         Returns:
             List of active CardTemplate instances
         """
         try:
-            response = self.card_templates_table.scan(
-                FilterExpression=Attr('is_active').eq(True)
-            )
-            
-            templates = []
-            for item in response['Items']:
-                templates.append(CardTemplate.from_dict(item))
-                
-            return templates
+            return [
+                CardTemplate.from_dict(item)
+                for item in self.scan_items(self.card_templates_table,
+                                            filter_expression=Attr('is_active').eq(True))
+            ]
             
         except Exception as e:
             logger.error(f"Error retrieving active card templates: {str(e)}")
             raise
     
+    def invalidate_card_template_cache(self) -> int:
+        """
+        Mark card templates as changed for every warm container
+        
+        Returns:
+            New CardTemplates version number
+        """
+        try:
+            version = mark_card_templates_changed(self.card_templates_table)
+            logger.info(f"Card templates version bumped to {version}")
+            return version
+        except Exception as e:
+            logger.error(f"Error invalidating card template cache: {str(e)}")
+            raise
+    
     def get_templates_by_card_type(self, card_type: str) -> List[CardTemplate]:
         """
         Retrieve card templates by card type using GSI
@@ -150,6 +472,7 @@ class DynamoDBService:
                 Item=template.to_dict(),
                 ConditionExpression=Attr('pattern_id').not_exists()
             )
+            self.invalidate_card_template_cache()
             return True
             
         except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
@@ -174,6 +497,7 @@ class DynamoDBService:
                 Item=template.to_dict(),
                 ConditionExpression=Attr('pattern_id').exists()
             )
+            self.invalidate_card_template_cache()
             return True
             
         except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
@@ -244,7 +568,7 @@ class DynamoDBService:
         """
         try:
             self.employee_faces_table.put_item(
-                Item=record.to_dict(),
+                Item=_with_active_index(record),
                 ConditionExpression=Attr('employee_id').not_exists()
             )
             return True
@@ -268,7 +592,7 @@ class DynamoDBService:
         """
         try:
             self.employee_faces_table.put_item(
-                Item=record.to_dict(),
+                Item=_with_active_index(record),
                 ConditionExpression=Attr('employee_id').exists()
             )
             return True
@@ -280,17 +604,33 @@ class DynamoDBService:
             logger.error(f"Error updating employee face record {record.employee_id}: {str(e)}")
             raise
     
-    def update_last_login(self, employee_id: str, login_time: datetime) -> bool:
+    def update_last_login(self, employee_id: str, login_time: datetime,
+                          granularity_seconds: Optional[float] = None) -> bool:
         """
         Update the last login timestamp for an employee
         
+        In coalescing mode (granularity_seconds > 0) the write is skipped when
+        this container wrote the employee's last_login within the granularity,
+        and made conditional on the stored value being older than that
+        otherwise, so each employee costs at most one write per window.
+        
         Args:
             employee_id: Employee identifier
             login_time: Login timestamp
+            granularity_seconds: Coalescing window (LAST_LOGIN_GRANULARITY_SECONDS if not provided, 0 disables)
             
         Returns:
-            bool: True if successful
+            bool: True if last_login is current to within the granularity
         """
+        memo = _last_login_memo if granularity_seconds is None else LastLoginMemo(granularity_seconds)
+        if memo.is_fresh(employee_id, login_time):
+            return True
+        
+        condition = Attr('employee_id').exists()
+        if memo.granularity_seconds > 0:
+            cutoff = login_time - timedelta(seconds=memo.granularity_seconds)
+            condition = condition & (Attr('last_login').not_exists() | Attr('last_login').lt(cutoff.isoformat()))
+        
         try:
             self.employee_faces_table.update_item(
                 Key={'employee_id': employee_id},
@@ -298,11 +638,17 @@ class DynamoDBService:
                 ExpressionAttributeValues={
                     ':login_time': login_time.isoformat()
                 },
-                ConditionExpression=Attr('employee_id').exists()
+                ConditionExpression=condition,
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
             )
+            memo.record(employee_id, login_time)
             return True
             
-        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+            if 'Item' in e.response:
+                # Another container wrote a recent enough last_login
+                memo.record(employee_id, login_time)
+                return True
             logger.warning(f"Employee {employee_id} not found for login update")
             return False
         except Exception as e:
@@ -322,7 +668,7 @@ class DynamoDBService:
         try:
             self.employee_faces_table.update_item(
                 Key={'employee_id': employee_id},
-                UpdateExpression='SET is_active = :inactive',
+                UpdateExpression=f'SET is_active = :inactive REMOVE {ACTIVE_INDEX_ATTRIBUTE}',
                 ExpressionAttributeValues={
                     ':inactive': False
                 },
@@ -341,24 +687,166 @@ class DynamoDBService:
         """
         Retrieve all active employee face records
         
+        Loads every record into memory; bulk jobs should stream with
+        iter_active_employees() instead.
+        
         Returns:
             List of active EmployeeFaceRecord instances
         """
         try:
-            response = self.employee_faces_table.scan(
-                FilterExpression=Attr('is_active').eq(True)
-            )
-            
-            records = []
-            for item in response['Items']:
-                records.append(EmployeeFaceRecord.from_dict(item))
-                
-            return records
+            return list(self.iter_active_employees())
             
         except Exception as e:
             logger.error(f"Error retrieving active employees: {str(e)}")
             raise
     
+    def iter_active_employees(self, total_segments: int = 1, page_size: Optional[int] = None,
+                              use_index: bool = True) -> Iterator[EmployeeFaceRecord]:
+        """
+        Stream active employee face records
+        
+        Queries the sparse ActiveEmployeesIndex. Without the index (use_index
+        False, or the index not deployed yet) the table is scanned instead.
+        
+        Args:
+            total_segments: Parallel scan segments for the scan path (1 scans sequentially)
+            page_size: Items read per request (DynamoDB's 1MB pages if not provided)
+            use_index: Query ActiveEmployeesIndex instead of scanning the table
+            
+        Yields:
+            EmployeeFaceRecord instances, in no particular order
+        """
+        if use_index:
+            try:
+                items = self.query_items(self.employee_faces_table, ACTIVE_EMPLOYEES_INDEX,
+                                         Key(ACTIVE_INDEX_ATTRIBUTE).eq(ACTIVE_INDEX_VALUE),
+                                         attributes=EMPLOYEE_RECORD_ATTRIBUTES, page_size=page_size)
+                first = next(items, None)
+            except ClientError as e:
+                # Any other error, e.g. a malformed key condition, must not turn into a full scan
+                if not _is_missing_index_error(e, ACTIVE_EMPLOYEES_INDEX):
+                    raise
+                logger.warning(f"{ACTIVE_EMPLOYEES_INDEX} unavailable, scanning for active employees: {str(e)}")
+            else:
+                if first is not None:
+                    yield EmployeeFaceRecord.from_dict(first)
+                    for item in items:
+                        yield EmployeeFaceRecord.from_dict(item)
+                return
+        
+        for item in self.scan_items(self.employee_faces_table,
+                                    filter_expression=Attr('is_active').eq(True),
+                                    attributes=EMPLOYEE_RECORD_ATTRIBUTES,
+                                    total_segments=total_segments, page_size=page_size):
+            yield EmployeeFaceRecord.from_dict(item)
+    
+    # Bulk reads
+    
+    def scan_items(self, table: Any, filter_expression: Optional[Any] = None,
+                   attributes: Optional[Sequence[str]] = None, total_segments: int = 1,
+                   page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every item of a table, following LastEvaluatedKey
+        
+        With total_segments > 1 the segments are scanned in parallel on a
+        thread pool. Each worker buffers at most SCAN_PAGES_BUFFERED_PER_SEGMENT
+        pages, so memory stays bounded however large the table is. Closing the
+        generator early stops the workers after their current page.
+        
+        Args:
+            table: boto3 Table resource
+            filter_expression: boto3 condition applied to each page
+            attributes: Attributes to return (ProjectionExpression; all if not provided)
+            total_segments: Parallel scan segments (1 scans sequentially)
+            page_size: Items evaluated per Scan request (DynamoDB's 1MB pages if not provided)
+            
+        Yields:
+            Items as dictionaries, in no particular order
+        """
+        params = _read_params(table, attributes, page_size)
+        if filter_expression is not None:
+            params['FilterExpression'] = filter_expression
+        
+        if total_segments <= 1:
+            for page in self._scan_pages(params):
+                yield from page
+            return
+        
+        pages: queue.Queue = queue.Queue(maxsize=total_segments * SCAN_PAGES_BUFFERED_PER_SEGMENT)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=total_segments, thread_name_prefix='scan-segment')
+        for segment in range(total_segments):
+            executor.submit(self._scan_segment,
+                            dict(params, Segment=segment, TotalSegments=total_segments), pages, stop)
+        
+        try:
+            remaining = total_segments
+            while remaining:
+                page = pages.get()
+                if page is _SEGMENT_DONE:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield from page
+        finally:
+            stop.set()
+            executor.shutdown(wait=False)
+    
+    def query_items(self, table: Any, index_name: str, key_condition: Any,
+                    attributes: Optional[Sequence[str]] = None,
+                    page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every item of an index partition, following LastEvaluatedKey
+        
+        Args:
+            table: boto3 Table resource
+            index_name: Secondary index to query
+            key_condition: boto3 key condition
+            attributes: Attributes to return (ProjectionExpression; all if not provided)
+            page_size: Items read per Query request (DynamoDB's 1MB pages if not provided)
+            
+        Yields:
+            Items as dictionaries
+        """
+        params = _read_params(table, attributes, page_size)
+        params['IndexName'] = index_name
+        params['KeyConditionExpression'] = key_condition
+        
+        for page in self._read_pages('query', params):
+            yield from page
+    
+    def _scan_pages(self, params: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """Page through one Scan (or one segment of a parallel Scan)"""
+        return self._read_pages('scan', params)
+    
+    def _read_pages(self, operation: str, params: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        """Page through a Scan or Query"""
+        # The resource's client is thread-safe and deserializes items, unlike Table resources
+        client = self.dynamodb.meta.client
+        request = dict(params)
+        if 'ExpressionAttributeNames' in request:
+            # boto3 merges the filter's placeholders into this dict; keep segments apart
+            request['ExpressionAttributeNames'] = dict(request['ExpressionAttributeNames'])
+        while True:
+            response = getattr(client, operation)(**request)
+            yield response.get('Items', [])
+            if 'LastEvaluatedKey' not in response:
+                return
+            request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
+    def _scan_segment(self, params: Dict[str, Any], pages: queue.Queue, stop: threading.Event) -> None:
+        """Scan one segment into the page queue until done or stopped"""
+        try:
+            for page in self._scan_pages(params):
+                if not _put_until_stopped(pages, page, stop):
+                    return
+        except Exception as e:
+            logger.error(f"Error scanning segment {params['Segment']} of {params['TableName']}: {str(e)}")
+            _put_until_stopped(pages, e, stop)
+        finally:
+            _put_until_stopped(pages, _SEGMENT_DONE, stop)
+    
     # AuthSessions table operations
     
     def create_auth_session(self, session: AuthenticationSession) -> bool:
@@ -381,6 +869,62 @@ class DynamoDBService:
             logger.error(f"Error creating auth session {session.session_id}: {str(e)}")
             raise
     
+    def authorize_login(self, employee_id: str, login_time: datetime) -> bool:
+        """
+        Stamp an employee's last_login, conditional on the employee being active
+        
+        Called before any token is issued: the conditional write is the
+        is_active gate, so no separate read of the EmployeeFaces record is
+        needed. In coalescing mode a last_login this container wrote within
+        LAST_LOGIN_GRANULARITY_SECONDS is not rewritten (is_active is then
+        checked with a consistent read), and a recent enough value written by
+        another container is left as it is.
+        
+        Args:
+            employee_id: Employee identifier
+            login_time: Login timestamp
+            
+        Returns:
+            bool: True if the employee is active, False if missing or inactive
+        """
+        try:
+            if _last_login_memo.is_fresh(employee_id, login_time):
+                response = self.employee_faces_table.get_item(
+                    Key={'employee_id': employee_id},
+                    ProjectionExpression='is_active',
+                    ConsistentRead=True
+                )
+                return response.get('Item', {}).get('is_active') is True
+            
+            condition = Attr('is_active').eq(True)
+            if _last_login_memo.granularity_seconds > 0:
+                cutoff = login_time - timedelta(seconds=_last_login_memo.granularity_seconds)
+                condition = condition & (Attr('last_login').not_exists() | Attr('last_login').lt(cutoff.isoformat()))
+            
+            self.employee_faces_table.update_item(
+                Key={'employee_id': employee_id},
+                UpdateExpression='SET last_login = :login_time',
+                ExpressionAttributeValues={
+                    ':login_time': login_time.isoformat()
+                },
+                ConditionExpression=condition,
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            _last_login_memo.record(employee_id, login_time)
+            return True
+            
+        except self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException as e:
+            # The old item comes back in the low-level attribute format
+            if e.response.get('Item', {}).get('is_active') == {'BOOL': True}:
+                # Active, and another container wrote a recent enough last_login
+                _last_login_memo.record(employee_id, login_time)
+                return True
+            logger.warning(f"Employee {employee_id} not found or inactive for login")
+            return False
+        except Exception as e:
+            logger.error(f"Error authorizing login for {employee_id}: {str(e)}")
+            raise
+    
     def get_auth_session(self, session_id: str) -> Optional[AuthenticationSession]:
         """
         Retrieve authentication session by session ID
@@ -427,6 +971,67 @@ class DynamoDBService:
 
 # Utility functions for DynamoDB operations
 
+def _with_active_index(record: EmployeeFaceRecord) -> Dict[str, Any]:
+    """
+    Build an EmployeeFaces item, keyed into ActiveEmployeesIndex only while active
+    
+    Args:
+        record: EmployeeFaceRecord instance
+        
+    Returns:
+        Item dictionary for put_item
+    """
+    item = record.to_dict()
+    if record.is_active:
+        item[ACTIVE_INDEX_ATTRIBUTE] = ACTIVE_INDEX_VALUE
+    return item
+
+
+def _read_params(table: Any, attributes: Optional[Sequence[str]],
+                 page_size: Optional[int]) -> Dict[str, Any]:
+    """Common Scan/Query parameters: table, projection and page size"""
+    params: Dict[str, Any] = {'TableName': table.name}
+    if attributes:
+        names = {f"#p{index}": attribute for index, attribute in enumerate(attributes)}
+        params['ProjectionExpression'] = ', '.join(names)
+        params['ExpressionAttributeNames'] = names
+    if page_size:
+        params['Limit'] = page_size
+    return params
+
+
+def _is_missing_index_error(error: ClientError, index_name: str) -> bool:
+    """
+    Check whether a Query failed because the table has no such index
+    
+    DynamoDB reports it as a ValidationException ("The table does not have
+    the specified index: ..."), moto as a ResourceNotFoundException; both
+    messages name the index.
+    
+    Returns:
+        bool: True if index_name is missing from the table
+    """
+    details = error.response.get('Error', {})
+    return details.get('Code') in ('ValidationException', 'ResourceNotFoundException') and \
+        index_name in details.get('Message', '')
+
+
+def _put_until_stopped(pages: queue.Queue, value: Any, stop: threading.Event) -> bool:
+    """
+    Put a value on a bounded queue, giving up once the consumer has stopped
+    
+    Returns:
+        bool: True if the value was queued
+    """
+    while not stop.is_set():
+        try:
+            pages.put(value, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
 def create_default_card_templates(db_service: DynamoDBService) -> List[CardTemplate]:
     """
     Create default card templates for common ID card formats
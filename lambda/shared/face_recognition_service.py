@@ -13,20 +13,37 @@ Requirements: 2.1, 2.2, 6.1, 6.2, 6.4
 
 import boto3
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+from itertools import islice
 from datetime import datetime
 from decimal import Decimal
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from .models import (
     FaceData,
     ErrorResponse,
     ErrorCodes
 )
+from .image_probe import sniff_format
+from .timeout_manager import is_timeout_error
 
 logger = logging.getLogger(__name__)
 
 
+# Face attributes requested from Rekognition, by profile. DEFAULT (bounding box,
+# confidence, landmarks, pose and quality) is the smallest set the API returns;
+# ALL adds emotions, age range, gender and more, which we never read and which
+# make DetectFaces/IndexFaces noticeably slower.
+ATTRIBUTE_PROFILES = {
+    'presence-only': ['DEFAULT'],
+    'quality': ['DEFAULT', 'FACE_OCCLUDED', 'EYES_OPEN'],
+    'full': ['ALL']
+}
+
+
 class LivenessResult:
     """
     Result of liveness detection operation
@@ -99,19 +116,41 @@ class FaceRecognitionService:
     COLLECTION_ID = "face-auth-employees"
     CONFIDENCE_THRESHOLD = 90.0  # Minimum confidence for liveness detection
     FACE_MATCH_THRESHOLD = 90.0  # Minimum similarity for face matching
+    # Minimum similarity for 1:1 verification of a claimed identity (badge-tap kiosks)
+    VERIFY_SIMILARITY_THRESHOLD = float(os.environ.get('FACE_VERIFY_THRESHOLD', '95.0'))
     MAX_FACES = 1  # Maximum faces to detect in an image
+    MIN_FACE_BRIGHTNESS = 40.0  # Minimum FaceDetail quality accepted for enrollment
+    MIN_FACE_SHARPNESS = 40.0
+    LIST_FACES_PAGE_SIZE = 4096  # ListFaces MaxResults limit
+    DELETE_FACES_BATCH_SIZE = 4096  # DeleteFaces FaceIds limit
+    MAX_FACES_PER_USER = 100  # AssociateFaces limit per Rekognition user
+    USER_MATCH_THRESHOLD = 80.0  # Minimum similarity to the user's existing faces when associating
+    SEARCH_MODES = ('users', 'faces')
+    MAX_SEARCH_MATCHES = 10  # Top matches returned by a search
+    FAN_OUT_MAX_WORKERS = int(os.environ.get('COLLECTION_SEARCH_WORKERS', '8'))
     
-    def __init__(self, region_name: str = 'us-east-1', collection_id: Optional[str] = None):
+    def __init__(self, region_name: str = 'us-east-1', collection_id: Optional[str] = None,
+                 rekognition_client: Optional[Any] = None, search_mode: Optional[str] = None):
         """
         Initialize Face Recognition service
         
         Args:
             region_name: AWS region name
             collection_id: Custom collection ID (uses default if not provided)
+            rekognition_client: Boto3 Rekognition client (optional, created if not provided)
+            search_mode: 'users' searches Rekognition users (SearchUsersByImage),
+                'faces' searches individual face vectors (FACE_SEARCH_MODE env, default 'faces'
+                until every employee has a user, see scripts/backfill_rekognition_users.py)
         """
-        self.rekognition = boto3.client('rekognition', region_name=region_name)
+        search_mode = search_mode or os.environ.get('FACE_SEARCH_MODE', 'faces')
+        if search_mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unknown face search mode: {search_mode}")
+        self.search_mode = search_mode
+        self.rekognition = rekognition_client or boto3.client('rekognition', region_name=region_name)
         self.collection_id = collection_id or self.COLLECTION_ID
         self.region_name = region_name
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         
         logger.info(f"Initialized FaceRecognitionService with collection: {self.collection_id}")
     
@@ -177,7 +216,8 @@ class FaceRecognitionService:
             return False, error_msg
     
     def detect_liveness(self, image_bytes: bytes, 
-                       request_id: str = None) -> Tuple[Optional[LivenessResult], Optional[ErrorResponse]]:
+                       request_id: str = None,
+                       attribute_profile: str = 'full') -> Tuple[Optional[LivenessResult], Optional[ErrorResponse]]:
         """
         Detect liveness using Amazon Rekognition face detection
         
@@ -192,6 +232,8 @@ class FaceRecognitionService:
         Args:
             image_bytes: Face image data as bytes
             request_id: Request identifier for error tracking
+            attribute_profile: Face attributes to request (see ATTRIBUTE_PROFILES);
+                the checks here only need 'presence-only'
             
         Returns:
             Tuple of (LivenessResult or None, ErrorResponse or None)
@@ -202,7 +244,7 @@ class FaceRecognitionService:
             # Detect faces with quality attributes
             response = self.rekognition.detect_faces(
                 Image={'Bytes': image_bytes},
-                Attributes=['ALL']  # Get all face attributes for quality assessment
+                Attributes=self._attributes(attribute_profile)
             )
             
             # Check if any faces were detected
@@ -282,7 +324,50 @@ class FaceRecognitionService:
                 request_id=request_id or "unknown"
             )
     
-    def detect_faces(self, image_bytes: bytes) -> Optional[List[Dict[str, Any]]]:
+    @staticmethod
+    def _image_param(image_bytes: Optional[bytes] = None,
+                     s3_object: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Build the Rekognition Image parameter
+        
+        Args:
+            image_bytes: Face image data as bytes
+            s3_object: {'Bucket': ..., 'Name': ...} of an image already in S3
+            
+        Returns:
+            Image parameter for Rekognition APIs
+            
+        Raises:
+            ValueError: If neither image source is provided
+        """
+        if s3_object:
+            return {'S3Object': dict(s3_object)}
+        if image_bytes:
+            return {'Bytes': image_bytes}
+        raise ValueError("Either image_bytes or s3_object is required")
+    
+    @staticmethod
+    def _attributes(attribute_profile: str) -> List[str]:
+        """
+        Resolve an attribute profile name to the Rekognition attribute list
+        
+        Args:
+            attribute_profile: 'presence-only', 'quality' or 'full'
+            
+        Returns:
+            Attributes/DetectionAttributes parameter value
+            
+        Raises:
+            ValueError: If the profile is unknown
+        """
+        try:
+            return list(ATTRIBUTE_PROFILES[attribute_profile])
+        except KeyError:
+            raise ValueError(f"Unknown attribute profile: {attribute_profile}")
+    
+    def detect_faces(self, image_bytes: Optional[bytes] = None,
+                     s3_object: Optional[Dict[str, str]] = None,
+                     attribute_profile: str = 'full') -> Optional[List[Dict[str, Any]]]:
         """
         Detect faces in an image without liveness check
         
@@ -291,6 +376,8 @@ class FaceRecognitionService:
         
         Args:
             image_bytes: Face image data as bytes
+            s3_object: S3 reference used instead of image_bytes (e.g. Liveness reference image)
+            attribute_profile: Face attributes to request (see ATTRIBUTE_PROFILES)
             
         Returns:
             List of face details dictionaries, or None if no faces detected
@@ -301,8 +388,8 @@ class FaceRecognitionService:
             logger.info("Detecting faces in image")
             
             response = self.rekognition.detect_faces(
-                Image={'Bytes': image_bytes},
-                Attributes=['ALL']
+                Image=self._image_param(image_bytes, s3_object),
+                Attributes=self._attributes(attribute_profile)
             )
             
             face_details = response.get('FaceDetails', [])
@@ -318,38 +405,47 @@ class FaceRecognitionService:
             logger.error(f"Error detecting faces: {str(e)}", exc_info=True)
             return None
     
-    def search_faces(self, image_bytes: bytes, 
-                    request_id: str = None) -> Tuple[Optional[List[FaceMatch]], Optional[ErrorResponse]]:
+    def search_faces(self, image_bytes: Optional[bytes] = None, 
+                    request_id: str = None,
+                    s3_object: Optional[Dict[str, str]] = None,
+                    collection_ids: Optional[List[str]] = None,
+                    timeout_seconds: Optional[float] = None) -> Tuple[Optional[List[FaceMatch]], Optional[ErrorResponse]]:
         """
         Search for matching faces in the collection (1:N matching)
         
         This method:
-        1. Searches the collection for faces matching the input image
+        1. Searches the collection for faces matching the input image. In
+           'users' mode one SearchUsersByImage call matches against all face
+           vectors associated with each employee's user; in 'faces' mode
+           individual face vectors are searched.
         2. Filters results by similarity threshold (90%)
         3. Returns list of matches sorted by similarity
         
+        With several collection_ids the shards are searched concurrently and
+        their matches merged; shards that have not answered when
+        timeout_seconds runs out are left out of the result.
+        
         Args:
             image_bytes: Face image data as bytes
             request_id: Request identifier for error tracking
+            s3_object: S3 reference used instead of image_bytes (e.g. Liveness reference image)
+            collection_ids: Collections to search (this service's collection if not provided)
+            timeout_seconds: Deadline for a multi-collection search (no deadline if not provided)
             
         Returns:
             Tuple of (List of FaceMatch or None, ErrorResponse or None)
         """
         try:
-            logger.info(f"Searching faces in collection: {self.collection_id}")
-            
-            # Search for faces in the collection
-            response = self.rekognition.search_faces_by_image(
-                CollectionId=self.collection_id,
-                Image={'Bytes': image_bytes},
-                FaceMatchThreshold=self.FACE_MATCH_THRESHOLD,
-                MaxFaces=10  # Return top 10 matches
-            )
+            collection_ids = collection_ids or [self.collection_id]
+            logger.info(f"Searching {self.search_mode} in collection(s): {', '.join(collection_ids)}")
             
-            # Check if any matches were found
-            face_matches = response.get('FaceMatches', [])
+            image = self._image_param(image_bytes, s3_object)
+            if len(collection_ids) > 1:
+                matches = self._fan_out_search(image, collection_ids, timeout_seconds)
+            else:
+                matches = self._search_collection(image, collection_ids[0])
             
-            if not face_matches:
+            if not matches:
                 logger.info("No matching faces found")
                 return None, ErrorResponse(
                     error_code=ErrorCodes.FACE_NOT_FOUND,
@@ -359,23 +455,6 @@ class FaceRecognitionService:
                     request_id=request_id or "unknown"
                 )
             
-            # Convert to FaceMatch objects
-            matches = []
-            for match in face_matches:
-                face = match['Face']
-                similarity = match['Similarity']
-                
-                face_match = FaceMatch(
-                    face_id=face['FaceId'],
-                    employee_id=face.get('ExternalImageId', ''),
-                    similarity=similarity,
-                    confidence=face.get('Confidence', 0.0)
-                )
-                matches.append(face_match)
-                
-                logger.debug(f"Match found - Employee: {face_match.employee_id}, "
-                           f"Similarity: {similarity}, Confidence: {face_match.confidence}")
-            
             # Sort by similarity (highest first)
             matches.sort(key=lambda x: x.similarity, reverse=True)
             
@@ -385,15 +464,19 @@ class FaceRecognitionService:
             return matches, None
             
         except Exception as e:
+            if is_timeout_error(e):
+                # Out of time: the handler answers 408 instead of reporting a failed match
+                raise
+            
             # Check for specific AWS exceptions
             error_code = getattr(e, 'response', {}).get('Error', {}).get('Code', '')
             
             if error_code == 'ResourceNotFoundException' or 'ResourceNotFoundException' in str(type(e)):
-                logger.error(f"Collection {self.collection_id} not found")
+                logger.error(f"Collection {', '.join(collection_ids)} not found")
                 return None, ErrorResponse(
                     error_code=ErrorCodes.GENERIC_ERROR,
                     user_message="밝은 곳에서 다시 시도해주세요",
-                    system_reason=f"Collection {self.collection_id} not found",
+                    system_reason=f"Collection {', '.join(collection_ids)} not found",
                     timestamp=datetime.now(),
                     request_id=request_id or "unknown"
                 )
@@ -416,8 +499,263 @@ class FaceRecognitionService:
                     request_id=request_id or "unknown"
                 )
     
-    def index_face(self, image_bytes: bytes, employee_id: str, 
-                  request_id: str = None) -> Tuple[Optional[FaceData], Optional[ErrorResponse]]:
+    def verify_face(self, employee_id: str, enrolled_image: Dict[str, str],
+                    image_bytes: Optional[bytes] = None, request_id: str = None,
+                    s3_object: Optional[Dict[str, str]] = None,
+                    face_id: str = '') -> Tuple[Optional[FaceMatch], Optional[str]]:
+        """
+        Verify a face against one claimed employee (1:1 matching)
+        
+        Rekognition can only score a probe image against stored face vectors
+        through a collection search, so the probe is compared with the
+        employee's full-resolution enrollment image instead (CompareFaces). No
+        collection is touched and the stricter VERIFY_SIMILARITY_THRESHOLD applies.
+        
+        Args:
+            employee_id: Claimed employee identifier
+            enrolled_image: S3 reference of the employee's full-resolution enrollment
+                image (EmployeeFaceRecord.face_image_s3_key, not the thumbnail)
+            image_bytes: Face image data as bytes
+            request_id: Request identifier for log correlation
+            s3_object: S3 reference used instead of image_bytes (e.g. Liveness reference image)
+            face_id: Enrolled face ID reported on the match
+            
+        Returns:
+            Tuple of (FaceMatch or None, error reason or None). (None, None) means
+            the faces were compared and do not belong to the same person; an error
+            reason means no verdict could be reached.
+        """
+        try:
+            response = self.rekognition.compare_faces(
+                SourceImage=self._image_param(image_bytes, s3_object),
+                TargetImage={'S3Object': dict(enrolled_image)},
+                SimilarityThreshold=self.VERIFY_SIMILARITY_THRESHOLD,
+                QualityFilter='AUTO'
+            )
+        except Exception as e:
+            logger.warning(f"Face verification for employee {employee_id} failed "
+                           f"(request {request_id}): {str(e)}")
+            return None, f"Face verification error: {str(e)}"
+        
+        face_matches = response.get('FaceMatches', [])
+        if not face_matches:
+            logger.info(f"Face does not match claimed employee {employee_id}")
+            return None, None
+        
+        best_match = max(face_matches, key=lambda match: match['Similarity'])
+        logger.info(f"Face verified for employee {employee_id} ({best_match['Similarity']}%)")
+        
+        return FaceMatch(
+            face_id=face_id,
+            employee_id=employee_id,
+            similarity=best_match['Similarity'],
+            confidence=response.get('SourceImageFace', {}).get('Confidence', 0.0)
+        ), None
+    
+    def _search_collection(self, image: Dict[str, Any], collection_id: str) -> List[FaceMatch]:
+        """Search one collection in the configured search mode"""
+        if self.search_mode == 'users':
+            return self._search_users(image, collection_id)
+        return self._search_face_vectors(image, collection_id)
+    
+    def _fan_out_search(self, image: Dict[str, Any], collection_ids: List[str],
+                        timeout_seconds: Optional[float]) -> List[FaceMatch]:
+        """
+        Search several collections concurrently and merge their matches
+        
+        A shard that fails or misses the deadline is logged and skipped, so a
+        throttled or slow shard costs recall on that shard only. If no shard
+        produced a result at all, the first error is raised (or TimeoutError
+        when none answered in time).
+        """
+        futures = {
+            self._search_executor().submit(self._search_collection, image, collection_id): collection_id
+            for collection_id in collection_ids
+        }
+        done, not_done = wait(futures, timeout=timeout_seconds)
+        
+        for future in not_done:
+            future.cancel()
+            logger.warning(f"Collection {futures[future]} did not answer within {timeout_seconds}s")
+        
+        matches = []
+        errors = []
+        for future in done:
+            try:
+                matches.extend(future.result())
+            except Exception as e:
+                logger.warning(f"Search in collection {futures[future]} failed: {str(e)}")
+                errors.append(e)
+        
+        if errors and len(errors) == len(done):
+            raise errors[0]
+        if not done:
+            raise TimeoutError(f"No collection answered within {timeout_seconds}s")
+        
+        return sorted(matches, key=lambda match: match.similarity, reverse=True)[:self.MAX_SEARCH_MATCHES]
+    
+    def _search_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for fan-out searches, kept for the life of the container"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.FAN_OUT_MAX_WORKERS,
+                                                    thread_name_prefix='collection-search')
+            return self._executor
+    
+    def _search_face_vectors(self, image: Dict[str, Any], collection_id: str) -> List[FaceMatch]:
+        """Run SearchFacesByImage and map the individual face matches"""
+        response = self.rekognition.search_faces_by_image(
+            CollectionId=collection_id,
+            Image=image,
+            FaceMatchThreshold=self.FACE_MATCH_THRESHOLD,
+            MaxFaces=self.MAX_SEARCH_MATCHES
+        )
+        
+        matches = []
+        for match in response.get('FaceMatches', []):
+            face = match['Face']
+            matches.append(FaceMatch(
+                face_id=face['FaceId'],
+                employee_id=face.get('ExternalImageId', ''),
+                similarity=match['Similarity'],
+                confidence=face.get('Confidence', 0.0)
+            ))
+        return matches
+    
+    def _search_users(self, image: Dict[str, Any], collection_id: str) -> List[FaceMatch]:
+        """
+        Run SearchUsersByImage and map the user matches
+        
+        Each match is scored against all face vectors associated with the
+        employee's user, so face_id is left empty.
+        """
+        response = self.rekognition.search_users_by_image(
+            CollectionId=collection_id,
+            Image=image,
+            UserMatchThreshold=self.FACE_MATCH_THRESHOLD,
+            MaxUsers=self.MAX_SEARCH_MATCHES
+        )
+        
+        searched_face = response.get('SearchedFace', {}).get('FaceDetail', {})
+        matches = []
+        for match in response.get('UserMatches', []):
+            matches.append(FaceMatch(
+                face_id='',
+                employee_id=match['User']['UserId'],
+                similarity=match['Similarity'],
+                confidence=searched_face.get('Confidence', 0.0)
+            ))
+        return matches
+    
+    def create_user(self, employee_id: str) -> bool:
+        """
+        Create the Rekognition user that aggregates an employee's face vectors
+        
+        An existing user with the same id is reused.
+        
+        Args:
+            employee_id: Employee ID, used as the Rekognition UserId
+            
+        Returns:
+            True if the user exists after the call, False otherwise
+        """
+        try:
+            self.rekognition.create_user(
+                CollectionId=self.collection_id,
+                UserId=employee_id,
+                ClientRequestToken=f"create-user-{employee_id}"
+            )
+            logger.info(f"Created Rekognition user {employee_id}")
+            return True
+        except Exception as e:
+            error_code = getattr(e, 'response', {}).get('Error', {}).get('Code', '')
+            if error_code == 'ConflictException':
+                logger.info(f"Rekognition user {employee_id} already exists")
+                return True
+            logger.error(f"Error creating Rekognition user {employee_id}: {str(e)}")
+            return False
+    
+    def associate_faces(self, employee_id: str, face_ids: List[str]) -> List[str]:
+        """
+        Associate indexed faces with an employee's Rekognition user
+        
+        Args:
+            employee_id: Employee ID (Rekognition UserId)
+            face_ids: Face IDs to associate (at most MAX_FACES_PER_USER in total per user)
+            
+        Returns:
+            Face IDs that were associated
+        """
+        if not face_ids:
+            return []
+        
+        try:
+            response = self.rekognition.associate_faces(
+                CollectionId=self.collection_id,
+                UserId=employee_id,
+                FaceIds=face_ids[:self.MAX_FACES_PER_USER],
+                UserMatchThreshold=self.USER_MATCH_THRESHOLD
+            )
+        except Exception as e:
+            logger.error(f"Error associating faces with user {employee_id}: {str(e)}")
+            return []
+        
+        associated = [face['FaceId'] for face in response.get('AssociatedFaces', [])]
+        for face in response.get('UnsuccessfulFaceAssociations', []):
+            logger.warning(f"Face {face.get('FaceId')} not associated with user {employee_id}: "
+                           f"{', '.join(face.get('Reasons', []))}")
+        
+        logger.info(f"Associated {len(associated)} face(s) with user {employee_id}")
+        return associated
+    
+    def disassociate_faces(self, employee_id: str, face_ids: List[str]) -> int:
+        """
+        Remove faces from an employee's Rekognition user ahead of deletion
+        
+        A missing user is not an error: faces indexed before user search
+        was introduced were never associated.
+        
+        Args:
+            employee_id: Employee ID (Rekognition UserId)
+            face_ids: Face IDs to disassociate
+            
+        Returns:
+            Number of faces disassociated
+        """
+        disassociated = 0
+        for start in range(0, len(face_ids), self.MAX_FACES_PER_USER):
+            try:
+                response = self.rekognition.disassociate_faces(
+                    CollectionId=self.collection_id,
+                    UserId=employee_id,
+                    FaceIds=face_ids[start:start + self.MAX_FACES_PER_USER]
+                )
+            except Exception as e:
+                logger.warning(f"Could not disassociate faces from user {employee_id}: {str(e)}")
+                return disassociated
+            disassociated += len(response.get('DisassociatedFaces', []))
+        return disassociated
+    
+    def enroll_user(self, employee_id: str, face_ids: List[str]) -> List[str]:
+        """
+        Make sure the employee's user exists and associate the given faces with it
+        
+        Args:
+            employee_id: Employee ID (Rekognition UserId)
+            face_ids: Newly indexed face IDs
+            
+        Returns:
+            Face IDs that were associated (empty if the user could not be created)
+        """
+        if not self.create_user(employee_id):
+            return []
+        return self.associate_faces(employee_id, face_ids)
+    
+
+    def index_face(self, image_bytes: Optional[bytes], employee_id: str, 
+                  request_id: str = None,
+                  s3_object: Optional[Dict[str, str]] = None,
+                  attribute_profile: str = 'full') -> Tuple[Optional[FaceData], Optional[ErrorResponse]]:
         """
         Index (enroll) a face in the collection
         
@@ -427,9 +765,11 @@ class FaceRecognitionService:
         3. Returns FaceData with face metadata
         
         Args:
-            image_bytes: Face image data as bytes
+            image_bytes: Face image data as bytes (None when s3_object is given)
             employee_id: Employee identifier to associate with the face
             request_id: Request identifier for error tracking
+            s3_object: S3 reference used instead of image_bytes (e.g. Liveness reference image)
+            attribute_profile: Face attributes to request (see ATTRIBUTE_PROFILES)
             
         Returns:
             Tuple of (FaceData or None, ErrorResponse or None)
@@ -440,11 +780,11 @@ class FaceRecognitionService:
             # Index the face in the collection
             response = self.rekognition.index_faces(
                 CollectionId=self.collection_id,
-                Image={'Bytes': image_bytes},
+                Image=self._image_param(image_bytes, s3_object),
                 ExternalImageId=employee_id,
                 MaxFaces=self.MAX_FACES,
                 QualityFilter='AUTO',  # Automatically filter low-quality faces
-                DetectionAttributes=['ALL']
+                DetectionAttributes=self._attributes(attribute_profile)
             )
             
             # Check if any faces were indexed
@@ -513,6 +853,142 @@ class FaceRecognitionService:
                     request_id=request_id or "unknown"
                 )
     
+    def enroll_face(self, image_bytes: Optional[bytes], employee_id: str,
+                    request_id: str = None,
+                    s3_object: Optional[Dict[str, str]] = None,
+                    attribute_profile: str = 'full') -> Tuple[Optional[FaceData], Optional[str]]:
+        """
+        Validate and index an enrollment face with a single IndexFaces call
+        
+        IndexFaces returns the same FaceDetail as DetectFaces, so the enrollment
+        rules (exactly one face, detection confidence, brightness and sharpness)
+        are enforced against its response instead of a separate DetectFaces call.
+        A face that was indexed but breaks a rule is removed from the collection
+        again before returning.
+        
+        Args:
+            image_bytes: Face image data as bytes (None when s3_object is given)
+            employee_id: Employee identifier to associate with the face
+            request_id: Request identifier for log correlation
+            s3_object: S3 reference used instead of image_bytes (e.g. Liveness reference image)
+            attribute_profile: Face attributes to request (see ATTRIBUTE_PROFILES); the
+                enrollment rules only read Confidence and Quality, both in 'presence-only'
+            
+        Returns:
+            Tuple of (FaceData or None, rejection reason or None).
+            Rekognition errors are raised to the caller.
+        """
+        logger.info(f"Enrolling face for employee: {employee_id} (request {request_id})")
+        
+        response = self.rekognition.index_faces(
+            CollectionId=self.collection_id,
+            Image=self._image_param(image_bytes, s3_object),
+            ExternalImageId=employee_id,
+            MaxFaces=self.MAX_FACES,
+            QualityFilter='AUTO',  # Rekognition drops faces that are too small, dark or blurry
+            DetectionAttributes=self._attributes(attribute_profile)
+        )
+        
+        face_records = response.get('FaceRecords', [])
+        unindexed_faces = response.get('UnindexedFaces', [])
+        
+        if not face_records:
+            reasons = sorted({reason for unindexed in unindexed_faces for reason in unindexed.get('Reasons', [])})
+            rejection = f"No face indexed: {', '.join(reasons)}" if reasons else "No face detected in image"
+            logger.warning(f"Enrollment rejected for employee {employee_id}: {rejection}")
+            return None, rejection
+        
+        face = face_records[0]['Face']
+        face_detail = face_records[0].get('FaceDetail', {})
+        
+        rejection = self._enrollment_rejection(face_detail, unindexed_faces)
+        if rejection:
+            logger.warning(f"Enrollment rejected for employee {employee_id}: {rejection}")
+            try:
+                self.rekognition.delete_faces(CollectionId=self.collection_id, FaceIds=[face['FaceId']])
+            except Exception as e:
+                logger.error(f"Failed to remove rejected face {face['FaceId']}: {str(e)}")
+            return None, rejection
+        
+        # Note: thumbnail_s3_key should be set by the caller after storing the thumbnail
+        face_data = FaceData(
+            face_id=face['FaceId'],
+            employee_id=employee_id,
+            bounding_box=face_detail.get('BoundingBox', face.get('BoundingBox', {})),
+            confidence=face_detail.get('Confidence', face.get('Confidence', 0.0)),
+            landmarks=face_detail.get('Landmarks', []),
+            thumbnail_s3_key=""
+        )
+        
+        logger.info(f"Face enrolled successfully - FaceId: {face_data.face_id}, "
+                   f"Confidence: {face_data.confidence}")
+        
+        return face_data, None
+    
+    def enroll_additional_faces(self, employee_id: str, s3_objects: List[Dict[str, str]],
+                                request_id: str = None) -> List[str]:
+        """
+        Index extra enrollment images so the employee's user aggregates several face vectors
+        
+        Extra images (e.g. Liveness reference and audit frames) only improve
+        matching; ones that fail the enrollment rules or cannot be read are
+        skipped instead of failing the enrollment.
+        
+        Args:
+            employee_id: Employee identifier to associate with the faces
+            s3_objects: S3 references of the extra images
+            request_id: Request identifier for log correlation
+            
+        Returns:
+            Face IDs of the faces that were indexed
+        """
+        face_ids = []
+        for s3_object in s3_objects[:self.MAX_FACES_PER_USER - 1]:
+            try:
+                face_data, rejection = self.enroll_face(
+                    None, employee_id, request_id, s3_object=s3_object,
+                    attribute_profile='presence-only'
+                )
+            except Exception as e:
+                logger.warning(f"Skipping extra enrollment image {s3_object.get('Name')}: {str(e)}")
+                continue
+            if rejection:
+                logger.info(f"Skipping extra enrollment image {s3_object.get('Name')}: {rejection}")
+                continue
+            face_ids.append(face_data.face_id)
+        return face_ids
+    
+    def _enrollment_rejection(self, face_detail: Dict[str, Any],
+                              unindexed_faces: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Check an indexed FaceDetail against the enrollment rules
+        
+        Args:
+            face_detail: FaceDetail of the indexed face
+            unindexed_faces: UnindexedFaces from the same IndexFaces response
+            
+        Returns:
+            Rejection reason, or None if the face is acceptable
+        """
+        # EXCEEDS_MAX_FACES means another face of enrollable quality was in the frame
+        extra_faces = [face for face in unindexed_faces if 'EXCEEDS_MAX_FACES' in face.get('Reasons', [])]
+        if extra_faces:
+            return f"Multiple faces detected: {1 + len(extra_faces)}"
+        
+        confidence = face_detail.get('Confidence', 0.0)
+        if confidence < self.CONFIDENCE_THRESHOLD:
+            return f"Face confidence {confidence} below threshold {self.CONFIDENCE_THRESHOLD}"
+        
+        # Quality is part of every DetectionAttributes set that includes DEFAULT
+        quality = face_detail.get('Quality')
+        if quality is not None:
+            brightness = quality.get('Brightness', 0)
+            sharpness = quality.get('Sharpness', 0)
+            if brightness < self.MIN_FACE_BRIGHTNESS or sharpness < self.MIN_FACE_SHARPNESS:
+                return f"Poor image quality - Brightness: {brightness}, Sharpness: {sharpness}"
+        
+        return None
+    
     def delete_face(self, face_id: str, 
                    request_id: str = None) -> Tuple[bool, Optional[ErrorResponse]]:
         """
@@ -572,16 +1048,19 @@ class FaceRecognitionService:
                 )
     
     def delete_faces_by_employee_id(self, employee_id: str, 
-                                   request_id: str = None) -> Tuple[int, Optional[ErrorResponse]]:
+                                   request_id: str = None,
+                                   face_ids: Optional[List[str]] = None) -> Tuple[int, Optional[ErrorResponse]]:
         """
         Delete all faces associated with an employee ID
         
         This is useful for re-enrollment scenarios where old face data
-        needs to be removed before indexing new face data.
+        needs to be removed. Pass the face ids stored in EmployeeFaces so the
+        cost is proportional to the employee's faces, not the collection size.
         
         Args:
             employee_id: Employee identifier
             request_id: Request identifier for error tracking
+            face_ids: Face ids recorded for the employee (collection is scanned if not provided)
             
         Returns:
             Tuple of (number of faces deleted, ErrorResponse or None)
@@ -589,29 +1068,23 @@ class FaceRecognitionService:
         try:
             logger.info(f"Deleting all faces for employee: {employee_id}")
             
-            # List faces with the given external image ID
-            response = self.rekognition.list_faces(
-                CollectionId=self.collection_id,
-                MaxResults=100  # Should be enough for one employee
-            )
-            
-            # Filter faces by external image ID
-            face_ids_to_delete = []
-            for face in response.get('Faces', []):
-                if face.get('ExternalImageId') == employee_id:
-                    face_ids_to_delete.append(face['FaceId'])
+            face_ids_to_delete = self.find_employee_face_ids(employee_id, face_ids)
             
             if not face_ids_to_delete:
                 logger.info(f"No faces found for employee: {employee_id}")
                 return 0, None
             
-            # Delete the faces
-            delete_response = self.rekognition.delete_faces(
-                CollectionId=self.collection_id,
-                FaceIds=face_ids_to_delete
-            )
+            # Faces still associated with a user cannot be deleted
+            self.disassociate_faces(employee_id, face_ids_to_delete)
             
-            deleted_count = len(delete_response.get('DeletedFaces', []))
+            # Delete the faces in batches of the DeleteFaces limit
+            deleted_count = 0
+            for start in range(0, len(face_ids_to_delete), self.DELETE_FACES_BATCH_SIZE):
+                delete_response = self.rekognition.delete_faces(
+                    CollectionId=self.collection_id,
+                    FaceIds=face_ids_to_delete[start:start + self.DELETE_FACES_BATCH_SIZE]
+                )
+                deleted_count += len(delete_response.get('DeletedFaces', []))
             
             logger.info(f"Deleted {deleted_count} faces for employee: {employee_id}")
             return deleted_count, None
@@ -626,6 +1099,32 @@ class FaceRecognitionService:
                 request_id=request_id or "unknown"
             )
     
+    def find_employee_face_ids(self, employee_id: str,
+                               stored_face_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Find the face ids indexed for an employee
+        
+        Face ids recorded in EmployeeFaces are used as-is. Without them the
+        whole collection is streamed page by page and filtered on
+        ExternalImageId, which is O(collection size) and only meant as a
+        fallback for records that predate face id tracking.
+        
+        Args:
+            employee_id: Employee identifier (ExternalImageId of the faces)
+            stored_face_ids: Face ids recorded for the employee, if known
+            
+        Returns:
+            List of face ids (order preserved, duplicates removed)
+        """
+        if stored_face_ids:
+            return list(dict.fromkeys(face_id for face_id in stored_face_ids if face_id))
+        
+        logger.warning(f"No stored face ids for employee {employee_id}, scanning collection {self.collection_id}")
+        return [
+            face['FaceId'] for face in self.iter_faces()
+            if face.get('ExternalImageId') == employee_id
+        ]
+    
     def get_collection_stats(self) -> Optional[Dict[str, Any]]:
         """
         Get statistics about the face collection
@@ -653,23 +1152,47 @@ class FaceRecognitionService:
             logger.error(f"Error getting collection stats: {str(e)}")
             return None
     
+    def iter_faces(self, page_size: int = LIST_FACES_PAGE_SIZE,
+                   user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream faces in the collection, following NextToken across all pages
+        
+        Only one page is held in memory at a time. Errors are raised to the
+        caller, since a silently truncated listing would look like a complete one.
+        
+        Args:
+            page_size: Faces requested per ListFaces call
+            user_id: Restrict the listing to faces associated with a Rekognition user
+            
+        Yields:
+            Face dictionaries as returned by ListFaces
+        """
+        params = {'CollectionId': self.collection_id, 'MaxResults': page_size}
+        if user_id:
+            params['UserId'] = user_id
+        
+        while True:
+            response = self.rekognition.list_faces(**params)
+            yield from response.get('Faces', [])
+            
+            next_token = response.get('NextToken')
+            if not next_token:
+                return
+            params['NextToken'] = next_token
+    
     def list_faces(self, max_results: int = 100) -> List[Dict[str, Any]]:
         """
-        List all faces in the collection
+        List faces in the collection
         
         Args:
-            max_results: Maximum number of faces to return
+            max_results: Maximum number of faces to return (pages are followed as needed)
             
         Returns:
             List of face dictionaries
         """
         try:
-            response = self.rekognition.list_faces(
-                CollectionId=self.collection_id,
-                MaxResults=max_results
-            )
-            
-            faces = response.get('Faces', [])
+            page_size = min(max_results, self.LIST_FACES_PAGE_SIZE)
+            faces = list(islice(self.iter_faces(page_size=page_size), max_results))
             logger.info(f"Listed {len(faces)} faces from collection")
             
             return faces
@@ -716,10 +1239,9 @@ def validate_face_image(image_bytes: bytes) -> Tuple[bool, str]:
             return False, "Image too large (max 5MB)"
         
         # Basic format validation - check for common image headers
-        if image_bytes.startswith(b'\xff\xd8\xff'):
-            return True, "JPEG"
-        elif image_bytes.startswith(b'\x89PNG'):
-            return True, "PNG"
+        image_format = sniff_format(image_bytes)
+        if image_format in ('JPEG', 'PNG'):
+            return True, image_format
         else:
             return False, "Unsupported image format (use JPEG or PNG)"
             
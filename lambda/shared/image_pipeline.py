@@ -0,0 +1,190 @@
+"""
+Face-Auth IdP System - Single-Decode Face Image Pipeline
+
+This module turns an uploaded face frame into everything the enrollment,
+re-enrollment and login flows need from a single decode:
+- A Rekognition-optimized search JPEG (RGB, bounded edge length, well under 5MB)
+- The 200x200 stored thumbnail
+- Quality pre-gate metrics
+- Original format and dimensions
+
+All derivatives are produced from one Pillow image object. JPEGs are
+draft-decoded straight to the search resolution, the thumbnail and the
+quality copy are resampled from that image, and nothing re-opens the bytes.
+
+Frames that are already Rekognition-ready (upright RGB/grayscale JPEGs within
+the search size, as kiosks send them) are detected from their header alone.
+Their bytes are passed through as the search image, and the decode only
+needs to be large enough for the thumbnail and the quality copy.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from .image_probe import ImageProbe, probe_image
+from .image_quality import ANALYSIS_SIZE, QualityMetrics, measure_gray_image
+from .thumbnail_processor import ThumbnailProcessor
+
+logger = logging.getLogger(__name__)
+
+
+# Longest edge of the image sent to Rekognition. Kiosk faces stay far above
+# Rekognition's 40px minimum at this size; larger frames only cost upload time.
+SEARCH_MAX_SIDE = int(os.environ.get('IMAGE_SEARCH_MAX_SIDE', '1280'))
+SEARCH_JPEG_QUALITY = int(os.environ.get('IMAGE_SEARCH_JPEG_QUALITY', '90'))
+
+# Rekognition limit for images passed as bytes
+MAX_REKOGNITION_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Decode size that still covers both the thumbnail and the quality copy
+_PASS_THROUGH_DECODE_SIDE = max(ANALYSIS_SIZE, *ThumbnailProcessor.TARGET_SIZE)
+
+# Transposition that brings each EXIF orientation upright
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+
+
+@dataclass
+class ProcessedFaceImage:
+    """
+    Derivatives of one decoded face frame
+
+    Attributes:
+        search_image: RGB JPEG bytes for Rekognition detect/search/index calls
+        thumbnail: 200x200 JPEG bytes for S3 storage
+        quality: Quality pre-gate metrics
+        format: Original image format (e.g. 'JPEG', 'PNG')
+        width: Original image width in pixels
+        height: Original image height in pixels
+        passed_through: True if search_image is the uploaded bytes, unchanged
+    """
+    search_image: bytes
+    thumbnail: bytes
+    quality: QualityMetrics
+    format: str
+    width: int
+    height: int
+    passed_through: bool = False
+
+    @property
+    def dimensions(self) -> Tuple[int, int]:
+        """Original (width, height)"""
+        return self.width, self.height
+
+
+def _fit_size(size: Tuple[int, int], max_side: int) -> Tuple[int, int]:
+    """Scale size down so that neither edge exceeds max_side"""
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def is_search_ready(probe: Optional[ImageProbe], image_size_bytes: int, search_max_side: int) -> bool:
+    """
+    Decide from the header alone whether uploaded bytes can go to Rekognition as-is
+
+    Args:
+        probe: Header probe of the upload (None if the header could not be parsed)
+        image_size_bytes: Encoded size of the upload
+        search_max_side: Longest edge allowed for the search image
+
+    Returns:
+        True if the upload is an upright RGB or grayscale JPEG within the search size
+    """
+    return (
+        probe is not None
+        and probe.format == 'JPEG'
+        and probe.mode in ('RGB', 'L')
+        and probe.orientation == 1
+        and max(probe.size) <= search_max_side
+        and image_size_bytes <= MAX_REKOGNITION_IMAGE_BYTES
+    )
+
+
+def process_face_image(image_bytes: bytes,
+                       search_max_side: Optional[int] = None) -> ProcessedFaceImage:
+    """
+    Decode a face frame once and emit every derivative the auth flows need
+
+    Args:
+        image_bytes: Encoded image data (JPEG or PNG)
+        search_max_side: Longest edge of the search image (SEARCH_MAX_SIDE if not provided)
+
+    Returns:
+        ProcessedFaceImage
+
+    Raises:
+        ValueError: If the image cannot be decoded
+    """
+    search_max_side = search_max_side or SEARCH_MAX_SIDE
+
+    probe = probe_image(image_bytes)
+    passed_through = is_search_ready(probe, len(image_bytes), search_max_side)
+    decode_side = _PASS_THROUGH_DECODE_SIDE if passed_through else search_max_side
+    orientation = probe.orientation if probe else 1
+
+    try:
+        with Image.open(BytesIO(image_bytes)) as img:
+            image_format = img.format
+            width, height = img.size
+
+            # Decode once, at the smallest DCT scale that still covers what is needed
+            if image_format == 'JPEG':
+                img.draft('RGB', (decode_side, decode_side))
+
+            rgb = img if img.mode == 'RGB' else img.convert('RGB')
+            if orientation in _ORIENTATION_TRANSPOSE:
+                rgb = rgb.transpose(_ORIENTATION_TRANSPOSE[orientation])
+
+            if passed_through:
+                # Upload is already Rekognition-ready: only the small decode is needed
+                search = rgb
+                search_bytes = image_bytes
+            else:
+                # Search image: resample only when the decoded frame is still too large
+                search_size = _fit_size(rgb.size, search_max_side)
+                search = rgb if search_size == rgb.size else rgb.resize(
+                    search_size, Image.Resampling.LANCZOS, reducing_gap=2.0
+                )
+
+                output = BytesIO()
+                search.save(output, format='JPEG', quality=SEARCH_JPEG_QUALITY)
+                search_bytes = output.getvalue()
+
+            thumbnail_bytes = ThumbnailProcessor.render_thumbnail(search)
+
+            # Quality metrics on a small grayscale copy of the same pixels
+            gray = search.resize(_fit_size(search.size, ANALYSIS_SIZE), Image.Resampling.BICUBIC,
+                                 reducing_gap=2.0).convert('L')
+            quality = measure_gray_image(gray, width, height)
+    except Exception as e:
+        logger.error(f"Error processing face image: {str(e)}")
+        raise ValueError(f"Failed to process image: {str(e)}")
+
+    logger.info(
+        f"Processed face image {image_format} {width}x{height} ({len(image_bytes)} bytes): "
+        f"search {'passed through' if passed_through else 're-encoded'} ({len(search_bytes)} bytes), "
+        f"thumbnail {len(thumbnail_bytes)} bytes"
+    )
+
+    return ProcessedFaceImage(
+        search_image=search_bytes,
+        thumbnail=thumbnail_bytes,
+        quality=quality,
+        format=image_format,
+        width=width,
+        height=height,
+        passed_through=passed_through
+    )
@@ -0,0 +1,193 @@
+"""
+Face-Auth IdP System - Header-Only Image Probe
+
+This module identifies uploaded images without decoding any pixels:
+- Sniffs the container format from magic bytes
+- Parses JPEG SOF and PNG IHDR headers for dimensions and color layout
+- Reads the EXIF orientation tag from the JPEG APP1 segment
+
+It is shared by the format validators and by the image pipeline, which
+uses it to pass kiosk frames that are already Rekognition-ready through
+untouched.
+"""
+
+import logging
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+JPEG_MAGIC = b'\xff\xd8\xff'
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+# Start-of-frame markers that carry dimensions (excludes DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_PROGRESSIVE_MARKERS = {0xC2, 0xC6, 0xCA, 0xCE}
+
+# Markers without a length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+_JPEG_COMPONENT_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+_PNG_COLOR_TYPE_MODES = {0: 'L', 2: 'RGB', 3: 'P', 4: 'LA', 6: 'RGBA'}
+
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+@dataclass
+class ImageProbe:
+    """
+    Image properties read from the file header
+
+    Attributes:
+        format: Container format ('JPEG' or 'PNG')
+        width: Stored width in pixels
+        height: Stored height in pixels
+        mode: Pillow-style color mode implied by the header ('RGB', 'L', 'CMYK', ...)
+        orientation: EXIF orientation (1 = upright)
+        progressive: True for progressive JPEGs
+    """
+    format: str
+    width: int
+    height: int
+    mode: str
+    orientation: int = 1
+    progressive: bool = False
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Stored (width, height)"""
+        return self.width, self.height
+
+    @property
+    def display_size(self) -> Tuple[int, int]:
+        """(width, height) after applying the EXIF orientation"""
+        if self.orientation in (5, 6, 7, 8):
+            return self.height, self.width
+        return self.width, self.height
+
+
+def sniff_format(image_bytes: bytes) -> Optional[str]:
+    """
+    Identify the image container from its magic bytes
+
+    Args:
+        image_bytes: Encoded image data
+
+    Returns:
+        'JPEG', 'PNG', 'GIF' or 'WEBP', or None if not recognized
+    """
+    if image_bytes.startswith(JPEG_MAGIC):
+        return 'JPEG'
+    if image_bytes.startswith(PNG_MAGIC[:4]):
+        return 'PNG'
+    if image_bytes.startswith(b'GIF8'):
+        return 'GIF'
+    if image_bytes.startswith(b'RIFF') and b'WEBP' in image_bytes[:12]:
+        return 'WEBP'
+    return None
+
+
+def probe_image(image_bytes: bytes) -> Optional[ImageProbe]:
+    """
+    Read format, dimensions and orientation from a JPEG or PNG header
+
+    Args:
+        image_bytes: Encoded image data
+
+    Returns:
+        ImageProbe, or None if the header is missing, truncated or unsupported
+    """
+    try:
+        if image_bytes.startswith(JPEG_MAGIC):
+            return _probe_jpeg(image_bytes)
+        if image_bytes.startswith(PNG_MAGIC):
+            return _probe_png(image_bytes)
+    except (struct.error, IndexError) as e:
+        logger.debug(f"Malformed image header: {str(e)}")
+    return None
+
+
+def _probe_png(image_bytes: bytes) -> Optional[ImageProbe]:
+    """Parse the IHDR chunk, which the PNG spec requires to come first"""
+    if image_bytes[12:16] != b'IHDR':
+        return None
+
+    width, height, _bit_depth, color_type = struct.unpack('>IIBB', image_bytes[16:26])
+    mode = _PNG_COLOR_TYPE_MODES.get(color_type)
+    if not mode or not width or not height:
+        return None
+
+    return ImageProbe(format='PNG', width=width, height=height, mode=mode)
+
+
+def _probe_jpeg(image_bytes: bytes) -> Optional[ImageProbe]:
+    """Walk JPEG marker segments up to the first start-of-frame"""
+    orientation = 1
+    position = 2
+    length = len(image_bytes)
+
+    while position < length:
+        # Markers may be preceded by any number of 0xFF fill bytes
+        if image_bytes[position] != 0xFF:
+            return None
+        while position < length and image_bytes[position] == 0xFF:
+            position += 1
+        marker = image_bytes[position]
+        position += 1
+
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            return None
+
+        segment_length = struct.unpack('>H', image_bytes[position:position + 2])[0]
+        segment = image_bytes[position + 2:position + segment_length]
+        if segment_length < 2 or len(segment) != segment_length - 2:
+            return None
+
+        if marker == 0xE1 and segment.startswith(b'Exif\x00\x00'):
+            orientation = _exif_orientation(segment[6:]) or orientation
+        elif marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', segment[1:5])
+            mode = _JPEG_COMPONENT_MODES.get(segment[5])
+            if not mode or not width or not height:
+                return None
+            return ImageProbe(
+                format='JPEG',
+                width=width,
+                height=height,
+                mode=mode,
+                orientation=orientation,
+                progressive=marker in _JPEG_PROGRESSIVE_MARKERS
+            )
+
+        position += segment_length
+
+    return None
+
+
+def _exif_orientation(tiff: bytes) -> Optional[int]:
+    """Read the orientation tag from IFD0 of an EXIF TIFF block"""
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+
+    ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    entry_count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+
+    for index in range(entry_count):
+        entry = tiff[ifd_offset + 2 + index * 12:ifd_offset + 14 + index * 12]
+        if len(entry) < 12:
+            break
+        tag = struct.unpack(endian + 'H', entry[:2])[0]
+        if tag == _EXIF_ORIENTATION_TAG:
+            value = struct.unpack(endian + 'H', entry[8:10])[0]
+            return value if 1 <= value <= 8 else None
+
+    return None
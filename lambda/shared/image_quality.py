@@ -0,0 +1,204 @@
+"""
+Face-Auth IdP System - Local Image Quality Pre-Gate
+
+This module rejects hopeless face frames before any Rekognition call:
+- Measures brightness, contrast and Laplacian-variance sharpness
+- Works on a downscaled grayscale copy so a check takes a few milliseconds
+- Uses NumPy when available and falls back to Pillow's ImageStat/ImageFilter
+
+Thresholds are deliberately loose: only frames Rekognition would certainly
+reject (near-black, washed out, flat or heavily blurred) are stopped locally.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageStat
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only where NumPy is absent
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+# Edge length of the grayscale copy the metrics are computed on
+ANALYSIS_SIZE = 256
+
+# Rekognition needs at least 80x80 pixels to find a face
+MIN_IMAGE_SIDE = 80
+
+
+@dataclass
+class QualityThresholds:
+    """
+    Pre-gate thresholds (grayscale 0-255 scale)
+
+    Attributes:
+        min_brightness: Minimum mean luminance
+        max_brightness: Maximum mean luminance
+        min_contrast: Minimum luminance standard deviation
+        min_sharpness: Minimum variance of the Laplacian
+    """
+    min_brightness: float = 40.0
+    max_brightness: float = 235.0
+    min_contrast: float = 12.0
+    min_sharpness: float = 15.0
+
+    @classmethod
+    def from_env(cls) -> 'QualityThresholds':
+        """Build thresholds from IMAGE_QUALITY_* environment variables"""
+        defaults = cls()
+        return cls(
+            min_brightness=float(os.environ.get('IMAGE_QUALITY_MIN_BRIGHTNESS', defaults.min_brightness)),
+            max_brightness=float(os.environ.get('IMAGE_QUALITY_MAX_BRIGHTNESS', defaults.max_brightness)),
+            min_contrast=float(os.environ.get('IMAGE_QUALITY_MIN_CONTRAST', defaults.min_contrast)),
+            min_sharpness=float(os.environ.get('IMAGE_QUALITY_MIN_SHARPNESS', defaults.min_sharpness))
+        )
+
+
+@dataclass
+class QualityMetrics:
+    """
+    Measured image quality
+
+    Attributes:
+        brightness: Mean luminance (0-255)
+        contrast: Luminance standard deviation
+        sharpness: Variance of the Laplacian
+        width: Original image width in pixels
+        height: Original image height in pixels
+    """
+    brightness: float
+    contrast: float
+    sharpness: float
+    width: int
+    height: int
+
+
+def measure_image_quality(image_bytes: bytes, analysis_size: int = ANALYSIS_SIZE) -> QualityMetrics:
+    """
+    Compute brightness, contrast and sharpness on a downscaled grayscale copy
+
+    Args:
+        image_bytes: Encoded image data
+        analysis_size: Maximum edge length of the analysed copy
+
+    Returns:
+        QualityMetrics
+
+    Raises:
+        ValueError: If the image cannot be decoded
+    """
+    try:
+        with Image.open(BytesIO(image_bytes)) as img:
+            width, height = img.size
+            # JPEG draft mode decodes straight into a reduced grayscale image
+            img.draft('L', (analysis_size, analysis_size))
+            gray = img.convert('L')
+            gray.thumbnail((analysis_size, analysis_size))
+    except Exception as e:
+        raise ValueError(f"Failed to decode image: {str(e)}")
+
+    return measure_gray_image(gray, width, height)
+
+
+def measure_gray_image(gray: Image.Image, width: int, height: int) -> QualityMetrics:
+    """
+    Compute brightness, contrast and sharpness on an already downscaled grayscale image
+
+    Args:
+        gray: Grayscale ('L') analysis copy, at most ANALYSIS_SIZE on each edge
+        width: Original image width in pixels
+        height: Original image height in pixels
+
+    Returns:
+        QualityMetrics
+    """
+    if np is not None:
+        pixels = np.asarray(gray, dtype=np.float32)
+        brightness = float(pixels.mean())
+        contrast = float(pixels.std())
+        if pixels.shape[0] >= 3 and pixels.shape[1] >= 3:
+            laplacian = (
+                pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+                - 4.0 * pixels[1:-1, 1:-1]
+            )
+            sharpness = float(laplacian.var())
+        else:
+            sharpness = 0.0
+    else:
+        stat = ImageStat.Stat(gray)
+        brightness = stat.mean[0]
+        contrast = stat.stddev[0]
+        # Offset keeps negative responses from clipping at 0
+        laplacian = gray.filter(ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128))
+        sharpness = ImageStat.Stat(laplacian).var[0]
+
+    return QualityMetrics(
+        brightness=brightness,
+        contrast=contrast,
+        sharpness=sharpness,
+        width=width,
+        height=height
+    )
+
+
+def check_image_quality(image_bytes: bytes,
+                        thresholds: Optional[QualityThresholds] = None) -> Tuple[Optional[QualityMetrics], Optional[str]]:
+    """
+    Decide whether a face frame is worth sending to Rekognition
+
+    Args:
+        image_bytes: Encoded image data
+        thresholds: Thresholds to apply (IMAGE_QUALITY_* environment if not provided)
+
+    Returns:
+        Tuple of (QualityMetrics or None, rejection reason or None).
+        A reason is returned only for frames that should be rejected.
+    """
+    try:
+        metrics = measure_image_quality(image_bytes)
+    except ValueError as e:
+        return None, str(e)
+
+    return metrics, evaluate_image_quality(metrics, thresholds)
+
+
+def evaluate_image_quality(metrics: QualityMetrics,
+                           thresholds: Optional[QualityThresholds] = None) -> Optional[str]:
+    """
+    Apply pre-gate thresholds to measured metrics
+
+    Args:
+        metrics: Measured image quality
+        thresholds: Thresholds to apply (IMAGE_QUALITY_* environment if not provided)
+
+    Returns:
+        Rejection reason, or None if the frame should go to Rekognition
+    """
+    thresholds = thresholds or QualityThresholds.from_env()
+
+    if min(metrics.width, metrics.height) < MIN_IMAGE_SIDE:
+        reason = f"Image too small: {metrics.width}x{metrics.height}"
+    elif metrics.brightness < thresholds.min_brightness:
+        reason = f"Image too dark: brightness {metrics.brightness:.1f} < {thresholds.min_brightness}"
+    elif metrics.brightness > thresholds.max_brightness:
+        reason = f"Image overexposed: brightness {metrics.brightness:.1f} > {thresholds.max_brightness}"
+    elif metrics.contrast < thresholds.min_contrast:
+        reason = f"Image contrast too low: {metrics.contrast:.1f} < {thresholds.min_contrast}"
+    elif metrics.sharpness < thresholds.min_sharpness:
+        reason = f"Image too blurry: sharpness {metrics.sharpness:.1f} < {thresholds.min_sharpness}"
+    else:
+        reason = None
+
+    if reason:
+        logger.info(f"Image rejected by quality pre-gate: {reason}")
+    else:
+        logger.debug(f"Image passed quality pre-gate: {metrics}")
+
+    return reason
@@ -10,11 +10,15 @@ Requirements: FR-1, FR-3, NFR-2
 import boto3
 import json
 import logging
+import sys
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 import os
+from botocore.exceptions import ClientError
 
 
 # Configure logging
@@ -49,6 +53,140 @@ class LivenessSessionResult:
         return asdict(self)
 
 
+class MetricsBuffer:
+    """
+    In-process CloudWatch metrics buffer
+
+    Metrics are aggregated in memory and written once per flush instead of one
+    synchronous PutMetricData call per metric:
+    - 'emf' mode: CloudWatch Embedded Metric Format lines on stdout (no network I/O)
+    - 'api' mode: a single batched PutMetricData call
+    """
+
+    EMF_MAX_VALUES = 100  # EMF limit on values per metric per document
+    API_MAX_METRIC_DATA = 1000  # PutMetricData limit on MetricData entries per call
+
+    def __init__(self, namespace: str, cloudwatch_client: Optional[Any] = None, mode: str = 'emf'):
+        """
+        Initialize metrics buffer
+
+        Args:
+            namespace: CloudWatch namespace
+            cloudwatch_client: Boto3 CloudWatch client (required for 'api' mode)
+            mode: 'emf' or 'api'
+        """
+        self.namespace = namespace
+        self.cloudwatch = cloudwatch_client
+        self.mode = mode if mode in ('emf', 'api') else 'emf'
+        self._pending: 'OrderedDict[Tuple[str, str, Tuple[Tuple[str, str], ...]], List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, metric_name: str, value: float, unit: str = 'None',
+            dimensions: Optional[Dict[str, str]] = None) -> None:
+        """
+        Record a metric value until the next flush
+
+        Args:
+            metric_name: メトリクス名
+            value: メトリクス値
+            unit: 単位（Count, Percent, Seconds等）
+            dimensions: ディメンション（オプション）
+        """
+        key = (metric_name, unit, tuple(sorted((dimensions or {}).items())))
+        with self._lock:
+            self._pending.setdefault(key, []).append(float(value))
+
+    def pending_count(self) -> int:
+        """Number of buffered metric values"""
+        with self._lock:
+            return sum(len(values) for values in self._pending.values())
+
+    def flush(self) -> int:
+        """
+        Write all buffered metrics and clear the buffer
+
+        Failures are logged only; metrics must never break the caller.
+
+        Returns:
+            int: Number of metric values flushed
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = OrderedDict()
+
+        if not pending:
+            return 0
+
+        count = sum(len(values) for values in pending.values())
+
+        try:
+            if self.mode == 'api' and self.cloudwatch is not None:
+                self._flush_api(pending)
+            else:
+                self._flush_emf(pending)
+            logger.debug(f"Flushed {count} metric values ({self.mode})")
+        except Exception as e:
+            # メトリクス送信失敗はログのみ（処理は継続）
+            logger.warning(f"Failed to flush {count} metric values: {str(e)}")
+
+        return count
+
+    def _flush_emf(self, pending: Dict) -> None:
+        """Emit one EMF document per dimension set"""
+        timestamp_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        documents: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+
+        for (metric_name, unit, dimensions), values in pending.items():
+            document = documents.get(dimensions)
+            if document is None:
+                document = {
+                    '_aws': {
+                        'Timestamp': timestamp_ms,
+                        'CloudWatchMetrics': [{
+                            'Namespace': self.namespace,
+                            'Dimensions': [[name for name, _ in dimensions]],
+                            'Metrics': []
+                        }]
+                    }
+                }
+                document.update(dict(dimensions))
+                documents[dimensions] = document
+
+            document['_aws']['CloudWatchMetrics'][0]['Metrics'].append({'Name': metric_name, 'Unit': unit})
+            values = values[:self.EMF_MAX_VALUES]
+            document[metric_name] = values[0] if len(values) == 1 else values
+
+        # EMF must be written as a raw JSON line, not through the log formatter
+        for document in documents.values():
+            sys.stdout.write(json.dumps(document) + '\n')
+        sys.stdout.flush()
+
+    def _flush_api(self, pending: Dict) -> None:
+        """Send buffered metrics with as few PutMetricData calls as possible"""
+        timestamp = datetime.now(timezone.utc)
+        metric_data = []
+
+        for (metric_name, unit, dimensions), values in pending.items():
+            datum = {
+                'MetricName': metric_name,
+                'Unit': unit,
+                'Timestamp': timestamp
+            }
+            if len(values) == 1:
+                datum['Value'] = values[0]
+            else:
+                datum['Values'] = values
+            if dimensions:
+                datum['Dimensions'] = [{'Name': k, 'Value': v} for k, v in dimensions]
+            metric_data.append(datum)
+
+        for start in range(0, len(metric_data), self.API_MAX_METRIC_DATA):
+            self.cloudwatch.put_metric_data(
+                Namespace=self.namespace,
+                MetricData=metric_data[start:start + self.API_MAX_METRIC_DATA]
+            )
+
+
 # Custom exceptions
 class LivenessServiceError(Exception):
     """Base exception for Liveness Service errors"""
@@ -71,6 +209,10 @@ class ConfidenceThresholdError(LivenessServiceError):
 
 
 
+# Rekognition session statuses that will not change on a later call
+TERMINAL_REKOGNITION_STATUSES = frozenset({'SUCCEEDED', 'FAILED', 'EXPIRED'})
+
+
 class LivenessService:
     """
     AWS Rekognition Liveness API統合サービス
@@ -116,6 +258,13 @@ class LivenessService:
         self.s3 = s3_client or boto3.client('s3')
         self.cloudwatch = cloudwatch_client or boto3.client('cloudwatch')
         
+        # Metrics are buffered and flushed once per operation
+        self.metrics = MetricsBuffer(
+            namespace='FaceAuth/Liveness',
+            cloudwatch_client=self.cloudwatch,
+            mode=os.environ.get('LIVENESS_METRICS_MODE', 'emf')
+        )
+        
         self.confidence_threshold = confidence_threshold
         self.session_timeout_minutes = session_timeout_minutes
         
@@ -215,6 +364,9 @@ class LivenessService:
             self._send_metric('SessionCreationError', 1.0, 'Count')
             logger.error(f"Failed to create liveness session: {str(e)}")
             raise LivenessServiceError(f"Failed to create liveness session: {str(e)}")
+        
+        finally:
+            self.flush_metrics()
 
     
     def get_session_result(self, session_id: str) -> LivenessSessionResult:
@@ -240,10 +392,12 @@ class LivenessService:
         start_time = datetime.now(timezone.utc)
         
         try:
-            # Check session exists in DynamoDB
+            # Check session exists in DynamoDB (consistent read so a verdict
+            # persisted moments ago by another handler is visible)
             db_response = self.dynamodb.get_item(
                 TableName=self.liveness_sessions_table,
-                Key={'session_id': {'S': session_id}}
+                Key={'session_id': {'S': session_id}},
+                ConsistentRead=True
             )
             
             if 'Item' not in db_response:
@@ -258,6 +412,20 @@ class LivenessService:
                 self._send_metric('SessionExpired', 1.0, 'Count')
                 raise SessionExpiredError(f"Session expired: {session_id}")
             
+            # Serve a verdict persisted by an earlier evaluation without calling Rekognition
+            cached_result = self._result_from_item(session_id, item)
+            if cached_result is not None:
+                self._send_metric('ResultCacheHit', 1.0, 'Count')
+                logger.info(
+                    f"Liveness verdict served from session record",
+                    extra={
+                        'session_id': session_id,
+                        'is_live': cached_result.is_live,
+                        'status': cached_result.status
+                    }
+                )
+                return cached_result
+            
             # Get liveness session results from Rekognition
             response = self.rekognition.get_face_liveness_session_results(
                 SessionId=session_id
@@ -286,19 +454,6 @@ class LivenessService:
             final_status = "SUCCESS" if is_live and status == "SUCCEEDED" else "FAILED"
             error_message = None if is_live else f"Confidence {confidence:.2f}% below threshold {self.confidence_threshold}%"
             
-            # Update DynamoDB with results
-            self.dynamodb.update_item(
-                TableName=self.liveness_sessions_table,
-                Key={'session_id': {'S': session_id}},
-                UpdateExpression="SET #status = :status, confidence = :confidence, reference_image_s3_key = :ref_key",
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':status': {'S': final_status},
-                    ':confidence': {'N': str(confidence)},
-                    ':ref_key': {'S': reference_image_s3_key or ''}
-                }
-            )
-            
             result = LivenessSessionResult(
                 session_id=session_id,
                 is_live=is_live,
@@ -309,6 +464,11 @@ class LivenessService:
                 error_message=error_message
             )
             
+            # Persist the verdict once Rekognition's result is final; sessions
+            # still in progress are re-evaluated on the next call
+            if status in TERMINAL_REKOGNITION_STATUSES:
+                self._persist_verdict(result, status)
+            
             # Send metrics
             elapsed_time = (datetime.now(timezone.utc) - start_time).total_seconds()
             self.send_liveness_metrics(session_id, result, elapsed_time)
@@ -332,8 +492,80 @@ class LivenessService:
             self._send_metric('VerificationError', 1.0, 'Count')
             logger.error(f"Failed to get liveness session result: {str(e)}")
             raise LivenessServiceError(f"Failed to get liveness session result: {str(e)}")
+        
+        finally:
+            self.flush_metrics()
 
     
+    def _persist_verdict(self, result: LivenessSessionResult, rekognition_status: str) -> None:
+        """
+        検証結果をセッションレコードに保存（初回評価のみ）
+        
+        The write is conditional on no verdict existing yet, so concurrent
+        evaluations of the same session keep the first verdict.
+        
+        Args:
+            result: 検証結果
+            rekognition_status: Rekognitionのセッションステータス
+        """
+        values = {
+            ':status': {'S': result.status},
+            ':confidence': {'N': str(result.confidence)},
+            ':ref_key': {'S': result.reference_image_s3_key or ''},
+            ':audit_key': {'S': result.audit_image_s3_key or ''},
+            ':rekognition_status': {'S': rekognition_status},
+            ':verified_at': {'S': datetime.now(timezone.utc).isoformat()}
+        }
+        update_expression = (
+            "SET #status = :status, confidence = :confidence, reference_image_s3_key = :ref_key, "
+            "audit_image_s3_key = :audit_key, rekognition_status = :rekognition_status, "
+            "verified_at = :verified_at"
+        )
+        if result.error_message:
+            update_expression += ", error_message = :error_message"
+            values[':error_message'] = {'S': result.error_message}
+        
+        try:
+            self.dynamodb.update_item(
+                TableName=self.liveness_sessions_table,
+                Key={'session_id': {'S': result.session_id}},
+                UpdateExpression=update_expression,
+                ConditionExpression="attribute_not_exists(rekognition_status)",
+                ExpressionAttributeNames={'#status': 'status'},
+                ExpressionAttributeValues=values
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.info(f"Liveness verdict already persisted for session {result.session_id}")
+    
+    def _result_from_item(self, session_id: str, item: Dict[str, Any]) -> Optional[LivenessSessionResult]:
+        """
+        保存済みの検証結果を復元
+        
+        Args:
+            session_id: セッションID
+            item: LivenessSessionsテーブルのアイテム（DynamoDB JSON）
+            
+        Returns:
+            LivenessSessionResult if a final verdict was persisted, otherwise None
+        """
+        if 'rekognition_status' not in item or 'confidence' not in item:
+            return None
+        
+        confidence = float(item['confidence']['N'])
+        status = item.get('status', {}).get('S', 'FAILED')
+        
+        return LivenessSessionResult(
+            session_id=session_id,
+            is_live=status == 'SUCCESS' and self._validate_confidence(confidence),
+            confidence=confidence,
+            reference_image_s3_key=item.get('reference_image_s3_key', {}).get('S') or None,
+            audit_image_s3_key=item.get('audit_image_s3_key', {}).get('S') or None,
+            status=status,
+            error_message=item.get('error_message', {}).get('S')
+        )
+    
     def _validate_confidence(self, confidence: float) -> bool:
         """
         信頼度スコアを検証
@@ -354,7 +586,9 @@ class LivenessService:
         dimensions: Optional[Dict[str, str]] = None
     ) -> None:
         """
-        CloudWatchメトリクスを送信
+        CloudWatchメトリクスをバッファに記録
+        
+        The metric is written by the next flush_metrics() call.
         
         Args:
             metric_name: メトリクス名
@@ -365,28 +599,21 @@ class LivenessService:
         Requirements: NFR-3, Task 22
         """
         try:
-            metric_data = {
-                'MetricName': metric_name,
-                'Value': value,
-                'Unit': unit,
-                'Timestamp': datetime.now(timezone.utc)
-            }
-            
-            if dimensions:
-                metric_data['Dimensions'] = [
-                    {'Name': k, 'Value': v} for k, v in dimensions.items()
-                ]
-            
-            self.cloudwatch.put_metric_data(
-                Namespace='FaceAuth/Liveness',
-                MetricData=[metric_data]
-            )
-            
-            logger.debug(f"Metric sent: {metric_name}={value} {unit}")
+            self.metrics.add(metric_name, value, unit, dimensions)
+            logger.debug(f"Metric recorded: {metric_name}={value} {unit}")
             
         except Exception as e:
             # メトリクス送信失敗はログのみ（処理は継続）
-            logger.warning(f"Failed to send metric {metric_name}: {str(e)}")
+            logger.warning(f"Failed to record metric {metric_name}: {str(e)}")
+    
+    def flush_metrics(self) -> int:
+        """
+        バッファ済みメトリクスを一括送信
+        
+        Returns:
+            int: Number of metric values flushed
+        """
+        return self.metrics.flush()
     
     def send_liveness_metrics(
         self,
@@ -434,7 +661,7 @@ class LivenessService:
                 self._send_metric('FailureCount', 1.0, 'Count')
             
             logger.info(
-                f"Liveness metrics sent",
+                f"Liveness metrics recorded",
                 extra={
                     'session_id': session_id,
                     'status': result.status,
@@ -10,7 +10,7 @@ This module defines the core data models for the Face-Auth system:
 Requirements: 5.5, 7.4
 """
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 from decimal import Decimal
@@ -294,13 +294,17 @@ class EmployeeFaceRecord:
     
     Attributes:
         employee_id: Partition key - employee identifier
-        face_id: Amazon Rekognition face identifier
+        face_id: Amazon Rekognition face identifier of the primary enrollment image
         enrollment_date: Date of face enrollment
         last_login: Last successful login timestamp
         thumbnail_s3_key: S3 key for face thumbnail
         is_active: Whether face data is active
         re_enrollment_count: Number of re-enrollments
         face_data: Embedded face recognition data
+        face_ids: All face identifiers associated with the employee's Rekognition user
+        collection_id: Rekognition collection (shard) holding the faces
+        face_image_s3_key: S3 key of the full-resolution enrollment face image
+            (the 1:1 verification target; missing on records enrolled before it was kept)
     """
     employee_id: str
     face_id: str
@@ -310,6 +314,9 @@ class EmployeeFaceRecord:
     is_active: bool
     re_enrollment_count: int
     face_data: FaceData
+    face_ids: List[str] = field(default_factory=list)
+    collection_id: Optional[str] = None
+    face_image_s3_key: Optional[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for DynamoDB storage"""
@@ -321,7 +328,10 @@ class EmployeeFaceRecord:
             'thumbnail_s3_key': self.thumbnail_s3_key,
             'is_active': self.is_active,
             're_enrollment_count': self.re_enrollment_count,
-            'face_data': self.face_data.to_dict()
+            'face_data': self.face_data.to_dict(),
+            'face_ids': list(self.face_ids or [self.face_id]),
+            'collection_id': self.collection_id,
+            'face_image_s3_key': self.face_image_s3_key
         }
         return data
     
@@ -336,7 +346,10 @@ class EmployeeFaceRecord:
             thumbnail_s3_key=data['thumbnail_s3_key'],
             is_active=data['is_active'],
             re_enrollment_count=data['re_enrollment_count'],
-            face_data=FaceData.from_dict(data['face_data'])
+            face_data=FaceData.from_dict(data['face_data']),
+            face_ids=list(data.get('face_ids') or [data['face_id']]),
+            collection_id=data.get('collection_id'),
+            face_image_s3_key=data.get('face_image_s3_key')
         )
 
 
@@ -27,6 +27,7 @@ from .models import (
     ErrorCodes
 )
 from .dynamodb_service import DynamoDBService
+from .image_probe import sniff_format
 
 logger = logging.getLogger(__name__)
 
@@ -42,24 +43,31 @@ class OCRService:
     - Error handling for unsupported card formats
     """
     
-    def __init__(self, region_name: str = 'ap-northeast-1'):
+    def __init__(self, region_name: str = 'ap-northeast-1',
+                 rekognition_client: Optional[Any] = None,
+                 db_service: Optional[DynamoDBService] = None):
         """
         Initialize OCR service
         
         Args:
             region_name: AWS region name
+            rekognition_client: Boto3 Rekognition client (optional, created if not provided)
+            db_service: Initialized DynamoDBService to share (optional, created if not provided)
         """
-        # Configure Rekognition client with timeout settings
-        from botocore.config import Config
-        
-        config = Config(
-            read_timeout=10,  # 10 seconds read timeout
-            connect_timeout=5,  # 5 seconds connect timeout
-            retries={'max_attempts': 1}  # No retries for faster failure
-        )
+        if rekognition_client is None:
+            # Configure Rekognition client with timeout settings
+            from botocore.config import Config
+            
+            config = Config(
+                read_timeout=10,  # 10 seconds read timeout
+                connect_timeout=5,  # 5 seconds connect timeout
+                retries={'max_attempts': 1}  # No retries for faster failure
+            )
+            
+            rekognition_client = boto3.client('rekognition', region_name=region_name, config=config)
         
-        self.rekognition = boto3.client('rekognition', region_name=region_name, config=config)
-        self.db_service = DynamoDBService(region_name)
+        self.rekognition = rekognition_client
+        self.db_service = db_service or DynamoDBService(region_name)
         self.confidence_threshold = 80.0  # Minimum confidence for text detection (80%)
         
     def initialize_db_service(self, card_templates_table_name: str, 
@@ -86,9 +94,9 @@ class OCRService:
         
         This method:
         1. Retrieves all active card templates from DynamoDB
-        2. Attempts to match the card against each template
-        3. Extracts employee information using the matching template
-        4. Validates the extracted information
+        2. Calls Rekognition DetectText once for the image
+        3. Evaluates every template against the shared detected lines
+        4. Returns the highest-scoring template's validated EmployeeInfo
         
         Args:
             image_bytes: ID card image data as bytes
@@ -111,21 +119,35 @@ class OCRService:
                     request_id=request_id or "unknown"
                 )
             
-            # Try each template until one matches
+            # Run DetectText once; every template is evaluated against the same lines
+            detected_texts, error = self._detect_text_lines(image_bytes, request_id)
+            if error:
+                return None, error
+            
+            # Score every template and keep the best candidate
+            candidates = []
             for template in templates:
-                logger.info(f"Attempting extraction with template: {template.pattern_id}")
-                
-                employee_info, error = self._extract_with_template(
-                    image_bytes, template, request_id
-                )
+                employee_info, reason = self._evaluate_template(detected_texts, template)
                 
                 if employee_info:
-                    logger.info(f"Successfully extracted info with template: {template.pattern_id}")
-                    return employee_info, None
-                    
-                # Log template-specific failure but continue trying other templates
-                if error:
-                    logger.debug(f"Template {template.pattern_id} failed: {error.system_reason}")
+                    logger.info(f"Template {template.pattern_id} matched with score "
+                               f"{employee_info.extracted_confidence:.2f}")
+                    candidates.append((employee_info, template))
+                else:
+                    # Log template-specific failure but continue evaluating other templates
+                    logger.debug(f"Template {template.pattern_id} failed: {reason}")
+            
+            if candidates:
+                # Rank by extraction confidence, then by template specificity (number of
+                # validated fields); stable sort keeps template order as the final tie-breaker
+                candidates.sort(
+                    key=lambda c: (c[0].extracted_confidence, len(c[1].fields)),
+                    reverse=True
+                )
+                employee_info, template = candidates[0]
+                logger.info(f"Successfully extracted info with template: {template.pattern_id} "
+                           f"({len(candidates)}/{len(templates)} templates matched)")
+                return employee_info, None
             
             # No template matched
             logger.warning("No card template matched the provided image")
@@ -150,7 +172,7 @@ class OCRService:
     def _extract_with_template(self, image_bytes: bytes, template: CardTemplate, 
                              request_id: str = None) -> Tuple[Optional[EmployeeInfo], Optional[ErrorResponse]]:
         """
-        Extract employee information using Rekognition text detection
+        Extract employee information using a single specific template
         
         Args:
             image_bytes: ID card image data
@@ -160,97 +182,66 @@ class OCRService:
         Returns:
             Tuple of (EmployeeInfo or None, ErrorResponse or None)
         """
-        try:
-            # Call Amazon Rekognition DetectText
-            logger.info(f"Calling Rekognition DetectText for template {template.pattern_id}")
-            
-            import time
-            start_time = time.time()
-            
-            try:
-                response = self.rekognition.detect_text(
-                    Image={'Bytes': image_bytes}
-                )
-                
-                elapsed_time = time.time() - start_time
-                logger.info(f"Rekognition completed in {elapsed_time:.2f} seconds")
-                
-            except Exception as e:
-                elapsed_time = time.time() - start_time
-                logger.error(f"Rekognition failed after {elapsed_time:.2f} seconds: {str(e)}")
-                
-                # Check if it's a timeout
-                if 'timeout' in str(e).lower() or 'timed out' in str(e).lower():
-                    return None, ErrorResponse(
-                        error_code=ErrorCodes.TIMEOUT_ERROR,
-                        user_message="処理時間が超過しました",
-                        system_reason=f"Rekognition timeout after {elapsed_time:.2f}s",
-                        timestamp=datetime.now(),
-                        request_id=request_id or "unknown"
-                    )
-                raise
-            
-            # Parse Rekognition response
-            extracted_data = self._parse_rekognition_response(response, template)
-            
-            # Early exit if no data extracted
-            if not extracted_data:
-                logger.warning(f"No data extracted with template {template.pattern_id}")
-                return None, ErrorResponse(
-                    error_code=ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                    user_message="社員証規格不一致",
-                    system_reason=f"Template {template.pattern_id} extracted no valid data",
-                    timestamp=datetime.now(),
-                    request_id=request_id or "unknown"
-                )
-            
-            # Check if required fields are present
-            required_fields = ['employee_id', 'employee_name']
-            missing_fields = [f for f in required_fields if f not in extracted_data or not extracted_data[f]]
+        detected_texts, error = self._detect_text_lines(image_bytes, request_id)
+        if error:
+            return None, error
+        
+        employee_info, reason = self._evaluate_template(detected_texts, template)
+        if employee_info:
+            return employee_info, None
+        
+        return None, ErrorResponse(
+            error_code=ErrorCodes.ID_CARD_FORMAT_MISMATCH,
+            user_message="社員証規格不一致",
+            system_reason=reason,
+            timestamp=datetime.now(),
+            request_id=request_id or "unknown"
+        )
+    
+    def _detect_text_lines(self, image_bytes: bytes, 
+                          request_id: str = None) -> Tuple[Optional[List[str]], Optional[ErrorResponse]]:
+        """
+        Call Rekognition DetectText and return LINE texts above the confidence threshold
+        
+        Args:
+            image_bytes: ID card image data
+            request_id: Request identifier for error tracking
             
-            if missing_fields:
-                logger.warning(f"Missing required fields: {missing_fields}")
-                return None, ErrorResponse(
-                    error_code=ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                    user_message="社員証規格不一致",
-                    system_reason=f"Missing required fields: {', '.join(missing_fields)}",
-                    timestamp=datetime.now(),
-                    request_id=request_id or "unknown"
-                )
+        Returns:
+            Tuple of (list of detected text lines or None, ErrorResponse or None)
+        """
+        logger.info("Calling Rekognition DetectText")
+        
+        import time
+        start_time = time.time()
+        
+        try:
+            response = self.rekognition.detect_text(
+                Image={'Bytes': image_bytes}
+            )
             
-            # Validate extracted data against template expectations
-            if not template.validate_extracted_data(extracted_data):
-                logger.debug(f"Extracted data failed validation for template {template.pattern_id}")
-                return None, ErrorResponse(
-                    error_code=ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                    user_message="社員証規格不一致",
-                    system_reason=f"Template {template.pattern_id} data validation failed",
-                    timestamp=datetime.now(),
-                    request_id=request_id or "unknown"
-                )
+            elapsed_time = time.time() - start_time
+            logger.info(f"Rekognition completed in {elapsed_time:.2f} seconds")
             
-            # Create EmployeeInfo from extracted data
-            employee_info = self._create_employee_info(extracted_data, template)
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            logger.error(f"Rekognition failed after {elapsed_time:.2f} seconds: {str(e)}")
             
-            # Final validation of EmployeeInfo
-            if not employee_info.validate():
-                logger.warning(f"EmployeeInfo validation failed for template {template.pattern_id}")
+            # Check if it's a timeout
+            if 'timeout' in str(e).lower() or 'timed out' in str(e).lower():
                 return None, ErrorResponse(
-                    error_code=ErrorCodes.ID_CARD_FORMAT_MISMATCH,
-                    user_message="社員証規格不一致",
-                    system_reason=f"Employee info validation failed: {extracted_data}",
+                    error_code=ErrorCodes.TIMEOUT_ERROR,
+                    user_message="処理時間が超過しました",
+                    system_reason=f"Rekognition timeout after {elapsed_time:.2f}s",
                     timestamp=datetime.now(),
                     request_id=request_id or "unknown"
                 )
             
-            return employee_info, None
-            
-        except Exception as e:
             # Check if it's a Rekognition-specific exception
             error_code = getattr(e, 'response', {}).get('Error', {}).get('Code', '')
             
             if error_code == 'InvalidParameterException':
-                logger.error(f"Invalid Rekognition parameters for template {template.pattern_id}: {str(e)}")
+                logger.error(f"Invalid Rekognition parameters: {str(e)}")
                 return None, ErrorResponse(
                     error_code=ErrorCodes.GENERIC_ERROR,
                     user_message="明るい場所で再度お試しください",
@@ -259,7 +250,7 @@ class OCRService:
                     request_id=request_id or "unknown"
                 )
             elif error_code == 'InvalidImageFormatException':
-                logger.error(f"Invalid image format for template {template.pattern_id}: {str(e)}")
+                logger.error(f"Invalid image format: {str(e)}")
                 return None, ErrorResponse(
                     error_code=ErrorCodes.ID_CARD_FORMAT_MISMATCH,
                     user_message="社員証規格不一致",
@@ -268,14 +259,56 @@ class OCRService:
                     request_id=request_id or "unknown"
                 )
             else:
-                logger.error(f"Error extracting with template {template.pattern_id}: {str(e)}")
                 return None, ErrorResponse(
                     error_code=ErrorCodes.GENERIC_ERROR,
                     user_message="明るい場所で再度お試しください",
-                    system_reason=f"Template extraction error: {str(e)}",
+                    system_reason=f"Text detection error: {str(e)}",
                     timestamp=datetime.now(),
                     request_id=request_id or "unknown"
                 )
+        
+        return self._collect_detected_lines(response), None
+    
+    def _evaluate_template(self, detected_texts: List[str], 
+                          template: CardTemplate) -> Tuple[Optional[EmployeeInfo], Optional[str]]:
+        """
+        Evaluate one card template against already-detected text lines
+        
+        No AWS calls are made here, so all templates can be scored against
+        the result of a single DetectText call.
+        
+        Args:
+            detected_texts: Text lines returned by _detect_text_lines
+            template: CardTemplate to evaluate
+            
+        Returns:
+            Tuple of (EmployeeInfo or None, failure reason or None)
+        """
+        extracted_data = self._parse_detected_lines(detected_texts, template)
+        
+        # Early exit if no data extracted
+        if not extracted_data:
+            return None, f"Template {template.pattern_id} extracted no valid data"
+        
+        # Check if required fields are present
+        required_fields = ['employee_id', 'employee_name']
+        missing_fields = [f for f in required_fields if f not in extracted_data or not extracted_data[f]]
+        
+        if missing_fields:
+            return None, f"Missing required fields: {', '.join(missing_fields)}"
+        
+        # Validate extracted data against template expectations
+        if not template.validate_extracted_data(extracted_data):
+            return None, f"Template {template.pattern_id} data validation failed"
+        
+        # Create EmployeeInfo from extracted data
+        employee_info = self._create_employee_info(extracted_data, template)
+        
+        # Final validation of EmployeeInfo
+        if not employee_info.validate():
+            return None, f"Employee info validation failed: {extracted_data}"
+        
+        return employee_info, None
     
     def _parse_rekognition_response(self, response: Dict[str, Any], 
                                    template: CardTemplate) -> Dict[str, str]:
@@ -289,12 +322,22 @@ class OCRService:
         Returns:
             Dictionary mapping field names to extracted values
         """
-        extracted_data = {}
+        return self._parse_detected_lines(self._collect_detected_lines(response), template)
+    
+    def _collect_detected_lines(self, response: Dict[str, Any]) -> List[str]:
+        """
+        Collect LINE detections above the confidence threshold
         
+        Args:
+            response: Rekognition detect_text response
+            
+        Returns:
+            List of detected text strings
+        """
         # Parse text detections from Rekognition response
         if 'TextDetections' not in response:
             logger.warning("No text detections found in Rekognition response")
-            return extracted_data
+            return []
         
         # Collect all detected text with confidence above threshold
         detected_texts = []
@@ -308,26 +351,41 @@ class OCRService:
                         logger.debug(f"Detected text: '{text}' (confidence: {confidence:.2f}%)")
         
         logger.info(f"Found {len(detected_texts)} text lines above confidence threshold")
+        return detected_texts
+    
+    def _parse_detected_lines(self, detected_texts: List[str], 
+                             template: CardTemplate) -> Dict[str, str]:
+        """
+        Extract employee fields from detected text lines
+        
+        Args:
+            detected_texts: Text lines above the confidence threshold
+            template: CardTemplate used for extraction (for validation)
+            
+        Returns:
+            Dictionary mapping field names to extracted values
+        """
+        extracted_data = {}
         
         # Extract employee ID (7 digits)
         employee_id = self._extract_employee_id(detected_texts)
         if employee_id:
             extracted_data['employee_id'] = employee_id
-            logger.info(f"Extracted employee_id: {employee_id}")
+            logger.debug(f"Extracted employee_id: {employee_id}")
         
         # Extract employee name (Japanese characters)
         employee_name = self._extract_japanese_name(detected_texts)
         if employee_name:
             extracted_data['employee_name'] = employee_name
-            logger.info(f"Extracted employee_name: {employee_name}")
+            logger.debug(f"Extracted employee_name: {employee_name}")
         
         # Extract department (optional - Japanese text that's not the name)
         department = self._extract_department(detected_texts, employee_name)
         if department:
             extracted_data['department'] = department
-            logger.info(f"Extracted department: {department}")
+            logger.debug(f"Extracted department: {department}")
         
-        logger.info(f"Extracted {len(extracted_data)} fields from Rekognition response")
+        logger.debug(f"Extracted {len(extracted_data)} fields for template {template.pattern_id}")
         return extracted_data
     
     def _extract_employee_id(self, texts: List[str]) -> Optional[str]:
@@ -527,14 +585,9 @@ class OCRService:
                 return False, "Image too large (max 5MB)"
             
             # Basic format validation - check for common image headers
-            if image_bytes.startswith(b'\xff\xd8\xff'):
-                return True, "JPEG"
-            elif image_bytes.startswith(b'\x89PNG'):
-                return True, "PNG"
-            elif image_bytes.startswith(b'GIF8'):
-                return True, "GIF"
-            elif image_bytes.startswith(b'RIFF') and b'WEBP' in image_bytes[:12]:
-                return True, "WEBP"
+            image_format = sniff_format(image_bytes)
+            if image_format:
+                return True, image_format
             else:
                 return False, "Unsupported image format"
                 
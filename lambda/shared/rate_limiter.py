@@ -0,0 +1,176 @@
+"""
+Face-Auth IdP System - Atomic Rate Limiter
+
+This module provides the sliding-window-counter rate limiter shared by the auth handlers:
+- One conditional DynamoDB UpdateItem (ADD) per check, so concurrent attempts
+  can never undercount
+- Counters for the current and previous fixed window live on one item; the
+  previous window is weighted by how much of it still overlaps the sliding window
+- Keys known to be blocked are short-circuited in the warm container without
+  calling DynamoDB at all
+- DynamoDB errors fail open, as rate limiting is a protection layer and must
+  not take authentication down with it
+
+Item layout (partition key 'identifier'):
+    {'identifier': 'emergency#203.0.113.7', 'w_1893456': 3, 'w_1893455': 5, 'ttl': ...}
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+
+# Blocked keys remembered per container before expired entries are pruned
+LOCAL_BLOCK_CACHE_SIZE = 1024
+
+
+@dataclass
+class RateLimitDecision:
+    """
+    Outcome of a rate limit check
+
+    Attributes:
+        allowed: Whether the attempt may proceed
+        attempts: Estimated attempts in the sliding window, this one included
+        retry_after: Seconds until a blocked key may try again (0 if allowed)
+    """
+    allowed: bool
+    attempts: float
+    retry_after: int = 0
+
+
+class RateLimiter:
+    """
+    Sliding-window-counter rate limiter backed by a DynamoDB table
+
+    Handles:
+    - Atomically counting attempts per identifier
+    - Deciding whether an identifier is over its limit
+    - Remembering blocked identifiers locally until their window rolls over
+    - Resetting an identifier after a successful authentication
+    """
+
+    def __init__(self, table_name: str, max_attempts: int, window_seconds: int,
+                 region_name: str = 'ap-northeast-1', dynamodb_resource: Optional[Any] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize rate limiter
+
+        Args:
+            table_name: DynamoDB table with partition key 'identifier' and TTL attribute 'ttl'
+            max_attempts: Attempts allowed per sliding window
+            window_seconds: Length of the sliding window
+            region_name: AWS region
+            dynamodb_resource: Boto3 DynamoDB resource (created if not provided)
+            clock: Epoch-seconds clock (injectable for tests)
+        """
+        if dynamodb_resource is None:
+            import boto3
+            dynamodb_resource = boto3.resource('dynamodb', region_name=region_name)
+
+        self.table = dynamodb_resource.Table(table_name)
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def check(self, identifier: str) -> RateLimitDecision:
+        """
+        Count an attempt for an identifier and decide whether it may proceed
+
+        Args:
+            identifier: Rate limit key (e.g. 'emergency#<ip>')
+
+        Returns:
+            RateLimitDecision
+        """
+        now = self.clock()
+
+        blocked_until = self._local_block(identifier, now)
+        if blocked_until:
+            return RateLimitDecision(False, float(self.max_attempts), int(blocked_until - now) + 1)
+
+        window = int(now // self.window_seconds)
+        current_attr = f"w_{window}"
+        previous_attr = f"w_{window - 1}"
+        window_end = (window + 1) * self.window_seconds
+
+        try:
+            response = self.table.update_item(
+                Key={'identifier': identifier},
+                UpdateExpression='ADD #current :one SET #ttl = :ttl REMOVE #stale',
+                # Stop counting once the current window alone is full; nothing is written then
+                ConditionExpression='attribute_not_exists(#current) OR #current < :max',
+                ExpressionAttributeNames={
+                    '#current': current_attr,
+                    '#ttl': 'ttl',
+                    '#stale': f"w_{window - 2}"
+                },
+                ExpressionAttributeValues={
+                    ':one': 1,
+                    ':max': self.max_attempts,
+                    ':ttl': int(window_end + self.window_seconds)
+                },
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                self._remember_block(identifier, window_end, now)
+                logger.warning(f"Rate limit exceeded for {identifier}")
+                return RateLimitDecision(False, float(self.max_attempts), int(window_end - now) + 1)
+            logger.warning(f"Rate limit check failed for {identifier}: {str(e)}, allowing attempt")
+            return RateLimitDecision(True, 0.0)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed for {identifier}: {str(e)}, allowing attempt")
+            return RateLimitDecision(True, 0.0)
+
+        item = response.get('Attributes', {})
+        overlap = 1.0 - (now - window * self.window_seconds) / self.window_seconds
+        attempts = int(item.get(current_attr, 0)) + int(item.get(previous_attr, 0)) * overlap
+
+        if attempts > self.max_attempts:
+            self._remember_block(identifier, window_end, now)
+            logger.warning(f"Rate limit exceeded for {identifier}: {attempts:.1f} attempts")
+            return RateLimitDecision(False, attempts, int(window_end - now) + 1)
+
+        return RateLimitDecision(True, attempts)
+
+    def reset(self, identifier: str) -> None:
+        """
+        Clear an identifier's counters (e.g. after a successful authentication)
+
+        Args:
+            identifier: Rate limit key
+        """
+        with self._lock:
+            self._blocked_until.pop(identifier, None)
+
+        try:
+            self.table.delete_item(Key={'identifier': identifier})
+        except Exception as e:
+            logger.warning(f"Failed to reset rate limit for {identifier}: {str(e)}")
+
+    def _local_block(self, identifier: str, now: float) -> Optional[float]:
+        """Get the time a locally known block ends, if it is still in force"""
+        with self._lock:
+            blocked_until = self._blocked_until.get(identifier)
+            if blocked_until is not None and blocked_until <= now:
+                del self._blocked_until[identifier]
+                return None
+            return blocked_until
+
+    def _remember_block(self, identifier: str, until: float, now: float) -> None:
+        """Remember a blocked identifier for the rest of its window"""
+        with self._lock:
+            if len(self._blocked_until) >= LOCAL_BLOCK_CACHE_SIZE:
+                self._blocked_until = {
+                    key: expiry for key, expiry in self._blocked_until.items() if expiry > now
+                }
+            self._blocked_until[identifier] = until
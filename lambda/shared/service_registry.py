@@ -0,0 +1,467 @@
+"""
+Face-Auth IdP System - Warm Container Service Registry
+
+This module keeps AWS clients and service objects alive across invocations
+of the same Lambda container:
+- Builds each boto3 client once per (service, region) with a tuned botocore Config
+- Derives client timeouts and retries from a request's time budget, bucketed
+  so that a warm container only holds a few clients per service
+- Caches service instances (FaceRecognitionService, CognitoService, ...) by their arguments
+- Shares clients between services so connection pools stay warm
+- Allows tests to inject fakes via register() and to start clean via reset()
+
+Handlers should obtain services through get_registry() instead of calling the
+service constructors directly on every invocation.
+"""
+
+import boto3
+import logging
+import os
+import threading
+from botocore.config import Config
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .timeout_manager import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+
+# Per-service client profiles: (connect_timeout, read_timeout, max_attempts)
+CLIENT_PROFILES: Dict[str, Tuple[float, float, int]] = {
+    'rekognition': (2, 10, 2),
+    # OCR fails fast instead of retrying DetectText (matches OCRService defaults)
+    'rekognition-ocr': (5, 10, 1),
+    'dynamodb': (1, 3, 3),
+    'cognito-idp': (2, 5, 2),
+    's3': (2, 10, 3),
+    'cloudwatch': (1, 3, 2),
+}
+
+DEFAULT_PROFILE: Tuple[float, float, int] = (2, 10, 2)
+
+# Profile aliases that map onto a real boto3 service name
+PROFILE_SERVICE_NAMES: Dict[str, str] = {
+    'rekognition-ocr': 'rekognition',
+}
+
+# Time budgets are rounded down to one of these values (seconds) before a
+# client is built for them. The smallest bucket matches the default minimum
+# of TimeoutManager.require_budget().
+BUDGET_BUCKETS: Tuple[float, ...] = (0.5, 1, 2, 3, 5, 8, 13)
+
+
+def budget_bucket(budget_seconds: Optional[float]) -> Optional[float]:
+    """
+    Round a time budget down to a client bucket
+
+    Rounding never goes up, so a client's timeouts never exceed the time
+    actually left.
+
+    Args:
+        budget_seconds: Time budget in seconds (None for no budget)
+
+    Returns:
+        Largest bucket not above the budget, or None without a budget
+
+    Raises:
+        DeadlineExceededError: If the budget is below the smallest bucket
+    """
+    if budget_seconds is None:
+        return None
+    fitting = [bucket for bucket in BUDGET_BUCKETS if bucket <= budget_seconds]
+    if not fitting:
+        raise DeadlineExceededError(f"Time budget {budget_seconds:.2f}s is too small for a client call")
+    return fitting[-1]
+
+
+def build_client_config(profile: str, budget_seconds: Optional[float] = None) -> Config:
+    """
+    Build the botocore Config used for a service client profile
+
+    All profiles share the same connection pool size, TCP keep-alive and the
+    'standard' retry mode; timeouts and attempt counts vary per service.
+    With a budget, connect and read timeouts are capped at it and only as
+    many attempts are allowed as fit into it at worst-case latency.
+
+    Args:
+        profile: Profile name from CLIENT_PROFILES (usually the boto3 service name)
+        budget_seconds: Time the calls made with this client may take in total
+
+    Returns:
+        Config: botocore client configuration
+    """
+    connect_timeout, read_timeout, max_attempts = CLIENT_PROFILES.get(profile, DEFAULT_PROFILE)
+
+    if budget_seconds is not None:
+        connect_timeout = min(connect_timeout, budget_seconds)
+        read_timeout = min(read_timeout, budget_seconds)
+        max_attempts = max(1, min(max_attempts, int(budget_seconds // (connect_timeout + read_timeout))))
+
+    return Config(
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={'mode': 'standard', 'max_attempts': max_attempts},
+        max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '20')),
+        tcp_keepalive=True
+    )
+
+
+class ServiceRegistry:
+    """
+    Per-container cache of boto3 clients and Face-Auth service objects
+
+    Handles:
+    - Lazily creating tuned boto3 clients and resources
+    - Reusing service instances for identical constructor arguments
+    - Test injection of fake clients or services
+    """
+
+    def __init__(self, region_name: Optional[str] = None, session: Optional[boto3.session.Session] = None):
+        """
+        Initialize service registry
+
+        Args:
+            region_name: Default AWS region (falls back to AWS_REGION, then us-east-1)
+            session: Boto3 session to build clients from (optional, created lazily)
+        """
+        self.region_name = region_name or os.environ.get('AWS_REGION', 'us-east-1')
+        self._session = session
+        self._instances: Dict[Hashable, Any] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def session(self) -> boto3.session.Session:
+        """Boto3 session shared by every client in this registry"""
+        if self._session is None:
+            self._session = boto3.session.Session()
+        return self._session
+
+    def _get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Return the cached instance for key, creating it with factory on first use
+
+        Args:
+            key: Cache key
+            factory: Zero-argument callable building the instance
+
+        Returns:
+            Cached or newly created instance
+        """
+        with self._lock:
+            if key not in self._instances:
+                self._instances[key] = factory()
+                logger.debug(f"Service registry created {key}")
+            return self._instances[key]
+
+    def register(self, key: Hashable, instance: Any) -> None:
+        """
+        Register a pre-built client or service (used by tests to inject fakes)
+
+        Keys follow the accessor naming, e.g. ('client', 's3', 'us-east-1') or
+        ('cognito', user_pool_id, client_id, region).
+
+        Args:
+            key: Cache key the accessor would use
+            instance: Object to return for that key
+        """
+        with self._lock:
+            self._instances[key] = instance
+
+    def reset(self) -> None:
+        """Drop every cached client and service"""
+        with self._lock:
+            self._instances.clear()
+            self._session = None
+
+    # AWS clients
+
+    def client(self, profile: str, region_name: Optional[str] = None,
+               budget_seconds: Optional[float] = None) -> Any:
+        """
+        Get a boto3 client for a profile
+
+        Args:
+            profile: Boto3 service name or profile alias (e.g. 'rekognition-ocr')
+            region_name: AWS region (registry default if not provided)
+            budget_seconds: Time budget the client's timeouts and retries must fit in
+
+        Returns:
+            Boto3 client
+        """
+        region = region_name or self.region_name
+        service_name = PROFILE_SERVICE_NAMES.get(profile, profile)
+        bucket = budget_bucket(budget_seconds)
+
+        return self._get_or_create(
+            ('client', profile, region) + _budget_key(bucket),
+            lambda: self.session.client(service_name, region_name=region,
+                                        config=build_client_config(profile, bucket))
+        )
+
+    def dynamodb_resource(self, region_name: Optional[str] = None) -> Any:
+        """
+        Get a DynamoDB service resource
+
+        Args:
+            region_name: AWS region (registry default if not provided)
+
+        Returns:
+            Boto3 DynamoDB service resource
+        """
+        region = region_name or self.region_name
+
+        return self._get_or_create(
+            ('resource', 'dynamodb', region),
+            lambda: self.session.resource('dynamodb', region_name=region,
+                                          config=build_client_config('dynamodb'))
+        )
+
+    # Face-Auth services
+
+    def face_recognition_service(self, collection_id: Optional[str] = None,
+                                 region_name: Optional[str] = None,
+                                 budget_seconds: Optional[float] = None) -> Any:
+        """
+        Get a FaceRecognitionService bound to a collection
+
+        Args:
+            collection_id: Rekognition collection ID
+            region_name: AWS region
+            budget_seconds: Time budget for the service's Rekognition calls
+
+        Returns:
+            FaceRecognitionService
+        """
+        from .face_recognition_service import FaceRecognitionService
+
+        region = region_name or self.region_name
+        bucket = budget_bucket(budget_seconds)
+
+        return self._get_or_create(
+            ('face_recognition', collection_id, region) + _budget_key(bucket),
+            lambda: FaceRecognitionService(
+                region_name=region,
+                collection_id=collection_id,
+                rekognition_client=self.client('rekognition', region, bucket)
+            )
+        )
+
+    def dynamodb_service(self, card_templates_table: str, employee_faces_table: str,
+                         auth_sessions_table: str, region_name: Optional[str] = None) -> Any:
+        """
+        Get a DynamoDBService with its tables initialized
+
+        Args:
+            card_templates_table: Name of CardTemplates table
+            employee_faces_table: Name of EmployeeFaces table
+            auth_sessions_table: Name of AuthSessions table
+            region_name: AWS region
+
+        Returns:
+            DynamoDBService
+        """
+        from .dynamodb_service import DynamoDBService
+
+        region = region_name or self.region_name
+
+        def build() -> Any:
+            db_service = DynamoDBService(region, dynamodb_resource=self.dynamodb_resource(region))
+            db_service.initialize_tables(card_templates_table, employee_faces_table, auth_sessions_table)
+            return db_service
+
+        return self._get_or_create(
+            ('dynamodb_service', card_templates_table, employee_faces_table, auth_sessions_table, region),
+            build
+        )
+
+    def ocr_service(self, card_templates_table: str, employee_faces_table: str,
+                    auth_sessions_table: str, region_name: Optional[str] = None,
+                    budget_seconds: Optional[float] = None) -> Any:
+        """
+        Get an OCRService sharing the registry's DynamoDBService
+
+        Args:
+            card_templates_table: Name of CardTemplates table
+            employee_faces_table: Name of EmployeeFaces table
+            auth_sessions_table: Name of AuthSessions table
+            region_name: AWS region
+            budget_seconds: Time budget for the DetectText call
+
+        Returns:
+            OCRService
+        """
+        from .ocr_service import OCRService
+
+        region = region_name or self.region_name
+        bucket = budget_bucket(budget_seconds)
+
+        return self._get_or_create(
+            ('ocr', card_templates_table, employee_faces_table, auth_sessions_table, region)
+            + _budget_key(bucket),
+            lambda: OCRService(
+                region_name=region,
+                rekognition_client=self.client('rekognition-ocr', region, bucket),
+                db_service=self.dynamodb_service(card_templates_table, employee_faces_table,
+                                                 auth_sessions_table, region)
+            )
+        )
+
+    def cognito_service(self, user_pool_id: str, client_id: str,
+                        region_name: Optional[str] = None,
+                        budget_seconds: Optional[float] = None) -> Any:
+        """
+        Get a CognitoService for a user pool client
+
+        Args:
+            user_pool_id: Cognito User Pool ID
+            client_id: Cognito User Pool Client ID
+            region_name: AWS region
+            budget_seconds: Time budget for the session's Cognito calls
+
+        Returns:
+            CognitoService
+        """
+        from .cognito_service import CognitoService
+
+        region = region_name or self.region_name
+        bucket = budget_bucket(budget_seconds)
+
+        return self._get_or_create(
+            ('cognito', user_pool_id, client_id, region) + _budget_key(bucket),
+            lambda: CognitoService(user_pool_id, client_id, region,
+                                   cognito_client=self.client('cognito-idp', region, bucket))
+        )
+
+    def thumbnail_processor(self, bucket_name: str, region_name: Optional[str] = None) -> Any:
+        """
+        Get a ThumbnailProcessor for a bucket
+
+        Args:
+            bucket_name: S3 bucket name for image storage
+            region_name: AWS region
+
+        Returns:
+            ThumbnailProcessor
+        """
+        from .thumbnail_processor import ThumbnailProcessor
+
+        region = region_name or self.region_name
+
+        return self._get_or_create(
+            ('thumbnail', bucket_name, region),
+            lambda: ThumbnailProcessor(bucket_name, region,
+                                       s3_client=self.client('s3', region))
+        )
+
+    def liveness_service(self, region_name: Optional[str] = None,
+                         budget_seconds: Optional[float] = None) -> Any:
+        """
+        Get a LivenessService using the registry's clients
+
+        Args:
+            region_name: AWS region
+            budget_seconds: Time budget for fetching the Liveness session result
+
+        Returns:
+            LivenessService
+        """
+        from .liveness_service import LivenessService
+
+        region = region_name or self.region_name
+        bucket = budget_bucket(budget_seconds)
+
+        return self._get_or_create(
+            ('liveness', region) + _budget_key(bucket),
+            lambda: LivenessService(
+                # Every client shares the budget: get_session_result also reads and writes DynamoDB
+                rekognition_client=self.client('rekognition', region, bucket),
+                dynamodb_client=self.client('dynamodb', region, bucket),
+                s3_client=self.client('s3', region, bucket),
+                cloudwatch_client=self.client('cloudwatch', region, bucket)
+            )
+        )
+
+    def rate_limiter(self, table_name: str, max_attempts: int, window_seconds: int,
+                     region_name: Optional[str] = None) -> Any:
+        """
+        Get a RateLimiter whose local block cache lives as long as the container
+
+        Args:
+            table_name: Rate limit table name
+            max_attempts: Attempts allowed per sliding window
+            window_seconds: Length of the sliding window
+            region_name: AWS region
+
+        Returns:
+            RateLimiter
+        """
+        from .rate_limiter import RateLimiter
+
+        region = region_name or self.region_name
+
+        return self._get_or_create(
+            ('rate_limiter', table_name, max_attempts, window_seconds, region),
+            lambda: RateLimiter(table_name, max_attempts, window_seconds, region,
+                                dynamodb_resource=self.dynamodb_resource(region))
+        )
+
+    def collection_router(self, default_collection: str) -> Any:
+        """
+        Get the CollectionRouter built from COLLECTION_ROUTING
+
+        Args:
+            default_collection: Collection used when no default route is configured
+
+        Returns:
+            CollectionRouter
+        """
+        from .collection_routing import CollectionRouter
+
+        return self._get_or_create(
+            ('collection_router', default_collection),
+            lambda: CollectionRouter.from_environment(default_collection)
+        )
+
+    def error_handler(self) -> Any:
+        """
+        Get the shared ErrorHandler
+
+        Returns:
+            ErrorHandler
+        """
+        from .error_handler import ErrorHandler
+
+        return self._get_or_create(('error_handler',), ErrorHandler)
+
+
+def _budget_key(bucket: Optional[float]) -> Tuple[Any, ...]:
+    """Cache key suffix for a budget bucket (empty without a budget)"""
+    return () if bucket is None else (('budget', bucket),)
+
+
+_registry: Optional[ServiceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ServiceRegistry:
+    """
+    Get the container-wide service registry
+
+    Returns:
+        ServiceRegistry: Singleton created on first use
+    """
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ServiceRegistry()
+    return _registry
+
+
+def reset_registry() -> None:
+    """Drop the container-wide registry (tests and forced re-initialization)"""
+    global _registry
+
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,245 @@
+"""
+Face-Auth IdP System - Concurrent Step Executor
+
+This module runs the independent stages of a handler concurrently:
+- Steps are declared with the steps they depend on
+- Ready steps run on a thread pool shared across warm invocations; a step
+  starts as soon as all of its dependencies have succeeded
+- The first failure cancels every step that has not started yet
+- Per-step durations are recorded and logged
+
+Handlers either run a whole graph with run(), or start() it and collect
+results with result() at the point of their serial flow where each one is
+needed. result() re-raises the step's own exception, so existing error
+handling around the original call keeps working.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, CancelledError, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .timeout_manager import DeadlineExceededError
+
+logger = logging.getLogger(__name__)
+
+
+STEP_WORKERS = int(os.environ.get('STEP_EXECUTOR_WORKERS', '8'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    """Thread pool for handler steps, kept for the life of the container"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=STEP_WORKERS, thread_name_prefix='handler-step')
+        return _executor
+
+
+class StepFailedError(Exception):
+    """Raised by run() when a step fails, and by result() for steps cancelled by that failure"""
+
+    def __init__(self, step: str, error: BaseException):
+        super().__init__(f"Step {step} failed: {str(error)}")
+        self.step = step
+        self.error = error
+
+
+@dataclass
+class Step:
+    """
+    One stage of a step graph
+
+    Attributes:
+        name: Unique step name
+        func: Callable run for the step; receives each dependency's result
+              as a keyword argument named after the dependency
+        depends_on: Names of the steps that must succeed first
+    """
+    name: str
+    func: Callable[..., Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+class StepGraph:
+    """
+    Dependency graph of handler steps executed on a thread pool
+
+    Handles:
+    - Scheduling each step once its dependencies have succeeded
+    - Cancelling steps that have not started after the first failure
+    - Recording per-step timings
+    """
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Initialize step graph
+
+        Args:
+            executor: Thread pool to run steps on (container-wide pool if not provided)
+        """
+        self._executor = executor or _shared_executor()
+        self._steps: Dict[str, Step] = {}
+        self._futures: Dict[str, Future] = {}
+        self._submitted = set()
+        self._lock = threading.Lock()
+        self._started = False
+        self._failure: Optional[StepFailedError] = None
+        self.timings: Dict[str, float] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._steps
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Sequence[str] = ()) -> 'StepGraph':
+        """
+        Declare a step
+
+        Args:
+            name: Unique step name
+            func: Callable run for the step
+            depends_on: Names of previously added steps that must succeed first
+
+        Returns:
+            StepGraph: self, for chaining
+
+        Raises:
+            ValueError: If the name is taken, a dependency is unknown or the graph has started
+        """
+        if self._started:
+            raise ValueError("Cannot add steps after the graph has started")
+        if name in self._steps:
+            raise ValueError(f"Duplicate step: {name}")
+        unknown = [dependency for dependency in depends_on if dependency not in self._steps]
+        if unknown:
+            raise ValueError(f"Step {name} depends on unknown step(s): {', '.join(unknown)}")
+
+        self._steps[name] = Step(name, func, tuple(depends_on))
+        self._futures[name] = Future()
+        return self
+
+    def start(self) -> 'StepGraph':
+        """
+        Start every step whose dependencies are satisfied
+
+        Returns:
+            StepGraph: self, for chaining
+        """
+        self._started = True
+        self._schedule_ready()
+        return self
+
+    def result(self, name: str, timeout_seconds: Optional[float] = None) -> Any:
+        """
+        Wait for a step and return its result
+
+        Args:
+            name: Step name
+            timeout_seconds: Longest time to wait (no limit if not provided)
+
+        Returns:
+            The step's return value
+
+        Raises:
+            Exception: Whatever the step raised
+            StepFailedError: If the step was cancelled because another step failed
+            DeadlineExceededError: If the step did not finish within timeout_seconds
+        """
+        if not self._started:
+            self.start()
+
+        try:
+            return self._futures[name].result(timeout=timeout_seconds)
+        except CancelledError:
+            raise self._failure or StepFailedError(name, CancelledError())
+        except FutureTimeoutError:
+            # Not the builtin TimeoutError before Python 3.11
+            raise DeadlineExceededError(f"Step {name} did not finish within {timeout_seconds}s")
+
+    def run(self, timeout_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run the whole graph and wait for every step
+
+        Args:
+            timeout_seconds: Longest time to wait for the graph (no limit if not provided)
+
+        Returns:
+            Step name to result
+
+        Raises:
+            StepFailedError: Wrapping the first failure; remaining steps are cancelled
+            DeadlineExceededError: If the graph did not finish within timeout_seconds
+        """
+        self.start()
+
+        deadline = None if timeout_seconds is None else time.monotonic() + timeout_seconds
+        pending = set(self._futures.values())
+        # Dependents only get scheduled as their dependencies finish, so wait in rounds
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_EXCEPTION)
+            if self._failure:
+                raise self._failure
+            if not done:
+                self.cancel()
+                raise DeadlineExceededError(f"Steps {', '.join(self._pending_names())} did not finish "
+                                            f"within {timeout_seconds}s")
+
+        return {name: future.result() for name, future in self._futures.items()}
+
+    def cancel(self) -> None:
+        """Cancel every step that has not started yet (running steps finish in the background)"""
+        for future in self._futures.values():
+            future.cancel()
+
+    def _pending_names(self):
+        return [name for name, future in self._futures.items() if not future.done()]
+
+    def _schedule_ready(self) -> None:
+        """Submit steps whose dependencies have all succeeded"""
+        with self._lock:
+            ready = [
+                step for name, step in self._steps.items()
+                if name not in self._submitted and all(
+                    self._futures[dependency].done()
+                    and not self._futures[dependency].cancelled()
+                    and self._futures[dependency].exception() is None
+                    for dependency in step.depends_on
+                )
+            ]
+            self._submitted.update(step.name for step in ready)
+
+        for step in ready:
+            self._executor.submit(self._execute, step)
+
+    def _execute(self, step: Step) -> None:
+        """Run one step and record its outcome"""
+        future = self._futures[step.name]
+        if not future.set_running_or_notify_cancel():
+            return
+
+        started = time.perf_counter()
+        try:
+            kwargs = {dependency: self._futures[dependency].result() for dependency in step.depends_on}
+            value = step.func(**kwargs)
+        except BaseException as e:
+            self.timings[step.name] = time.perf_counter() - started
+            logger.warning(f"Step {step.name} failed after {self.timings[step.name] * 1000:.0f} ms: {str(e)}")
+            with self._lock:
+                if self._failure is None:
+                    self._failure = StepFailedError(step.name, e)
+            self.cancel()
+            future.set_exception(e)
+            return
+
+        self.timings[step.name] = time.perf_counter() - started
+        logger.info(f"Step {step.name} finished in {self.timings[step.name] * 1000:.0f} ms")
+        future.set_result(value)
+        self._schedule_ready()
@@ -19,6 +19,12 @@ from datetime import datetime
 import uuid
 import os
 
+# Handle imports for both Lambda and local testing
+try:
+    from .image_probe import probe_image
+except ImportError:
+    from image_probe import probe_image
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,23 +44,25 @@ class ThumbnailProcessor:
     FORMAT = 'JPEG'
     BACKGROUND_COLOR = (255, 255, 255)  # White background for padding
     
-    def __init__(self, bucket_name: str, region_name: str = 'us-east-1'):
+    def __init__(self, bucket_name: str, region_name: str = 'us-east-1',
+                 s3_client: Optional[Any] = None):
         """
         Initialize ThumbnailProcessor
         
         Args:
             bucket_name: S3 bucket name for image storage
             region_name: AWS region name
+            s3_client: Boto3 S3 client (optional, created if not provided)
         """
         self.bucket_name = bucket_name
-        self.s3_client = boto3.client('s3', region_name=region_name)
+        self.s3_client = s3_client or boto3.client('s3', region_name=region_name)
         
     def create_thumbnail(self, image_bytes: bytes) -> bytes:
         """
         Create a 200x200 pixel thumbnail from image bytes
         
         This method:
-        1. Opens the image from bytes
+        1. Opens the image from bytes (JPEGs are decoded at a reduced DCT scale)
         2. Resizes while maintaining aspect ratio
         3. Adds white padding to make it exactly 200x200
         4. Compresses to JPEG format with specified quality
@@ -71,30 +79,15 @@ class ThumbnailProcessor:
         """
         try:
             with Image.open(BytesIO(image_bytes)) as img:
+                # JPEG fast path: decode at the smallest 1/2, 1/4 or 1/8 scale that
+                # still covers the target, before convert() forces a full decode
+                self._draft_decode(img)
+                
                 # Convert to RGB if necessary (handles RGBA, grayscale, etc.)
                 if img.mode != 'RGB':
                     img = img.convert('RGB')
                 
-                # Calculate resize dimensions maintaining aspect ratio
-                img.thumbnail(self.TARGET_SIZE, Image.Resampling.LANCZOS)
-                
-                # Create new image with target size and white background
-                padded_img = Image.new('RGB', self.TARGET_SIZE, self.BACKGROUND_COLOR)
-                
-                # Calculate position to center the resized image
-                offset = (
-                    (self.TARGET_SIZE[0] - img.size[0]) // 2,
-                    (self.TARGET_SIZE[1] - img.size[1]) // 2
-                )
-                
-                # Paste the resized image onto the padded background
-                padded_img.paste(img, offset)
-                
-                # Save to bytes with specified quality
-                output = BytesIO()
-                padded_img.save(output, format=self.FORMAT, quality=self.QUALITY, optimize=True)
-                
-                thumbnail_bytes = output.getvalue()
+                thumbnail_bytes = self.render_thumbnail(img)
                 logger.info(f"Created thumbnail: {len(image_bytes)} bytes -> {len(thumbnail_bytes)} bytes")
                 
                 return thumbnail_bytes
@@ -103,6 +96,64 @@ class ThumbnailProcessor:
             logger.error(f"Error creating thumbnail: {str(e)}")
             raise ValueError(f"Failed to process image: {str(e)}")
     
+    @classmethod
+    def render_thumbnail(cls, img: Image.Image) -> bytes:
+        """
+        Render an already decoded RGB image as a padded 200x200 JPEG
+        
+        The source image is left untouched, so callers can derive other
+        outputs from the same decoded pixels.
+        
+        Args:
+            img: Decoded RGB image
+            
+        Returns:
+            bytes: Thumbnail image as JPEG bytes
+        """
+        # Calculate resize dimensions maintaining aspect ratio (never upscale)
+        resized = img
+        if img.width > cls.TARGET_SIZE[0] or img.height > cls.TARGET_SIZE[1]:
+            scale = min(cls.TARGET_SIZE[0] / img.width, cls.TARGET_SIZE[1] / img.height)
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            resized = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        
+        # Create new image with target size and white background
+        padded_img = Image.new('RGB', cls.TARGET_SIZE, cls.BACKGROUND_COLOR)
+        
+        # Calculate position to center the resized image
+        offset = (
+            (cls.TARGET_SIZE[0] - resized.size[0]) // 2,
+            (cls.TARGET_SIZE[1] - resized.size[1]) // 2
+        )
+        
+        # Paste the resized image onto the padded background
+        padded_img.paste(resized, offset)
+        
+        # Save to bytes with specified quality
+        output = BytesIO()
+        padded_img.save(output, format=cls.FORMAT, quality=cls.QUALITY, optimize=True)
+        
+        return output.getvalue()
+    
+    def _draft_decode(self, img: Image.Image) -> None:
+        """
+        Configure reduced-scale decoding for JPEG images
+        
+        Draft mode lets libjpeg scale in the DCT domain, so a 12MP photo is
+        never materialized at native resolution. No-op for other formats.
+        
+        Args:
+            img: Opened, not yet loaded image
+        """
+        if img.format != 'JPEG':
+            return
+        
+        original_size = img.size
+        img.draft('RGB', self.TARGET_SIZE)
+        
+        if img.size != original_size:
+            logger.debug(f"Draft decoding {original_size} at {img.size}")
+    
     def store_enrollment_thumbnail(self, employee_id: str, thumbnail_bytes: bytes) -> str:
         """
         Store enrollment thumbnail in S3 enroll/ folder
@@ -347,6 +398,11 @@ class ThumbnailProcessor:
         Returns:
             Tuple of (is_valid, format_or_error_message)
         """
+        # JPEG and PNG are recognized from their headers without involving Pillow
+        probe = probe_image(image_bytes)
+        if probe:
+            return True, probe.format
+        
         try:
             with Image.open(BytesIO(image_bytes)) as img:
                 return True, img.format
@@ -363,6 +419,10 @@ class ThumbnailProcessor:
         Returns:
             Tuple of (width, height) or None if invalid
         """
+        probe = probe_image(image_bytes)
+        if probe:
+            return probe.size
+        
         try:
             with Image.open(BytesIO(image_bytes)) as img:
                 return img.size
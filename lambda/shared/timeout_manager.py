@@ -2,15 +2,52 @@
 TimeoutManager class for managing Lambda and AD connection timeouts
 
 This module provides timeout management for:
-- Lambda function execution (15 second limit)
+- Lambda function execution (15 second limit, or the real deadline taken
+  from the Lambda context)
 - Active Directory connections (10 second limit)
 - Remaining time tracking for early termination logic
+- Per-phase time budgets that bound downstream AWS and LDAP calls
 
 Requirements: 4.2, 4.3
 """
 
 import time
-from typing import Optional
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Optional
+
+
+# Upper bound for each request phase, in seconds. A phase gets the smaller
+# of its budget and the time left before the deadline (minus the reserve).
+PHASE_BUDGETS = {
+    'ocr': 8.0,
+    'ad': 10.0,
+    'liveness': 5.0,
+    'search': 5.0,
+    'session': 4.0,
+}
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a phase has no time budget left before the deadline"""
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """
+    Check whether an exception means a call ran out of time
+    
+    Args:
+        error: Exception raised by a downstream call
+    
+    Returns:
+        bool: True for deadline, socket, future and botocore connect/read timeouts
+    """
+    if isinstance(error, (DeadlineExceededError, TimeoutError, FutureTimeoutError)):
+        return True
+    try:
+        from botocore.exceptions import ConnectTimeoutError, ReadTimeoutError
+    except ImportError:
+        return False
+    return isinstance(error, (ConnectTimeoutError, ReadTimeoutError))
 
 
 class TimeoutManager:
@@ -27,16 +64,43 @@ class TimeoutManager:
     
     AD_TIMEOUT = 10  # seconds
     LAMBDA_TIMEOUT = 15  # seconds
+    API_GATEWAY_TIMEOUT = 29  # seconds, API Gateway integration limit
+    RESERVE_SECONDS = 1.0  # kept back for building the error response and logging
     
-    def __init__(self, start_time: Optional[float] = None):
+    def __init__(self, start_time: Optional[float] = None, lambda_timeout: Optional[float] = None):
         """
         Initialize the timeout manager.
         
         Args:
             start_time: Optional start time in seconds since epoch.
                        If not provided, uses current time.
+            lambda_timeout: Optional execution limit in seconds from start_time.
+                       If not provided, uses LAMBDA_TIMEOUT.
         """
         self.start_time = start_time if start_time is not None else time.time()
+        self.lambda_timeout = lambda_timeout if lambda_timeout is not None else self.LAMBDA_TIMEOUT
+    
+    @classmethod
+    def from_lambda_context(cls, context: Any) -> 'TimeoutManager':
+        """
+        Create a timeout manager bound to the invocation's real deadline.
+        
+        The deadline is the Lambda context's remaining time, capped at the
+        API Gateway integration limit since the client is gone after that.
+        Contexts without a usable remaining time (e.g. test doubles) fall back
+        to LAMBDA_TIMEOUT.
+        
+        Args:
+            context: Lambda context object
+        
+        Returns:
+            TimeoutManager: Manager whose deadline matches the invocation
+        """
+        try:
+            remaining = float(context.get_remaining_time_in_millis()) / 1000.0
+        except (AttributeError, TypeError, ValueError):
+            return cls()
+        return cls(lambda_timeout=min(remaining, cls.API_GATEWAY_TIMEOUT))
     
     def check_ad_timeout(self) -> bool:
         """
@@ -56,7 +120,7 @@ class TimeoutManager:
             bool: True if within Lambda timeout limit (< 15 seconds), False otherwise
         """
         elapsed = time.time() - self.start_time
-        return elapsed < self.LAMBDA_TIMEOUT
+        return elapsed < self.lambda_timeout
     
     def get_remaining_time(self) -> float:
         """
@@ -66,7 +130,7 @@ class TimeoutManager:
             float: Remaining time in seconds (0 if timeout exceeded)
         """
         elapsed = time.time() - self.start_time
-        return max(0, self.LAMBDA_TIMEOUT - elapsed)
+        return max(0, self.lambda_timeout - elapsed)
     
     def get_elapsed_time(self) -> float:
         """
@@ -103,6 +167,42 @@ class TimeoutManager:
         remaining = self.get_remaining_time()
         return remaining > buffer_seconds
     
+    def budget(self, phase: str) -> float:
+        """
+        Get the time budget for a request phase.
+        
+        Downstream clients derive their connect/read timeouts and retry
+        counts from this value, so no single call can outlive the deadline.
+        
+        Args:
+            phase: Phase name from PHASE_BUDGETS ('ocr', 'ad', 'liveness',
+                   'search', 'session'); unknown phases get all remaining time
+        
+        Returns:
+            float: Budget in seconds (0 if no time is left)
+        """
+        available = self.get_remaining_time() - self.RESERVE_SECONDS
+        return max(0.0, min(PHASE_BUDGETS.get(phase, available), available))
+    
+    def require_budget(self, phase: str, minimum_seconds: float = 0.5) -> float:
+        """
+        Get the time budget for a phase, failing fast when it is too small.
+        
+        Args:
+            phase: Phase name from PHASE_BUDGETS
+            minimum_seconds: Smallest budget worth starting the phase with
+        
+        Returns:
+            float: Budget in seconds
+        
+        Raises:
+            DeadlineExceededError: If less than minimum_seconds is available
+        """
+        budget = self.budget(phase)
+        if budget < minimum_seconds:
+            raise DeadlineExceededError(f"No time left for {phase} ({budget:.2f}s available)")
+        return budget
+    
     def reset(self):
         """
         Reset the timeout manager to current time.
@@ -22,6 +22,7 @@ from shared.cognito_service import CognitoService
 from shared.dynamodb_service import DynamoDBService
 from shared.error_handler import ErrorHandler
 from shared.models import ErrorCodes, AuthenticationSession
+from shared.service_registry import get_registry
 
 # Configure logging
 logger = logging.getLogger()
@@ -88,10 +89,11 @@ def handle_status(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Initialize services
         logger.info("Initializing services for status check")
-        cognito_service = CognitoService(user_pool_id, client_id, region)
-        db_service = DynamoDBService(region_name=region)
-        db_service.initialize_tables(card_templates_table, employee_faces_table, auth_sessions_table)
-        error_handler = ErrorHandler()
+        registry = get_registry()
+        cognito_service = registry.cognito_service(user_pool_id, client_id, region)
+        db_service = registry.dynamodb_service(card_templates_table, employee_faces_table,
+                                               auth_sessions_table, region)
+        error_handler = registry.error_handler()
         
         status_info = {
             'authenticated': False,
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Backfill the sparse active-employee index key
+
+DynamoDBService lists active employees by querying ActiveEmployeesIndex,
+a sparse GSI keyed on the 'active_index' attribute that only active
+EmployeeFaces records carry. Records written before the index existed lack
+the attribute. This script scans the table once, adds it to active
+records and removes it from inactive ones. Each write is conditional on
+is_active, so it is safe to run while the system is live and to re-run.
+
+Run it right after deploying the stack that adds ActiveEmployeesIndex.
+
+Requires AWS credentials with dynamodb:Scan and dynamodb:UpdateItem on EmployeeFaces.
+
+Usage:
+    python scripts/backfill_active_index.py --table FaceAuth-EmployeeFaces
+    python scripts/backfill_active_index.py --table FaceAuth-EmployeeFaces --segments 8 --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+from botocore.exceptions import ClientError
+
+# Add the lambda directory to the path so we can import shared modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.dynamodb_service import DynamoDBService, ACTIVE_INDEX_ATTRIBUTE, ACTIVE_INDEX_VALUE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the ActiveEmployeesIndex key on EmployeeFaces')
+    parser.add_argument('--table', default=os.environ.get('EMPLOYEE_FACES_TABLE'),
+                        help='EmployeeFaces table name')
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'ap-northeast-1'))
+    parser.add_argument('--segments', type=int, default=4, help='Parallel DynamoDB scan segments')
+    parser.add_argument('--dry-run', action='store_true', help='Count the work without writing')
+    args = parser.parse_args()
+
+    if not args.table:
+        parser.error('--table or EMPLOYEE_FACES_TABLE is required')
+
+    db_service = DynamoDBService(args.region)
+    table = db_service.dynamodb.Table(args.table)
+
+    added = removed = unchanged = skipped = 0
+    items = db_service.scan_items(table, attributes=['employee_id', 'is_active', ACTIVE_INDEX_ATTRIBUTE],
+                                  total_segments=args.segments)
+    for item in items:
+        is_active = bool(item.get('is_active'))
+        indexed = item.get(ACTIVE_INDEX_ATTRIBUTE) == ACTIVE_INDEX_VALUE
+        if is_active == indexed:
+            unchanged += 1
+            continue
+
+        if args.dry_run:
+            print(f"  {item['employee_id']}: would {'add' if is_active else 'remove'} {ACTIVE_INDEX_ATTRIBUTE}")
+        else:
+            try:
+                if is_active:
+                    table.update_item(
+                        Key={'employee_id': item['employee_id']},
+                        UpdateExpression=f'SET {ACTIVE_INDEX_ATTRIBUTE} = :indexed',
+                        ConditionExpression='is_active = :active',
+                        ExpressionAttributeValues={':indexed': ACTIVE_INDEX_VALUE, ':active': True}
+                    )
+                else:
+                    table.update_item(
+                        Key={'employee_id': item['employee_id']},
+                        UpdateExpression=f'REMOVE {ACTIVE_INDEX_ATTRIBUTE}',
+                        ConditionExpression='is_active = :inactive',
+                        ExpressionAttributeValues={':inactive': False}
+                    )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                # is_active changed since the scan; the writer maintained the key itself
+                skipped += 1
+                continue
+
+        if is_active:
+            added += 1
+        else:
+            removed += 1
+
+    verb = ' would be' if args.dry_run else ''
+    print(f"\n{args.table}: {added} key(s){verb} added, {removed}{verb} removed, "
+          f"{unchanged} already correct, {skipped} changed concurrently")
+
+
+if __name__ == "__main__":
+    main()
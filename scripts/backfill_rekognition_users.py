@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Backfill Rekognition users for enrolled employees
+
+Face search can run against Rekognition users (FACE_SEARCH_MODE=users), which
+aggregate every face vector enrolled for an employee. Employees enrolled
+before users were introduced only have loose faces in the collection. This
+script creates one user per active EmployeeFaces record and associates the
+record's face ids with it. It is idempotent and safe to re-run.
+
+Run it before deploying with FACE_SEARCH_MODE=users on an existing collection.
+On a stack with ActiveEmployeesIndex, scripts/backfill_active_index.py must
+run first. This script still scans the whole table for active records
+instead of reading that index, so an index that is not backfilled yet cannot
+make it skip employees, and it exits non-zero when it finds none at all.
+
+Requires AWS credentials with dynamodb:Scan on EmployeeFaces and
+rekognition:CreateUser / rekognition:AssociateFaces on the collection.
+
+Usage:
+    python scripts/backfill_rekognition_users.py --table FaceAuth-EmployeeFaces
+    python scripts/backfill_rekognition_users.py --table FaceAuth-EmployeeFaces \\
+        --collection face-auth-employees --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+# Add the lambda directory to the path so we can import shared modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.dynamodb_service import DynamoDBService
+from shared.face_recognition_service import FaceRecognitionService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create Rekognition users for enrolled employees')
+    parser.add_argument('--table', default=os.environ.get('EMPLOYEE_FACES_TABLE'),
+                        help='EmployeeFaces table name')
+    parser.add_argument('--collection', default=os.environ.get('REKOGNITION_COLLECTION_ID',
+                                                                FaceRecognitionService.COLLECTION_ID))
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'ap-northeast-1'))
+    parser.add_argument('--segments', type=int, default=4, help='Parallel DynamoDB scan segments')
+    parser.add_argument('--dry-run', action='store_true', help='List the work without calling Rekognition')
+    args = parser.parse_args()
+
+    if not args.table:
+        parser.error('--table or EMPLOYEE_FACES_TABLE is required')
+
+    db_service = DynamoDBService(args.region)
+    db_service.employee_faces_table = db_service.dynamodb.Table(args.table)
+    face_service = FaceRecognitionService(args.region, args.collection)
+
+    print(f"Active employees in {args.table}, collection {args.collection}")
+
+    failed = []
+    processed = 0
+    # Full scan: ActiveEmployeesIndex may exist but still be empty before its backfill
+    for record in db_service.iter_active_employees(total_segments=args.segments, use_index=False):
+        processed += 1
+        if args.dry_run:
+            print(f"  {record.employee_id}: would associate {len(record.face_ids)} face(s)")
+            continue
+
+        associated = face_service.enroll_user(record.employee_id, record.face_ids)
+        if record.face_id not in associated:
+            failed.append(record.employee_id)
+        print(f"  {record.employee_id}: {len(associated)}/{len(record.face_ids)} face(s) associated")
+
+    print(f"\n{processed} active employee(s) processed")
+    if not processed:
+        print(f"\nNo active employees found in {args.table}; check --table before switching to users mode")
+        sys.exit(1)
+    if failed:
+        print(f"\nPrimary face not associated for {len(failed)} employee(s): {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark Rekognition attribute profiles
+
+Measures DetectFaces latency for each attribute profile in
+FaceRecognitionService (presence-only, quality, full) against the real
+Rekognition API. With --collection, IndexFaces is measured as well; every
+indexed face is deleted again straight away.
+
+Requires AWS credentials with rekognition:DetectFaces (and IndexFaces /
+DeleteFaces for --collection).
+
+Usage:
+    python scripts/benchmark_rekognition_profiles.py --image sample/face.jpg
+    python scripts/benchmark_rekognition_profiles.py --image sample/face.jpg \\
+        --iterations 30 --collection face-auth-benchmark
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import boto3
+
+# Add the lambda directory to the path so we can import shared modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.face_recognition_service import ATTRIBUTE_PROFILES
+
+
+def measure(call, iterations: int) -> dict:
+    """
+    Time a Rekognition call after one warm-up request
+
+    Args:
+        call: Zero-argument callable performing one API request
+        iterations: Number of timed requests
+
+    Returns:
+        Dict with p50 and p95 latency in milliseconds
+    """
+    call()
+
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - started)
+
+    durations.sort()
+    return {
+        'p50_ms': durations[len(durations) // 2] * 1000,
+        'p95_ms': durations[max(0, int(len(durations) * 0.95) - 1)] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Rekognition attribute profiles')
+    parser.add_argument('--image', required=True, help='Face image (JPEG or PNG)')
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'ap-northeast-1'))
+    parser.add_argument('--iterations', type=int, default=20, help='Timed requests per profile')
+    parser.add_argument('--collection', help='Collection for IndexFaces timing (faces are deleted again)')
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        image = {'Bytes': f.read()}
+
+    rekognition = boto3.client('rekognition', region_name=args.region)
+
+    def index_and_delete(attributes):
+        response = rekognition.index_faces(
+            CollectionId=args.collection, Image=image, ExternalImageId='benchmark',
+            MaxFaces=1, QualityFilter='AUTO', DetectionAttributes=attributes
+        )
+        face_ids = [record['Face']['FaceId'] for record in response.get('FaceRecords', [])]
+        if face_ids:
+            rekognition.delete_faces(CollectionId=args.collection, FaceIds=face_ids)
+
+    print(f"{args.iterations} requests per profile, image {args.image} ({len(image['Bytes']) / 1024:.0f} KB)\n")
+    print(f"{'API':<12} {'profile':<15} {'p50 ms':>8} {'p95 ms':>8}")
+
+    for profile, attributes in ATTRIBUTE_PROFILES.items():
+        result = measure(lambda: rekognition.detect_faces(Image=image, Attributes=attributes),
+                         args.iterations)
+        print(f"{'DetectFaces':<12} {profile:<15} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+    if args.collection:
+        # Timings include the DeleteFaces clean-up call, which is the same for every profile
+        for profile, attributes in ATTRIBUTE_PROFILES.items():
+            result = measure(lambda: index_and_delete(attributes), args.iterations)
+            print(f"{'IndexFaces':<12} {profile:<15} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark ThumbnailProcessor.create_thumbnail
+
+Compares the previous implementation (convert at native resolution, then
+LANCZOS) with the current draft-mode JPEG decoding across typical upload
+sizes. Each measurement runs in a fresh subprocess so peak RSS reflects a
+single thumbnail, the way a Lambda invocation sees it.
+
+Usage:
+    python scripts/benchmark_thumbnail.py
+    python scripts/benchmark_thumbnail.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+# Add the lambda directory to the path so we can import shared modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from PIL import Image
+
+# (label, size, mode, format)
+CASES = [
+    ('1MP webcam JPEG', (1280, 960), 'RGB', 'JPEG'),
+    ('3MP tablet JPEG', (2048, 1536), 'RGB', 'JPEG'),
+    ('12MP phone JPEG', (4032, 3024), 'RGB', 'JPEG'),
+    ('12MP grayscale JPEG', (4032, 3024), 'L', 'JPEG'),
+    ('3MP PNG (no draft)', (2048, 1536), 'RGB', 'PNG'),
+]
+
+
+def make_image(size, mode, fmt) -> bytes:
+    """Build a photo-like test image (smooth structure plus sensor-like noise)"""
+    structure = Image.effect_noise((size[0] // 16, size[1] // 16), 96).resize(size, Image.Resampling.BICUBIC)
+    grain = Image.effect_noise(size, 12)
+    img = Image.blend(structure, grain, 0.15).convert(mode)
+    output = BytesIO()
+    img.save(output, format=fmt, quality=90) if fmt == 'JPEG' else img.save(output, format=fmt)
+    return output.getvalue()
+
+
+def legacy_thumbnail(image_bytes: bytes) -> bytes:
+    """create_thumbnail as it was before draft-mode decoding"""
+    from shared.thumbnail_processor import ThumbnailProcessor
+
+    with Image.open(BytesIO(image_bytes)) as img:
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail(ThumbnailProcessor.TARGET_SIZE, Image.Resampling.LANCZOS)
+        padded_img = Image.new('RGB', ThumbnailProcessor.TARGET_SIZE, ThumbnailProcessor.BACKGROUND_COLOR)
+        padded_img.paste(img, ((200 - img.size[0]) // 2, (200 - img.size[1]) // 2))
+        output = BytesIO()
+        padded_img.save(output, format='JPEG', quality=ThumbnailProcessor.QUALITY, optimize=True)
+        return output.getvalue()
+
+
+def peak_rss_kb() -> int:
+    """
+    Peak resident set size of this process in KiB
+
+    VmHWM is per address space and therefore starts fresh after exec, unlike
+    ru_maxrss which a subprocess inherits from the (image-generating) parent.
+    """
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    raise RuntimeError('VmHWM not available (Linux only)')
+
+
+def worker(path: str, implementation: str, repeat: int) -> None:
+    """Run one implementation on one image and print timing and peak RSS as JSON"""
+    from unittest.mock import Mock
+    from shared.thumbnail_processor import ThumbnailProcessor
+
+    with open(path, 'rb') as f:
+        image_bytes = f.read()
+
+    processor = ThumbnailProcessor('benchmark-bucket', s3_client=Mock())
+    create = legacy_thumbnail if implementation == 'legacy' else processor.create_thumbnail
+
+    baseline_rss_kb = peak_rss_kb()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        create(image_bytes)
+        durations.append(time.perf_counter() - started)
+
+    durations.sort()
+    print(json.dumps({
+        'median_ms': durations[len(durations) // 2] * 1000,
+        'peak_rss_mb': peak_rss_kb() / 1024,
+        'rss_growth_mb': (peak_rss_kb() - baseline_rss_kb) / 1024
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark thumbnail creation')
+    parser.add_argument('--repeat', type=int, default=5, help='Thumbnails per measurement')
+    parser.add_argument('--worker', nargs=2, metavar=('IMAGE', 'IMPL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], args.worker[1], args.repeat)
+        return
+
+    import tempfile
+
+    print(f"{'case':<22} {'impl':<7} {'median ms':>10} {'peak RSS MB':>12} {'RSS growth MB':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, size, mode, fmt in CASES:
+            path = os.path.join(tmp, f"{label.replace(' ', '_')}.{fmt.lower()}")
+            with open(path, 'wb') as f:
+                f.write(make_image(size, mode, fmt))
+
+            for implementation in ('legacy', 'draft'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--repeat', str(args.repeat), '--worker', path, implementation],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output)
+                print(f"{label:<22} {implementation:<7} {result['median_ms']:>10.1f} "
+                      f"{result['peak_rss_mb']:>12.1f} {result['rss_growth_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark Cognito token issuance
+
+Compares the legacy issuance path (AdminGetUser + AdminSetUserPassword +
+AdminInitiateAuth per login) with the derived-password path (a single
+AdminInitiateAuth for provisioned users). Cognito is replaced by an
+in-process fake that sleeps for a fixed latency per API call, so the
+numbers reflect round trips rather than network noise.
+
+Usage:
+    python scripts/benchmark_token_issuance.py
+    python scripts/benchmark_token_issuance.py --logins 200 --latency-ms 40
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+# Add the lambda directory to the path so we can import shared modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared import cognito_service as cognito_module
+from shared.cognito_service import CognitoService
+
+
+class FakeCognitoClient:
+    """Minimal Cognito admin API with per-call latency and call counting"""
+
+    def __init__(self, latency_seconds: float):
+        self.latency_seconds = latency_seconds
+        self.calls = Counter()
+        self.passwords = {}
+
+        class UserNotFoundException(Exception):
+            pass
+
+        self.exceptions = type('Exceptions', (), {'UserNotFoundException': UserNotFoundException})
+
+    def _call(self, name: str):
+        self.calls[name] += 1
+        time.sleep(self.latency_seconds)
+
+    def admin_get_user(self, UserPoolId, Username):
+        self._call('AdminGetUser')
+        if Username not in self.passwords:
+            raise self.exceptions.UserNotFoundException()
+        return {'Username': Username}
+
+    def admin_create_user(self, UserPoolId, Username, UserAttributes, TemporaryPassword, MessageAction):
+        self._call('AdminCreateUser')
+        if Username in self.passwords:
+            raise ClientError({'Error': {'Code': 'UsernameExistsException', 'Message': 'exists'}},
+                              'AdminCreateUser')
+        self.passwords[Username] = TemporaryPassword
+        return {}
+
+    def admin_set_user_password(self, UserPoolId, Username, Password, Permanent):
+        self._call('AdminSetUserPassword')
+        self.passwords[Username] = Password
+        return {}
+
+    def admin_initiate_auth(self, UserPoolId, ClientId, AuthFlow, AuthParameters):
+        self._call('AdminInitiateAuth')
+        username = AuthParameters['USERNAME']
+        if username not in self.passwords:
+            raise ClientError({'Error': {'Code': 'UserNotFoundException', 'Message': 'not found'}},
+                              'AdminInitiateAuth')
+        if self.passwords[username] != AuthParameters['PASSWORD']:
+            raise ClientError({'Error': {'Code': 'NotAuthorizedException', 'Message': 'bad password'}},
+                              'AdminInitiateAuth')
+        return {
+            'AuthenticationResult': {
+                'AccessToken': 'access',
+                'IdToken': 'id',
+                'RefreshToken': 'refresh',
+                'ExpiresIn': 3600,
+                'TokenType': 'Bearer'
+            }
+        }
+
+
+def run(label: str, password_secret: str, logins: int, employees: int, latency_seconds: float) -> dict:
+    """
+    Issue tokens for already-enrolled employees and measure calls and latency
+
+    Args:
+        label: Name printed in the report
+        password_secret: Derivation secret ('' for the legacy path)
+        logins: Number of logins to simulate
+        employees: Number of distinct employees
+        latency_seconds: Simulated latency per Cognito API call
+
+    Returns:
+        Dict of benchmark results
+    """
+    env = {'COGNITO_PASSWORD_SECRET': password_secret, 'COGNITO_PASSWORD_SECRET_ARN': ''}
+
+    with patch.dict(os.environ, env), patch.object(cognito_module, 'PyJWKClient'):
+        cognito_module.reset_password_secret()
+        fake_client = FakeCognitoClient(latency_seconds)
+        service = CognitoService('us-east-1_BENCH', 'bench-client', 'us-east-1',
+                                 cognito_client=fake_client)
+
+        # Enrollment-time provisioning is not part of the login path
+        for index in range(employees):
+            service.provision_user(f"{index:07d}", 'Bench User')
+        fake_client.calls.clear()
+
+        durations = []
+        for index in range(logins):
+            started = time.perf_counter()
+            tokens, error = service.generate_auth_token(f"{index % employees:07d}")
+            durations.append(time.perf_counter() - started)
+            assert tokens and not error, error
+
+        cognito_module.reset_password_secret()
+
+    durations.sort()
+    total_calls = sum(fake_client.calls.values())
+    return {
+        'label': label,
+        'calls_per_login': total_calls / logins,
+        'calls': dict(fake_client.calls),
+        'p50_ms': durations[len(durations) // 2] * 1000,
+        'p95_ms': durations[int(len(durations) * 0.95) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Cognito token issuance')
+    parser.add_argument('--logins', type=int, default=100, help='Logins to simulate')
+    parser.add_argument('--employees', type=int, default=20, help='Distinct enrolled employees')
+    parser.add_argument('--latency-ms', type=float, default=30.0, help='Simulated latency per Cognito call')
+    args = parser.parse_args()
+
+    latency_seconds = args.latency_ms / 1000
+    results = [
+        run('legacy (per-login password reset)', '', args.logins, args.employees, latency_seconds),
+        run('derived password (single call)', 'benchmark-secret', args.logins, args.employees, latency_seconds)
+    ]
+
+    print(f"{args.logins} logins, {args.employees} employees, {args.latency_ms:.0f} ms per Cognito call\n")
+    for result in results:
+        print(f"{result['label']}")
+        print(f"  Cognito calls per login: {result['calls_per_login']:.2f}  {result['calls']}")
+        print(f"  Latency p50: {result['p50_ms']:.1f} ms  p95: {result['p95_ms']:.1f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
 
 from shared.models import CardTemplate
 from shared.dynamodb_service import DynamoDBService, create_default_card_templates
+from shared.collection_routing import CollectionRouter
 
 
 def get_stack_outputs() -> Dict[str, str]:
@@ -176,15 +177,16 @@ def main():
     print("\n" + "=" * 30)
     initialize_card_templates_table(db_service)
     
-    # Create Rekognition collection
+    # Create Rekognition collections (every shard in COLLECTION_ROUTING)
     print("\n" + "=" * 30)
     print("Setting up Amazon Rekognition...")
-    collection_id = "face-auth-employees"
-    if create_rekognition_collection(collection_id):
-        print(f"✓ Rekognition collection '{collection_id}' is ready")
-    else:
-        print(f"✗ Failed to create Rekognition collection")
-        sys.exit(1)
+    router = CollectionRouter.from_environment("face-auth-employees")
+    for collection_id in router.all_collections():
+        if create_rekognition_collection(collection_id):
+            print(f"✓ Rekognition collection '{collection_id}' is ready")
+        else:
+            print(f"✗ Failed to create Rekognition collection '{collection_id}'")
+            sys.exit(1)
     
     print("\n" + "=" * 50)
     print("DynamoDB initialization completed successfully!")
@@ -16,6 +16,11 @@ from datetime import datetime
 import json
 from decimal import Decimal
 
+# Add the lambda directory to the path so we can import shared modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.dynamodb_service import CARD_TEMPLATES_VERSION_KEY, mark_card_templates_changed
+
 
 def register_card_template():
     """
@@ -90,7 +95,11 @@ def register_card_template():
         # Put item to DynamoDB
         response = table.put_item(Item=template_data)
         
+        # Bump the table version stamp so warm Lambda containers drop cached templates
+        version = mark_card_templates_changed(table)
+        
         print("\n✅ Card template registered successfully!")
+        print(f"  Templates version: {version}")
         print(f"\nTemplate Details:")
         print(f"  Pattern ID: {template_data['pattern_id']}")
         print(f"  Description: {template_data['description']}")
@@ -123,7 +132,10 @@ def list_card_templates():
     
     try:
         response = table.scan()
-        items = response.get('Items', [])
+        items = [
+            item for item in response.get('Items', [])
+            if item.get('pattern_id') != CARD_TEMPLATES_VERSION_KEY
+        ]
         
         print(f"\n📋 Card Templates in {table_name}:")
         print(f"Total: {len(items)} template(s)\n")
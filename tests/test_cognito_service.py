@@ -20,7 +20,7 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared'))
 
-from cognito_service import CognitoService
+from cognito_service import CognitoService, VerifiedTokenCache, reset_token_caches, reset_password_secret
 from models import AuthenticationSession
 
 
@@ -30,6 +30,7 @@ class TestCognitoService:
     @pytest.fixture
     def cognito_service(self):
         """Create a CognitoService instance for testing"""
+        reset_token_caches()
         with patch('cognito_service.PyJWKClient'):
             service = CognitoService(
                 user_pool_id='us-east-1_TEST123',
@@ -534,6 +535,7 @@ class TestCognitoServiceEdgeCases:
     @pytest.fixture
     def cognito_service(self):
         """Create a CognitoService instance for testing"""
+        reset_token_caches()
         with patch('cognito_service.PyJWKClient'):
             service = CognitoService(
                 user_pool_id='us-east-1_TEST123',
@@ -613,5 +615,187 @@ class TestCognitoServiceEdgeCases:
         assert session.user_agent is None
 
 
+class TestTokenValidationCaches:
+    """Test process-wide JWKS and verified-token caches"""
+    
+    @pytest.fixture(autouse=True)
+    def clean_caches(self):
+        """Start and finish every test with empty caches"""
+        reset_token_caches()
+        yield
+        reset_token_caches()
+    
+    def test_jwks_client_shared_across_instances(self):
+        """Per-request CognitoService instances reuse one JWKS client per user pool"""
+        with patch('cognito_service.PyJWKClient') as mock_jwk_client_cls:
+            mock_jwk_client_cls.side_effect = lambda *args, **kwargs: Mock()
+            first = CognitoService('us-east-1_TEST123', 'test-client-id', 'us-east-1')
+            second = CognitoService('us-east-1_TEST123', 'test-client-id', 'us-east-1')
+            other_pool = CognitoService('us-east-1_OTHER', 'test-client-id', 'us-east-1')
+        
+        assert first.jwk_client is second.jwk_client
+        assert other_pool.jwk_client is not first.jwk_client
+        assert mock_jwk_client_cls.call_count == 2
+        assert mock_jwk_client_cls.call_args[1]['cache_keys'] is True
+    
+    def test_verified_token_served_from_cache(self):
+        """A verified token skips JWKS lookup and signature checks until exp"""
+        with patch('cognito_service.PyJWKClient'):
+            service = CognitoService('us-east-1_TEST123', 'test-client-id', 'us-east-1')
+        
+        claims = {'username': '123456', 'exp': (datetime.now() + timedelta(hours=1)).timestamp()}
+        service.jwk_client.get_signing_key_from_jwt = Mock(return_value=Mock(key='mock-key'))
+        
+        with patch('cognito_service.jwt.decode', return_value=claims) as mock_decode:
+            assert service.validate_token('cached-token') == (True, claims)
+            assert service.validate_token('cached-token') == (True, claims)
+        
+        assert mock_decode.call_count == 1
+        assert service.jwk_client.get_signing_key_from_jwt.call_count == 1
+    
+    def test_failed_token_not_cached(self):
+        """Rejected tokens are verified again on every call"""
+        with patch('cognito_service.PyJWKClient'):
+            service = CognitoService('us-east-1_TEST123', 'test-client-id', 'us-east-1')
+        
+        service.jwk_client.get_signing_key_from_jwt = Mock(return_value=Mock(key='mock-key'))
+        
+        with patch('cognito_service.jwt.decode', side_effect=jwt.InvalidTokenError) as mock_decode:
+            assert service.validate_token('bad-token') == (False, None)
+            assert service.validate_token('bad-token') == (False, None)
+        
+        assert mock_decode.call_count == 2
+    
+    def test_entry_evicted_at_exp(self):
+        """Cached claims are dropped once the token expires"""
+        cache = VerifiedTokenCache(max_entries=4)
+        
+        with patch('cognito_service.time.time', return_value=1000.0):
+            cache.put('pool', 'client', 'token', {'exp': 1010})
+            assert cache.get('pool', 'client', 'token') == {'exp': 1010}
+        
+        with patch('cognito_service.time.time', return_value=1010.0):
+            assert cache.get('pool', 'client', 'token') is None
+        
+        assert len(cache) == 0
+    
+    def test_lru_bound(self):
+        """Least recently used tokens are evicted beyond max_entries"""
+        cache = VerifiedTokenCache(max_entries=2)
+        exp = (datetime.now() + timedelta(hours=1)).timestamp()
+        
+        cache.put('pool', 'client', 'token-a', {'exp': exp})
+        cache.put('pool', 'client', 'token-b', {'exp': exp})
+        cache.get('pool', 'client', 'token-a')
+        cache.put('pool', 'client', 'token-c', {'exp': exp})
+        
+        assert cache.get('pool', 'client', 'token-a') is not None
+        assert cache.get('pool', 'client', 'token-b') is None
+        assert cache.get('pool', 'client', 'token-c') is not None
+        
+        cache.put('pool', 'client', 'no-exp', {'username': '123456'})
+        assert cache.get('pool', 'client', 'no-exp') is None
+
+
+class TestDerivedPasswordIssuance:
+    """Test single-call token issuance with derived passwords"""
+    
+    AUTH_RESULT = {
+        'AuthenticationResult': {
+            'AccessToken': 'mock-access-token',
+            'IdToken': 'mock-id-token',
+            'RefreshToken': 'mock-refresh-token',
+            'ExpiresIn': 3600,
+            'TokenType': 'Bearer'
+        }
+    }
+    
+    @pytest.fixture
+    def cognito_service(self):
+        """CognitoService with a derivation secret and a mock Cognito client"""
+        reset_token_caches()
+        with patch.dict(os.environ, {'COGNITO_PASSWORD_SECRET': 'test-secret'}), \
+                patch('cognito_service.PyJWKClient'):
+            reset_password_secret()
+            service = CognitoService('us-east-1_TEST123', 'test-client-id', 'us-east-1',
+                                     cognito_client=Mock())
+            yield service
+        reset_password_secret()
+    
+    def test_provisioned_user_single_call(self, cognito_service):
+        """Provisioned users get tokens from one AdminInitiateAuth call"""
+        client = cognito_service.cognito_client
+        client.admin_initiate_auth.return_value = self.AUTH_RESULT
+        
+        tokens, error = cognito_service.generate_auth_token('1234567', 'face')
+        
+        assert error is None
+        assert tokens['AccessToken'] == 'mock-access-token'
+        client.admin_initiate_auth.assert_called_once()
+        client.admin_get_user.assert_not_called()
+        client.admin_set_user_password.assert_not_called()
+        
+        auth_parameters = client.admin_initiate_auth.call_args[1]['AuthParameters']
+        assert auth_parameters['PASSWORD'] == CognitoService._derive_password('1234567')
+    
+    def test_unprovisioned_user_provisioned_on_demand(self, cognito_service):
+        """A user missing from Cognito is created once and authentication retried"""
+        client = cognito_service.cognito_client
+        client.admin_initiate_auth.side_effect = [
+            ClientError({'Error': {'Code': 'UserNotFoundException', 'Message': 'User does not exist.'}},
+                        'AdminInitiateAuth'),
+            self.AUTH_RESULT
+        ]
+        
+        tokens, error = cognito_service.generate_auth_token('1234567', 'face')
+        
+        assert error is None
+        assert tokens is not None
+        assert client.admin_initiate_auth.call_count == 2
+        client.admin_create_user.assert_called_once()
+        client.admin_set_user_password.assert_called_once()
+    
+    def test_other_errors_not_retried(self, cognito_service):
+        """Throttling is reported rather than triggering provisioning"""
+        client = cognito_service.cognito_client
+        client.admin_initiate_auth.side_effect = ClientError(
+            {'Error': {'Code': 'TooManyRequestsException', 'Message': 'Rate exceeded'}},
+            'AdminInitiateAuth'
+        )
+        
+        tokens, error = cognito_service.generate_auth_token('1234567', 'face')
+        
+        assert tokens is None
+        assert 'Rate exceeded' in error
+        client.admin_create_user.assert_not_called()
+    
+    def test_provision_existing_user(self, cognito_service):
+        """Provisioning an existing user only resets its derived password"""
+        client = cognito_service.cognito_client
+        client.admin_create_user.side_effect = ClientError(
+            {'Error': {'Code': 'UsernameExistsException', 'Message': 'User account already exists'}},
+            'AdminCreateUser'
+        )
+        
+        success, error = cognito_service.provision_user('1234567', 'Test User')
+        
+        assert success is True
+        assert error is None
+        assert client.admin_set_user_password.call_args[1]['Password'] == \
+            CognitoService._derive_password('1234567')
+    
+    def test_derived_password_policy(self, cognito_service):
+        """Derived passwords are stable per employee and meet the pool policy"""
+        password = CognitoService._derive_password('1234567')
+        
+        assert password == CognitoService._derive_password('1234567')
+        assert password != CognitoService._derive_password('7654321')
+        assert len(password) >= 12
+        assert any(c.isupper() for c in password)
+        assert any(c.islower() for c in password)
+        assert any(c.isdigit() for c in password)
+        assert any(not c.isalnum() for c in password)
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,61 @@
+"""
+Unit tests for kiosk-to-collection routing
+
+Tests cover:
+- Search and enrollment collections per kiosk
+- Fallback to the default route and default collection
+- Ignoring malformed routing tables
+"""
+
+import pytest
+from unittest.mock import patch
+import json
+import sys
+import os
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.collection_routing import CollectionRouter
+
+
+ROUTES = {
+    'default': ['face-auth-employees'],
+    'tokyo-lobby': ['face-auth-tokyo', 'face-auth-employees', 'face-auth-tokyo'],
+}
+
+
+class TestCollectionRouter:
+    """Test cases for CollectionRouter"""
+
+    def test_routed_kiosk(self):
+        """A routed kiosk searches its shards, home collection first"""
+        router = CollectionRouter(ROUTES, 'face-auth-employees')
+
+        assert router.search_collections('tokyo-lobby') == ['face-auth-tokyo', 'face-auth-employees']
+        assert router.enrollment_collection('tokyo-lobby') == 'face-auth-tokyo'
+        assert router.all_collections() == ['face-auth-employees', 'face-auth-tokyo']
+
+    def test_unrouted_kiosk_uses_default_route(self):
+        """Unknown or missing kiosk IDs use the default route"""
+        router = CollectionRouter(ROUTES, 'face-auth-employees')
+
+        assert router.search_collections('osaka-gate') == ['face-auth-employees']
+        assert router.search_collections(None) == ['face-auth-employees']
+
+    def test_from_environment(self):
+        """The routing table is read from COLLECTION_ROUTING"""
+        with patch.dict(os.environ, {'COLLECTION_ROUTING': json.dumps({'tokyo-lobby': ['face-auth-tokyo']})}):
+            router = CollectionRouter.from_environment('face-auth-employees')
+
+        assert router.search_collections('tokyo-lobby') == ['face-auth-tokyo']
+        assert router.search_collections() == ['face-auth-employees']
+
+    @pytest.mark.parametrize('raw_routes', ['', 'not json', '["face-auth-tokyo"]', '{"tokyo-lobby": "face-auth-tokyo"}'])
+    def test_missing_or_invalid_table(self, raw_routes):
+        """Without a valid table every kiosk uses the default collection"""
+        with patch.dict(os.environ, {'COLLECTION_ROUTING': raw_routes}):
+            router = CollectionRouter.from_environment('face-auth-employees')
+
+        assert router.search_collections('tokyo-lobby') == ['face-auth-employees']
+        assert router.all_collections() == ['face-auth-employees']
@@ -26,7 +26,16 @@ from shared.models import (
     ErrorResponse,
     ErrorCodes
 )
-from shared.dynamodb_service import DynamoDBService, create_default_card_templates
+from shared.dynamodb_service import (
+    DynamoDBService,
+    create_default_card_templates,
+    get_card_template_cache_stats,
+    reset_card_template_cache,
+    reset_last_login_memo,
+    CARD_TEMPLATES_VERSION_KEY,
+    _card_template_cache,
+    _last_login_memo
+)
 
 
 class TestEmployeeInfo:
@@ -371,7 +380,8 @@ class TestDynamoDBService:
             ],
             AttributeDefinitions=[
                 {'AttributeName': 'employee_id', 'AttributeType': 'S'},
-                {'AttributeName': 'face_id', 'AttributeType': 'S'}
+                {'AttributeName': 'face_id', 'AttributeType': 'S'},
+                {'AttributeName': 'active_index', 'AttributeType': 'S'}
             ],
             GlobalSecondaryIndexes=[
                 {
@@ -380,6 +390,14 @@ class TestDynamoDBService:
                         {'AttributeName': 'face_id', 'KeyType': 'HASH'}
                     ],
                     'Projection': {'ProjectionType': 'ALL'}
+                },
+                {
+                    'IndexName': 'ActiveEmployeesIndex',
+                    'KeySchema': [
+                        {'AttributeName': 'active_index', 'KeyType': 'HASH'},
+                        {'AttributeName': 'employee_id', 'KeyType': 'RANGE'}
+                    ],
+                    'Projection': {'ProjectionType': 'ALL'}
                 }
             ],
             BillingMode='PAY_PER_REQUEST'
@@ -397,6 +415,10 @@ class TestDynamoDBService:
             BillingMode='PAY_PER_REQUEST'
         )
         
+        # Template cache and last_login memo are container-wide; start each test cold
+        reset_card_template_cache()
+        reset_last_login_memo()
+        
         # Initialize service
         self.db_service = DynamoDBService(region_name='us-east-1')
         self.db_service.initialize_tables(
@@ -517,6 +539,173 @@ class TestDynamoDBService:
         deleted = self.db_service.get_auth_session("test-session-123")
         assert deleted is None
     
+    def test_authorize_login(self):
+        """last_login is stamped only for active employees"""
+        now = datetime.now()
+        for employee_id, is_active in (("123456", True), ("654321", False)):
+            self.employee_faces_table.put_item(Item={
+                'employee_id': employee_id,
+                'face_id': f"face-{employee_id}",
+                'is_active': is_active
+            })
+        
+        assert self.db_service.authorize_login("123456", now) is True
+        item = self.employee_faces_table.get_item(Key={'employee_id': "123456"})['Item']
+        assert item['last_login'] == now.isoformat()
+        
+        # Inactive or unknown employee: nothing is written
+        assert self.db_service.authorize_login("654321", now) is False
+        assert self.db_service.authorize_login("999999", now) is False
+        assert 'last_login' not in self.employee_faces_table.get_item(Key={'employee_id': "654321"})['Item']
+        assert 'Item' not in self.employee_faces_table.get_item(Key={'employee_id': "999999"})
+    
+    def test_last_login_coalescing(self):
+        """Within the granularity the stored last_login is not rewritten"""
+        self.employee_faces_table.put_item(Item={'employee_id': "123456", 'face_id': "face-123456",
+                                                 'is_active': True})
+        first = datetime(2026, 10, 19, 8, 55)
+        
+        def stored_last_login():
+            return self.employee_faces_table.get_item(Key={'employee_id': "123456"})['Item']['last_login']
+        
+        # Each call builds a fresh memo, as a different container would
+        assert self.db_service.update_last_login("123456", first, granularity_seconds=300) is True
+        assert self.db_service.update_last_login("123456", first + timedelta(minutes=4),
+                                                 granularity_seconds=300) is True
+        assert stored_last_login() == first.isoformat()
+        
+        later = first + timedelta(minutes=6)
+        assert self.db_service.update_last_login("123456", later, granularity_seconds=300) is True
+        assert stored_last_login() == later.isoformat()
+        
+        # Unknown employees are still reported
+        assert self.db_service.update_last_login("999999", later, granularity_seconds=300) is False
+    
+    def test_authorize_login_skips_fresh_last_login(self, monkeypatch):
+        """Coalesced last_login writes still enforce is_active"""
+        monkeypatch.setattr(_last_login_memo, 'granularity_seconds', 300.0)
+        self.employee_faces_table.put_item(Item={'employee_id': "123456", 'face_id': "face-123456",
+                                                 'is_active': True})
+        first = datetime(2026, 10, 19, 8, 55)
+        
+        def stored_last_login():
+            return self.employee_faces_table.get_item(Key={'employee_id': "123456"})['Item']['last_login']
+        
+        assert self.db_service.authorize_login("123456", first) is True
+        assert self.db_service.authorize_login("123456", first + timedelta(minutes=2)) is True
+        assert stored_last_login() == first.isoformat()
+        assert _last_login_memo.skipped == 1
+        
+        # Another container's recent write is kept as well
+        reset_last_login_memo()
+        assert self.db_service.authorize_login("123456", first + timedelta(minutes=3)) is True
+        assert stored_last_login() == first.isoformat()
+        
+        # is_active is enforced on the memo path and on the conditional write
+        self.db_service.deactivate_employee_face("123456")
+        assert self.db_service.authorize_login("123456", first + timedelta(minutes=4)) is False
+        reset_last_login_memo()
+        assert self.db_service.authorize_login("123456", first + timedelta(minutes=4)) is False
+    
+    def _put_employees(self, count, active_every=1):
+        """Write employee face records, every active_every-th one active"""
+        for index in range(count):
+            employee_id = f"{100000 + index}"
+            record = EmployeeFaceRecord(
+                employee_id=employee_id,
+                face_id=f"face-{employee_id}",
+                enrollment_date=datetime.now(),
+                last_login=None,
+                thumbnail_s3_key=f"enroll/{employee_id}/face_thumbnail.jpg",
+                is_active=index % active_every == 0,
+                re_enrollment_count=0,
+                face_data=FaceData(
+                    face_id=f"face-{employee_id}",
+                    employee_id=employee_id,
+                    bounding_box={"Width": 0.5, "Height": 0.6, "Left": 0.2, "Top": 0.1},
+                    confidence=99.0,
+                    landmarks=[],
+                    thumbnail_s3_key=f"enroll/{employee_id}/face_thumbnail.jpg"
+                )
+            )
+            self.db_service.create_employee_face_record(record)
+    
+    def test_active_employees_follow_pagination(self):
+        """Scans page through LastEvaluatedKey instead of stopping at the first page"""
+        self._put_employees(25, active_every=2)
+        
+        records = list(self.db_service.iter_active_employees(page_size=4))
+        
+        assert len(records) == 13
+        assert all(record.is_active for record in records)
+        assert len(self.db_service.get_all_active_employees()) == 13
+    
+    def test_parallel_segmented_scan(self):
+        """Segments are scanned in parallel and every item is yielded exactly once"""
+        self._put_employees(40)
+        
+        records = list(self.db_service.iter_active_employees(total_segments=4, page_size=3, use_index=False))
+        
+        assert sorted(record.employee_id for record in records) == [f"{100000 + i}" for i in range(40)]
+    
+    def test_active_index_is_sparse(self):
+        """Only active records carry the index key; deactivation drops them from the index"""
+        self._put_employees(6, active_every=3)
+        
+        def indexed():
+            return sorted(record.employee_id for record in self.db_service.iter_active_employees())
+        
+        assert indexed() == ["100000", "100003"]
+        
+        self.db_service.deactivate_employee_face("100003")
+        assert indexed() == ["100000"]
+        
+        # Re-enrollment writes the whole record, re-adding the key while active
+        record = self.db_service.get_employee_face_record("100003")
+        record.is_active = True
+        self.db_service.update_employee_face_record(record)
+        assert indexed() == ["100000", "100003"]
+        assert indexed() == sorted(r.employee_id for r in self.db_service.iter_active_employees(use_index=False))
+    
+    def test_active_employees_without_index(self):
+        """Before the index is deployed, active employees are found by scanning"""
+        self.dynamodb.create_table(
+            TableName='test-employee-faces-legacy',
+            KeySchema=[{'AttributeName': 'employee_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'employee_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        self.db_service.employee_faces_table = self.dynamodb.Table('test-employee-faces-legacy')
+        self._put_employees(4, active_every=2)
+        
+        assert len(self.db_service.get_all_active_employees()) == 2
+    
+    def test_active_employees_query_errors_are_not_scanned_away(self, monkeypatch):
+        """Only a missing index falls back to the scan; other errors propagate"""
+        from botocore.exceptions import ClientError
+        
+        def malformed_query(*args, **kwargs):
+            raise ClientError({'Error': {'Code': 'ValidationException',
+                                         'Message': 'Query condition missed key schema element'}}, 'Query')
+        
+        monkeypatch.setattr(self.db_service, 'query_items', malformed_query)
+        monkeypatch.setattr(self.db_service, 'scan_items', lambda *args, **kwargs: pytest.fail("scanned"))
+        
+        with pytest.raises(ClientError):
+            list(self.db_service.iter_active_employees())
+    
+    def test_scan_projection_and_early_close(self):
+        """Projected scans return only the requested attributes and can be abandoned"""
+        self._put_employees(30)
+        
+        items = self.db_service.scan_items(self.db_service.employee_faces_table,
+                                           attributes=['employee_id', 'last_login'],
+                                           total_segments=3, page_size=2)
+        first = next(items)
+        items.close()
+        
+        assert set(first) == {'employee_id', 'last_login'}
+    
     def test_default_templates_creation(self):
         """Test creation of default card templates"""
         templates = create_default_card_templates(self.db_service)
@@ -525,6 +714,49 @@ class TestDynamoDBService:
         # Verify templates are in database
         active_templates = self.db_service.get_active_card_templates()
         assert len(active_templates) >= 2
+    
+    def test_card_template_cache(self):
+        """Test warm-container template cache hits, revalidation and invalidation"""
+        create_default_card_templates(self.db_service)
+        reset_card_template_cache()
+        
+        # Cold read scans, warm read is served from memory
+        first = self.db_service.get_active_card_templates()
+        second = self.db_service.get_active_card_templates()
+        assert len(first) == len(second) == 2
+        stats = get_card_template_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        
+        # The version stamp item is never returned as a template
+        assert all(t.pattern_id != CARD_TEMPLATES_VERSION_KEY for t in second)
+        
+        # TTL expiry with an unchanged stamp revalidates without re-scanning
+        original_ttl = _card_template_cache.ttl_seconds
+        _card_template_cache.ttl_seconds = 0
+        try:
+            self.db_service.get_active_card_templates()
+            stats = get_card_template_cache_stats()
+            assert stats['revalidations'] == 1
+            assert stats['misses'] == 1
+            
+            # A stamp bumped by another writer forces a re-scan
+            self.card_templates_table.update_item(
+                Key={'pattern_id': CARD_TEMPLATES_VERSION_KEY},
+                UpdateExpression='ADD #version :one',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={':one': 1}
+            )
+            self.db_service.get_active_card_templates()
+            assert get_card_template_cache_stats()['misses'] == 2
+        finally:
+            _card_template_cache.ttl_seconds = original_ttl
+        
+        # Writes through the service invalidate immediately
+        template = first[0]
+        template.is_active = False
+        assert self.db_service.update_card_template(template) is True
+        assert len(self.db_service.get_active_card_templates()) == 1
 
 
 class TestErrorResponse:
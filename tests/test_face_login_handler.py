@@ -0,0 +1,155 @@
+"""
+Unit tests for the face login Lambda handler
+
+Tests cover:
+- Rate limiting per kiosk behind a shared source IP
+- Refusing inactive employees before any token is issued
+- 1:1 verification of claimed employees against their full-resolution face
+"""
+
+import pytest
+import json
+from unittest.mock import Mock, patch
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add lambda directories to path for imports (error_handler imports models flat)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared'))
+
+from face_login.handler import handle_face_login
+from shared.rate_limiter import RateLimitDecision
+from shared.face_recognition_service import FaceMatch
+
+
+@pytest.fixture
+def setup_environment():
+    """Environment variables required by the handler"""
+    with patch.dict(os.environ, {
+        'FACE_AUTH_BUCKET': 'test-bucket',
+        'EMPLOYEE_FACES_TABLE': 'test-employee-faces',
+        'AUTH_SESSIONS_TABLE': 'test-auth-sessions',
+        'RATE_LIMIT_TABLE': 'test-rate-limits',
+        'COGNITO_USER_POOL_ID': 'test-pool',
+        'COGNITO_CLIENT_ID': 'test-client',
+        'AWS_REGION': 'us-east-1'
+    }):
+        yield
+
+
+@pytest.fixture
+def lambda_context():
+    """Mock Lambda context with the full 15 seconds left"""
+    context = Mock()
+    context.aws_request_id = 'test-request-123'
+    context.get_remaining_time_in_millis.return_value = 15000
+    return context
+
+
+@pytest.fixture
+def registry():
+    """Service registry returning mock services"""
+    registry = Mock()
+    registry.rate_limiter.return_value.check.return_value = RateLimitDecision(True, 1.0)
+    registry.error_handler.return_value.handle_error.side_effect = lambda error_code, context: Mock(
+        error_code=error_code, user_message='error', system_reason=error_code
+    )
+    registry.collection_router.return_value.search_collections.return_value = ['face-auth-employees']
+    registry.liveness_service.return_value.get_session_result.return_value = Mock(
+        is_live=True, confidence=99.0, reference_image_s3_key='liveness/liveness-123/reference.jpg'
+    )
+    with patch('face_login.handler.get_registry', return_value=registry):
+        yield registry
+
+
+def _event(**body):
+    return {
+        'body': json.dumps({'liveness_session_id': 'liveness-123', **body}),
+        'requestContext': {'identity': {'sourceIp': '203.0.113.7'}},
+        'headers': {'User-Agent': 'kiosk'}
+    }
+
+
+class TestFaceLoginRateLimit:
+    """Test cases for face login rate limiting"""
+
+    def test_kiosks_behind_one_ip_are_counted_separately(self, setup_environment, lambda_context, registry):
+        """Each kiosk gets its own bucket within the shared source IP"""
+        registry.rate_limiter.return_value.check.return_value = RateLimitDecision(False, 61.0, 30)
+
+        response = handle_face_login(_event(kiosk_id='lobby-1'), lambda_context)
+        handle_face_login(_event(kiosk_id='lobby-2'), lambda_context)
+        handle_face_login(_event(), lambda_context)
+
+        assert response['statusCode'] == 429
+        assert registry.rate_limiter.call_args[0][0] == 'test-rate-limits'
+        keys = [call[0][0] for call in registry.rate_limiter.return_value.check.call_args_list]
+        assert keys == [
+            'face_login#203.0.113.7#lobby-1',
+            'face_login#203.0.113.7#lobby-2',
+            'face_login#203.0.113.7'
+        ]
+        registry.liveness_service.assert_not_called()
+
+
+class TestFaceLoginInactiveEmployee:
+    """Test cases for matches against inactive employees"""
+
+    def test_inactive_match_gets_no_tokens(self, setup_environment, lambda_context, registry):
+        """An inactive employee is refused before Cognito is called"""
+        face_service = registry.face_recognition_service.return_value
+        face_service.search_faces.return_value = ([FaceMatch('face-1', '123456', 99.5, 99.9)], None)
+        db_service = registry.dynamodb_service.return_value
+        db_service.authorize_login.return_value = False
+
+        response = handle_face_login(_event(), lambda_context)
+
+        assert response['statusCode'] == 401
+        assert json.loads(response['body'])['error'] == 'ACCOUNT_DISABLED'
+        assert db_service.authorize_login.call_args[0][0] == '123456'
+        cognito_service = registry.cognito_service.return_value
+        cognito_service.create_authentication_session.assert_not_called()
+        cognito_service.generate_auth_token.assert_not_called()
+        db_service.create_auth_session.assert_not_called()
+
+
+class TestFaceLoginClaimedEmployee:
+    """Test cases for badge-tap kiosks sending claimed_employee_id"""
+
+    def _employee_record(self, face_image_s3_key):
+        return Mock(is_active=True, face_id='face-1', thumbnail_s3_key='enroll/123456/face_thumbnail.jpg',
+                    face_image_s3_key=face_image_s3_key)
+
+    def test_verifies_against_full_resolution_face(self, setup_environment, lambda_context, registry):
+        """CompareFaces targets the stored enrollment face, not the thumbnail"""
+        face_service = registry.face_recognition_service.return_value
+        face_service.verify_face.return_value = (FaceMatch('face-1', '123456', 98.0, 99.9), None)
+        db_service = registry.dynamodb_service.return_value
+        db_service.get_employee_face_record.return_value = self._employee_record('enroll/123456/face.jpg')
+        db_service.authorize_login.return_value = True
+        registry.cognito_service.return_value.create_authentication_session.return_value = (
+            Mock(session_id='session-1', cognito_token='token',
+                 expires_at=datetime.now() + timedelta(hours=8)),
+            None
+        )
+
+        response = handle_face_login(_event(claimed_employee_id='123456'), lambda_context)
+
+        assert response['statusCode'] == 200
+        assert face_service.verify_face.call_args[0][1] == {'Bucket': 'test-bucket',
+                                                            'Name': 'enroll/123456/face.jpg'}
+        face_service.search_faces.assert_not_called()
+
+    def test_record_without_face_image_falls_back_to_search(self, setup_environment, lambda_context, registry):
+        """Records enrolled before the face image was kept use the 1:N search"""
+        face_service = registry.face_recognition_service.return_value
+        face_service.search_faces.return_value = ([], None)
+        db_service = registry.dynamodb_service.return_value
+        db_service.get_employee_face_record.return_value = self._employee_record(None)
+
+        response = handle_face_login(_event(claimed_employee_id='123456'), lambda_context)
+
+        assert response['statusCode'] == 401
+        face_service.verify_face.assert_not_called()
+        face_service.search_faces.assert_called_once()
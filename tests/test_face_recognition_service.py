@@ -414,6 +414,227 @@ class TestFaceRecognitionService:
         assert call_args[1]['MaxFaces'] == 1
         assert call_args[1]['QualityFilter'] == 'AUTO'
     
+    def test_search_faces_with_reference_image(self, mock_rekognition_client,
+                                              sample_search_faces_response):
+        """Test face search using the Liveness reference image in S3"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.search_faces_by_image.return_value = sample_search_faces_response
+        reference_image = {'Bucket': 'face-auth-bucket', 'Name': 'liveness-audit/session/reference.jpg'}
+        
+        matches, error = service.search_faces(request_id='test-request', s3_object=reference_image)
+        
+        assert error is None
+        assert matches[0].employee_id == '123456'
+        call_args = mock_rekognition_client.search_faces_by_image.call_args
+        assert call_args[1]['Image'] == {'S3Object': reference_image}
+    
+    def test_search_users_mode(self, mock_rekognition_client, sample_face_image):
+        """Test user search matches against each employee's aggregated face vectors"""
+        service = FaceRecognitionService(search_mode='users')
+        mock_rekognition_client.search_users_by_image.return_value = {
+            'UserMatches': [
+                {'Similarity': 91.0, 'User': {'UserId': '654321', 'UserStatus': 'ACTIVE'}},
+                {'Similarity': 98.5, 'User': {'UserId': '123456', 'UserStatus': 'ACTIVE'}}
+            ],
+            'SearchedFace': {'FaceDetail': {'Confidence': 99.9}}
+        }
+        
+        matches, error = service.search_faces(sample_face_image, 'test-request')
+        
+        assert error is None
+        assert [match.employee_id for match in matches] == ['123456', '654321']
+        assert matches[0].similarity == 98.5
+        assert matches[0].confidence == 99.9
+        mock_rekognition_client.search_faces_by_image.assert_not_called()
+        call_args = mock_rekognition_client.search_users_by_image.call_args
+        assert call_args[1]['UserMatchThreshold'] == service.FACE_MATCH_THRESHOLD
+    
+    def test_search_faces_fan_out(self, mock_rekognition_client, sample_face_image):
+        """Test shard searches are merged by similarity and failed shards skipped"""
+        from botocore.exceptions import ClientError
+        
+        service = FaceRecognitionService(search_mode='users')
+        responses = {
+            'face-auth-tokyo': {'UserMatches': [
+                {'Similarity': 93.0, 'User': {'UserId': '111111'}}
+            ]},
+            'face-auth-osaka': {'UserMatches': [
+                {'Similarity': 99.0, 'User': {'UserId': '222222'}}
+            ]}
+        }
+        
+        def search_users_by_image(CollectionId, **kwargs):
+            if CollectionId == 'face-auth-nagoya':
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Slow down'}},
+                                  'SearchUsersByImage')
+            return responses[CollectionId]
+        
+        mock_rekognition_client.search_users_by_image.side_effect = search_users_by_image
+        
+        matches, error = service.search_faces(
+            sample_face_image, 'test-request',
+            collection_ids=['face-auth-tokyo', 'face-auth-nagoya', 'face-auth-osaka'],
+            timeout_seconds=5.0
+        )
+        
+        assert error is None
+        assert [match.employee_id for match in matches] == ['222222', '111111']
+        searched = {call[1]['CollectionId'] for call in mock_rekognition_client.search_users_by_image.call_args_list}
+        assert searched == {'face-auth-tokyo', 'face-auth-nagoya', 'face-auth-osaka'}
+    
+    def test_search_faces_fan_out_deadline(self, mock_rekognition_client, sample_face_image):
+        """Test shards that miss the deadline are left out of the result"""
+        import threading
+        
+        service = FaceRecognitionService(search_mode='users')
+        release = threading.Event()
+        
+        def search_users_by_image(CollectionId, **kwargs):
+            if CollectionId == 'face-auth-slow':
+                release.wait(5.0)
+            return {'UserMatches': [{'Similarity': 95.0, 'User': {'UserId': CollectionId}}]}
+        
+        mock_rekognition_client.search_users_by_image.side_effect = search_users_by_image
+        
+        try:
+            matches, error = service.search_faces(
+                sample_face_image, 'test-request',
+                collection_ids=['face-auth-fast', 'face-auth-slow'],
+                timeout_seconds=0.5
+            )
+        finally:
+            release.set()
+        
+        assert error is None
+        assert [match.employee_id for match in matches] == ['face-auth-fast']
+    
+    def test_verify_face_match(self, mock_rekognition_client, sample_face_image):
+        """Test 1:1 verification compares against the enrollment image only"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.compare_faces.return_value = {
+            'SourceImageFace': {'Confidence': 99.8},
+            'FaceMatches': [{'Similarity': 96.0}, {'Similarity': 98.7}]
+        }
+        enrolled_image = {'Bucket': 'face-auth-bucket', 'Name': 'enroll/123456/face_thumbnail.jpg'}
+        
+        match, error = service.verify_face('123456', enrolled_image, sample_face_image,
+                                           'test-request', face_id='face-123')
+        
+        assert error is None
+        assert match.employee_id == '123456'
+        assert match.face_id == 'face-123'
+        assert match.similarity == 98.7
+        mock_rekognition_client.search_faces_by_image.assert_not_called()
+        call_args = mock_rekognition_client.compare_faces.call_args
+        assert call_args[1]['TargetImage'] == {'S3Object': enrolled_image}
+        assert call_args[1]['SimilarityThreshold'] == service.VERIFY_SIMILARITY_THRESHOLD
+    
+    def test_verify_face_mismatch_and_error(self, mock_rekognition_client, sample_face_image):
+        """Test a mismatch is a verdict while a failed comparison is an error"""
+        from botocore.exceptions import ClientError
+        
+        service = FaceRecognitionService()
+        enrolled_image = {'Bucket': 'face-auth-bucket', 'Name': 'enroll/123456/face_thumbnail.jpg'}
+        mock_rekognition_client.compare_faces.return_value = {
+            'FaceMatches': [], 'UnmatchedFaces': [{'Confidence': 99.0}]
+        }
+        
+        assert service.verify_face('123456', enrolled_image, sample_face_image) == (None, None)
+        
+        mock_rekognition_client.compare_faces.side_effect = ClientError(
+            {'Error': {'Code': 'InvalidS3ObjectException', 'Message': 'Unable to get object'}},
+            'CompareFaces'
+        )
+        match, error = service.verify_face('123456', enrolled_image, sample_face_image)
+        
+        assert match is None
+        assert "Face verification error" in error
+    
+    def test_search_mode_from_environment(self, mock_rekognition_client):
+        """Test the search mode is read from FACE_SEARCH_MODE and validated"""
+        with patch.dict(os.environ, {'FACE_SEARCH_MODE': 'users'}):
+            assert FaceRecognitionService().search_mode == 'users'
+        
+        with pytest.raises(ValueError, match="Unknown face search mode"):
+            FaceRecognitionService(search_mode='vectors')
+    
+    def test_enroll_user(self, mock_rekognition_client):
+        """Test an existing user is reused and faces are associated with it"""
+        from botocore.exceptions import ClientError
+        
+        service = FaceRecognitionService()
+        mock_rekognition_client.create_user.side_effect = ClientError(
+            {'Error': {'Code': 'ConflictException', 'Message': 'User already exists'}},
+            'CreateUser'
+        )
+        mock_rekognition_client.associate_faces.return_value = {
+            'AssociatedFaces': [{'FaceId': 'face-1'}],
+            'UnsuccessfulFaceAssociations': [
+                {'FaceId': 'face-2', 'Reasons': ['LOW_MATCH_CONFIDENCE']}
+            ]
+        }
+        
+        associated = service.enroll_user('123456', ['face-1', 'face-2'])
+        
+        assert associated == ['face-1']
+        call_args = mock_rekognition_client.associate_faces.call_args
+        assert call_args[1]['UserId'] == '123456'
+        assert call_args[1]['FaceIds'] == ['face-1', 'face-2']
+    
+    def test_enroll_user_create_failure(self, mock_rekognition_client):
+        """Test no faces are associated when the user cannot be created"""
+        from botocore.exceptions import ClientError
+        
+        service = FaceRecognitionService()
+        mock_rekognition_client.create_user.side_effect = ClientError(
+            {'Error': {'Code': 'ServiceQuotaExceededException', 'Message': 'Too many users'}},
+            'CreateUser'
+        )
+        
+        assert service.enroll_user('123456', ['face-1']) == []
+        mock_rekognition_client.associate_faces.assert_not_called()
+    
+    def test_enroll_additional_faces_skips_rejected(self, mock_rekognition_client,
+                                                    sample_index_faces_response):
+        """Test extra enrollment frames that fail the rules are skipped"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.index_faces.side_effect = [
+            sample_index_faces_response,
+            {'FaceRecords': [], 'UnindexedFaces': [{'Reasons': ['LOW_SHARPNESS']}]}
+        ]
+        frames = [
+            {'Bucket': 'face-auth-bucket', 'Name': 'liveness-audit/session/reference.jpg'},
+            {'Bucket': 'face-auth-bucket', 'Name': 'liveness-audit/session/audit-0.jpg'}
+        ]
+        
+        face_ids = service.enroll_additional_faces('123456', frames, 'test-request')
+        
+        assert face_ids == ['face-new-123']
+        assert mock_rekognition_client.index_faces.call_count == 2
+    
+    def test_index_and_detect_with_reference_image(self, mock_rekognition_client,
+                                                   sample_index_faces_response,
+                                                   sample_detect_faces_response):
+        """Test enrollment calls pass the S3 reference instead of bytes"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.index_faces.return_value = sample_index_faces_response
+        mock_rekognition_client.detect_faces.return_value = sample_detect_faces_response
+        reference_image = {'Bucket': 'face-auth-bucket', 'Name': 'liveness-audit/session/reference.jpg'}
+        
+        face_details = service.detect_faces(s3_object=reference_image)
+        face_data, error = service.index_face(None, '123456', 'test-request', s3_object=reference_image)
+        
+        assert face_details is not None
+        assert error is None
+        assert face_data.face_id == 'face-new-123'
+        assert mock_rekognition_client.detect_faces.call_args[1]['Image'] == {'S3Object': reference_image}
+        assert mock_rekognition_client.index_faces.call_args[1]['Image'] == {'S3Object': reference_image}
+    
+    def test_image_param_requires_source(self):
+        """Test that an image source is required"""
+        with pytest.raises(ValueError):
+            FaceRecognitionService._image_param(None, None)
+    
     def test_index_face_no_face_detected(self, mock_rekognition_client, sample_face_image):
         """Test face indexing with no face detected"""
         service = FaceRecognitionService()
@@ -430,6 +651,87 @@ class TestFaceRecognitionService:
         assert error.error_code == ErrorCodes.LIVENESS_FAILED
         assert "No face detected" in error.system_reason
     
+    def test_enroll_face_single_call(self, mock_rekognition_client, sample_face_image,
+                                     sample_index_faces_response):
+        """Test enrollment validates and indexes with one IndexFaces call"""
+        service = FaceRecognitionService()
+        face_detail = sample_index_faces_response['FaceRecords'][0]['FaceDetail']
+        face_detail['Quality'] = {'Brightness': 75.0, 'Sharpness': 85.0}
+        face_detail['Landmarks'] = [{'Type': 'eyeLeft', 'X': 0.3, 'Y': 0.3}]
+        mock_rekognition_client.index_faces.return_value = sample_index_faces_response
+        
+        face_data, rejection = service.enroll_face(sample_face_image, '123456', 'test-request')
+        
+        assert rejection is None
+        assert face_data.face_id == 'face-new-123'
+        assert face_data.landmarks == [{'Type': 'eyeLeft', 'X': 0.3, 'Y': 0.3}]
+        mock_rekognition_client.index_faces.assert_called_once()
+        mock_rekognition_client.detect_faces.assert_not_called()
+        mock_rekognition_client.delete_faces.assert_not_called()
+    
+    def test_enroll_face_no_face(self, mock_rekognition_client, sample_face_image):
+        """Test enrollment rejection reports UnindexedFaces reasons"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.index_faces.return_value = {
+            'FaceRecords': [],
+            'UnindexedFaces': [{'Reasons': ['LOW_SHARPNESS', 'SMALL_BOUNDING_BOX']}]
+        }
+        
+        face_data, rejection = service.enroll_face(sample_face_image, '123456')
+        
+        assert face_data is None
+        assert rejection == "No face indexed: LOW_SHARPNESS, SMALL_BOUNDING_BOX"
+        mock_rekognition_client.delete_faces.assert_not_called()
+    
+    @pytest.mark.parametrize('face_detail_update,unindexed,expected', [
+        ({}, [{'Reasons': ['EXCEEDS_MAX_FACES']}], "Multiple faces detected: 2"),
+        ({'Confidence': 80.0}, [], "below threshold"),
+        ({'Quality': {'Brightness': 20.0, 'Sharpness': 85.0}}, [], "Poor image quality"),
+    ])
+    def test_enroll_face_rule_violation_removes_face(self, mock_rekognition_client, sample_face_image,
+                                                     sample_index_faces_response, face_detail_update,
+                                                     unindexed, expected):
+        """Test faces that break enrollment rules are removed from the collection"""
+        service = FaceRecognitionService()
+        sample_index_faces_response['FaceRecords'][0]['FaceDetail'].update(face_detail_update)
+        sample_index_faces_response['UnindexedFaces'] = unindexed
+        mock_rekognition_client.index_faces.return_value = sample_index_faces_response
+        
+        face_data, rejection = service.enroll_face(sample_face_image, '123456')
+        
+        assert face_data is None
+        assert expected in rejection
+        mock_rekognition_client.delete_faces.assert_called_once_with(
+            CollectionId=service.collection_id, FaceIds=['face-new-123']
+        )
+    
+    @pytest.mark.parametrize('profile,expected', [
+        ('presence-only', ['DEFAULT']),
+        ('quality', ['DEFAULT', 'FACE_OCCLUDED', 'EYES_OPEN']),
+        ('full', ['ALL']),
+    ])
+    def test_attribute_profiles(self, mock_rekognition_client, sample_face_image,
+                                sample_detect_faces_response, sample_index_faces_response,
+                                profile, expected):
+        """Test each call site sends the attributes of the requested profile"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.detect_faces.return_value = sample_detect_faces_response
+        mock_rekognition_client.index_faces.return_value = sample_index_faces_response
+        
+        service.detect_faces(sample_face_image, attribute_profile=profile)
+        service.enroll_face(sample_face_image, '123456', attribute_profile=profile)
+        
+        assert mock_rekognition_client.detect_faces.call_args[1]['Attributes'] == expected
+        assert mock_rekognition_client.index_faces.call_args[1]['DetectionAttributes'] == expected
+    
+    def test_unknown_attribute_profile(self, mock_rekognition_client, sample_face_image):
+        """Test an unknown profile is rejected before calling Rekognition"""
+        service = FaceRecognitionService()
+        
+        with pytest.raises(ValueError, match="Unknown attribute profile"):
+            service.enroll_face(sample_face_image, '123456', attribute_profile='everything')
+        mock_rekognition_client.index_faces.assert_not_called()
+    
     def test_delete_face_success(self, mock_rekognition_client):
         """Test successful face deletion"""
         service = FaceRecognitionService()
@@ -477,6 +779,7 @@ class TestFaceRecognitionService:
         }
         
         # Mock delete faces response
+        mock_rekognition_client.disassociate_faces.return_value = {'DisassociatedFaces': []}
         mock_rekognition_client.delete_faces.return_value = {
             'DeletedFaces': ['face-1', 'face-3']
         }
@@ -507,6 +810,60 @@ class TestFaceRecognitionService:
         assert error is None
         mock_rekognition_client.delete_faces.assert_not_called()
     
+    def test_delete_faces_by_employee_id_stored_face_ids(self, mock_rekognition_client):
+        """Test stored face ids are deleted without listing the collection"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.disassociate_faces.return_value = {'DisassociatedFaces': []}
+        mock_rekognition_client.delete_faces.return_value = {'DeletedFaces': ['face-1']}
+        
+        deleted_count, error = service.delete_faces_by_employee_id(
+            '123456', 'test-request', face_ids=['face-1', 'face-1']
+        )
+        
+        assert deleted_count == 1
+        assert error is None
+        mock_rekognition_client.list_faces.assert_not_called()
+        mock_rekognition_client.disassociate_faces.assert_called_once_with(
+            CollectionId=service.collection_id, UserId='123456', FaceIds=['face-1']
+        )
+        mock_rekognition_client.delete_faces.assert_called_once_with(
+            CollectionId=service.collection_id, FaceIds=['face-1']
+        )
+    
+    def test_delete_faces_by_employee_id_scans_all_pages(self, mock_rekognition_client):
+        """Test the fallback scan follows NextToken past the first page"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.list_faces.side_effect = [
+            {'Faces': [{'FaceId': 'face-1', 'ExternalImageId': '654321'}], 'NextToken': 'page-2'},
+            {'Faces': [{'FaceId': 'face-2', 'ExternalImageId': '123456'}]}
+        ]
+        mock_rekognition_client.disassociate_faces.return_value = {'DisassociatedFaces': []}
+        mock_rekognition_client.delete_faces.return_value = {'DeletedFaces': ['face-2']}
+        
+        deleted_count, error = service.delete_faces_by_employee_id('123456', 'test-request')
+        
+        assert deleted_count == 1
+        assert mock_rekognition_client.list_faces.call_count == 2
+        assert mock_rekognition_client.list_faces.call_args_list[1][1]['NextToken'] == 'page-2'
+        assert mock_rekognition_client.delete_faces.call_args[1]['FaceIds'] == ['face-2']
+    
+    def test_iter_faces_streams_pages(self, mock_rekognition_client):
+        """Test iter_faces fetches the next page only when it is needed"""
+        service = FaceRecognitionService()
+        mock_rekognition_client.list_faces.side_effect = [
+            {'Faces': [{'FaceId': 'face-1'}, {'FaceId': 'face-2'}], 'NextToken': 'page-2'},
+            {'Faces': [{'FaceId': 'face-3'}]}
+        ]
+        
+        faces = service.iter_faces(page_size=2, user_id='123456')
+        
+        assert next(faces)['FaceId'] == 'face-1'
+        assert mock_rekognition_client.list_faces.call_count == 1
+        assert [face['FaceId'] for face in faces] == ['face-2', 'face-3']
+        assert mock_rekognition_client.list_faces.call_args_list[0][1] == {
+            'CollectionId': service.collection_id, 'MaxResults': 2, 'UserId': '123456'
+        }
+    
     def test_get_collection_stats(self, mock_rekognition_client):
         """Test getting collection statistics"""
         service = FaceRecognitionService()
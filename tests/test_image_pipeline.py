@@ -0,0 +1,144 @@
+"""
+Unit tests for the single-decode face image pipeline
+
+Tests cover:
+- Search image, thumbnail, quality metrics and dimensions from one decode
+- Downscaling of oversized frames and mode conversion
+- Pass-through of Rekognition-ready uploads and EXIF orientation
+- Rejection of undecodable input
+"""
+
+import pytest
+from unittest.mock import patch
+from io import BytesIO
+import random
+import sys
+import os
+
+from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.image_pipeline import process_face_image
+from shared.image_quality import QualityThresholds, evaluate_image_quality
+
+
+def _encode(img: Image.Image, fmt: str = 'JPEG', **params) -> bytes:
+    output = BytesIO()
+    img.save(output, format=fmt, **params)
+    return output.getvalue()
+
+
+def _textured_image(size=(640, 480), mode='RGB', seed=7) -> Image.Image:
+    """Well-lit image with plenty of edges"""
+    rng = random.Random(seed)
+    img = Image.new('L', (size[0] // 8, size[1] // 8))
+    img.putdata([rng.randint(60, 200) for _ in range(img.size[0] * img.size[1])])
+    return img.resize(size, Image.Resampling.NEAREST).convert(mode)
+
+
+class TestProcessFaceImage:
+    """Test cases for process_face_image"""
+
+    def test_all_derivatives_from_one_frame(self):
+        """A kiosk frame yields search image, thumbnail, metrics and dimensions"""
+        processed = process_face_image(_encode(_textured_image()))
+
+        assert processed.format == 'JPEG'
+        assert processed.dimensions == (640, 480)
+        with Image.open(BytesIO(processed.search_image)) as search:
+            assert search.format == 'JPEG'
+            assert search.size == (640, 480)
+        with Image.open(BytesIO(processed.thumbnail)) as thumbnail:
+            assert thumbnail.size == (200, 200)
+            assert thumbnail.mode == 'RGB'
+        assert processed.quality.width == 640
+        assert evaluate_image_quality(processed.quality, QualityThresholds()) is None
+
+    def test_decodes_once(self):
+        """The encoded bytes are opened exactly once"""
+        image_bytes = _encode(_textured_image())
+
+        with patch('shared.image_pipeline.Image.open', wraps=Image.open) as mock_open:
+            process_face_image(image_bytes)
+
+        assert mock_open.call_count == 1
+
+    def test_large_jpeg_downscaled_with_draft(self):
+        """Oversized JPEGs are draft-decoded and bounded to the search size"""
+        image_bytes = _encode(_textured_image(size=(4000, 3000)))
+
+        with patch.object(JpegImageFile, 'draft', autospec=True, side_effect=JpegImageFile.draft) as mock_draft:
+            processed = process_face_image(image_bytes, search_max_side=1000)
+
+        assert mock_draft.call_args_list[0][0][1:] == ('RGB', (1000, 1000))
+        assert processed.dimensions == (4000, 3000)
+        with Image.open(BytesIO(processed.search_image)) as search:
+            assert search.size == (1000, 750)
+
+    def test_png_and_cmyk_converted_to_rgb(self):
+        """PNG and CMYK uploads produce RGB JPEG search images"""
+        for image_bytes in (_encode(_textured_image(mode='RGBA'), 'PNG'),
+                            _encode(_textured_image(mode='CMYK'))):
+            processed = process_face_image(image_bytes)
+
+            with Image.open(BytesIO(processed.search_image)) as search:
+                assert search.format == 'JPEG'
+                assert search.mode == 'RGB'
+
+    def test_dark_frame_metrics(self):
+        """Quality metrics come from the same decode"""
+        dark = Image.new('RGB', (640, 480), (5, 5, 5))
+
+        processed = process_face_image(_encode(dark))
+
+        assert "too dark" in evaluate_image_quality(processed.quality, QualityThresholds())
+
+    def test_ready_jpeg_passed_through(self):
+        """Upright RGB JPEGs within the search size are sent to Rekognition as uploaded"""
+        image_bytes = _encode(_textured_image())
+
+        with patch('shared.image_pipeline.Image.Image.resize', autospec=True,
+                   side_effect=Image.Image.resize) as mock_resize:
+            processed = process_face_image(image_bytes)
+
+        assert processed.passed_through is True
+        assert processed.search_image is image_bytes
+        # Only the small thumbnail and quality copies are resampled
+        for call_args in mock_resize.call_args_list:
+            assert max(call_args[0][1]) <= 256
+
+    def test_not_passed_through(self):
+        """Oversized, PNG and rotated uploads are re-encoded"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        uploads = (
+            _encode(_textured_image(size=(2000, 1500))),
+            _encode(_textured_image(), 'PNG'),
+            _encode(_textured_image(), exif=exif.tobytes()),
+        )
+
+        for image_bytes in uploads:
+            processed = process_face_image(image_bytes, search_max_side=1280)
+
+            assert processed.passed_through is False
+            assert processed.search_image != image_bytes
+
+    def test_exif_orientation_applied(self):
+        """Rotated phone photos reach Rekognition upright"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        image_bytes = _encode(_textured_image(size=(640, 480)), exif=exif.tobytes())
+
+        processed = process_face_image(image_bytes)
+
+        assert processed.dimensions == (640, 480)
+        with Image.open(BytesIO(processed.search_image)) as search:
+            assert search.size == (480, 640)
+
+    def test_invalid_image(self):
+        """Undecodable input raises ValueError"""
+        with pytest.raises(ValueError, match="Failed to process image"):
+            process_face_image(b'not an image')
@@ -0,0 +1,90 @@
+"""
+Unit tests for the header-only image probe
+
+Tests cover:
+- JPEG SOF and PNG IHDR parsing against Pillow
+- EXIF orientation and progressive JPEG detection
+- Magic-byte sniffing and malformed headers
+"""
+
+import pytest
+from io import BytesIO
+import sys
+import os
+
+from PIL import Image
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.image_probe import probe_image, sniff_format
+
+
+def _encode(img: Image.Image, fmt: str = 'JPEG', **params) -> bytes:
+    output = BytesIO()
+    img.save(output, format=fmt, **params)
+    return output.getvalue()
+
+
+class TestProbeImage:
+    """Test cases for probe_image"""
+
+    @pytest.mark.parametrize('mode,fmt,expected_mode', [
+        ('RGB', 'JPEG', 'RGB'),
+        ('L', 'JPEG', 'L'),
+        ('CMYK', 'JPEG', 'CMYK'),
+        ('RGB', 'PNG', 'RGB'),
+        ('RGBA', 'PNG', 'RGBA'),
+        ('L', 'PNG', 'L'),
+        ('P', 'PNG', 'P'),
+    ])
+    def test_matches_pillow(self, mode, fmt, expected_mode):
+        """Format, size and mode agree with what Pillow reports"""
+        image_bytes = _encode(Image.new(mode, (321, 123)), fmt)
+
+        probe = probe_image(image_bytes)
+
+        assert probe.format == fmt
+        assert probe.size == (321, 123)
+        assert probe.mode == expected_mode
+        assert probe.orientation == 1
+
+    def test_exif_orientation(self):
+        """Orientation is read from the APP1 segment ahead of the frame header"""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        image_bytes = _encode(Image.new('RGB', (640, 480)), exif=exif.tobytes())
+
+        probe = probe_image(image_bytes)
+
+        assert probe.orientation == 6
+        assert probe.size == (640, 480)
+        assert probe.display_size == (480, 640)
+
+    def test_progressive_jpeg(self):
+        """Progressive JPEGs are recognized by their SOF2 marker"""
+        image_bytes = _encode(Image.new('RGB', (64, 48)), progressive=True)
+
+        probe = probe_image(image_bytes)
+
+        assert probe.progressive is True
+        assert probe.size == (64, 48)
+
+    def test_unparseable_headers(self):
+        """Headers without a frame, truncated data and other formats yield None"""
+        valid_jpeg = _encode(Image.new('RGB', (64, 48)))
+
+        assert probe_image(b'\xff\xd8\xff\xe0\x00\x10JFIF' + b'\x00' * 1000) is None
+        assert probe_image(valid_jpeg[:20]) is None
+        assert probe_image(b'\x89PNG\r\n\x1a\n' + b'\x00' * 10) is None
+        assert probe_image(_encode(Image.new('RGB', (64, 48)), 'GIF')) is None
+        assert probe_image(b'') is None
+
+
+def test_sniff_format():
+    """Magic bytes map onto container formats"""
+    assert sniff_format(b'\xff\xd8\xff\xe0') == 'JPEG'
+    assert sniff_format(b'\x89PNG\r\n\x1a\n') == 'PNG'
+    assert sniff_format(b'GIF89a') == 'GIF'
+    assert sniff_format(b'RIFF\x00\x00\x00\x00WEBP') == 'WEBP'
+    assert sniff_format(b'INVALID') is None
@@ -0,0 +1,115 @@
+"""
+Unit tests for the local image quality pre-gate
+
+Tests cover:
+- Brightness, contrast and sharpness measurement
+- Rejection of dark, overexposed, flat, blurry and tiny frames
+- Pillow fallback when NumPy is unavailable
+"""
+
+import pytest
+from unittest.mock import patch
+from io import BytesIO
+import random
+import sys
+import os
+
+from PIL import Image, ImageFilter
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.image_quality import (
+    QualityThresholds,
+    check_image_quality,
+    measure_image_quality
+)
+
+
+def _encode(img: Image.Image, fmt: str = 'JPEG') -> bytes:
+    output = BytesIO()
+    img.save(output, format=fmt, quality=95)
+    return output.getvalue()
+
+
+def _textured_image(size=(640, 480), low=60, high=200, seed=7) -> Image.Image:
+    """Well-lit image with plenty of edges"""
+    rng = random.Random(seed)
+    img = Image.new('L', (size[0] // 8, size[1] // 8))
+    img.putdata([rng.randint(low, high) for _ in range(img.size[0] * img.size[1])])
+    return img.resize(size, Image.Resampling.NEAREST).convert('RGB')
+
+
+class TestImageQuality:
+    """Test cases for check_image_quality"""
+
+    @pytest.fixture
+    def thresholds(self):
+        return QualityThresholds()
+
+    def test_good_frame_passes(self, thresholds):
+        """A well-lit, detailed frame passes the gate"""
+        metrics, reason = check_image_quality(_encode(_textured_image()), thresholds)
+
+        assert reason is None
+        assert metrics.width == 640
+        assert metrics.height == 480
+        assert thresholds.min_brightness < metrics.brightness < thresholds.max_brightness
+
+    def test_dark_frame_rejected(self, thresholds):
+        """Near-black frames are rejected as too dark"""
+        metrics, reason = check_image_quality(_encode(_textured_image(low=0, high=40)), thresholds)
+
+        assert "too dark" in reason
+
+    def test_overexposed_frame_rejected(self, thresholds):
+        """Washed-out frames are rejected"""
+        _, reason = check_image_quality(_encode(Image.new('RGB', (640, 480), (250, 250, 250))), thresholds)
+
+        assert "overexposed" in reason
+
+    def test_flat_frame_rejected(self, thresholds):
+        """Uniform frames have no contrast"""
+        _, reason = check_image_quality(_encode(Image.new('RGB', (640, 480), (128, 128, 128))), thresholds)
+
+        assert "contrast" in reason
+
+    def test_blurry_frame_rejected(self, thresholds):
+        """Heavily blurred frames are rejected on sharpness"""
+        sharp = _textured_image()
+        blurry = sharp.filter(ImageFilter.GaussianBlur(radius=25))
+
+        sharp_metrics = measure_image_quality(_encode(sharp))
+        blurry_metrics = measure_image_quality(_encode(blurry))
+        assert blurry_metrics.sharpness < sharp_metrics.sharpness
+
+        relaxed = QualityThresholds(min_contrast=0.0)
+        _, reason = check_image_quality(_encode(blurry), relaxed)
+        assert "blurry" in reason
+
+    def test_tiny_frame_rejected(self, thresholds):
+        """Images below Rekognition's minimum size are rejected"""
+        _, reason = check_image_quality(_encode(_textured_image(size=(64, 64))), thresholds)
+
+        assert "too small" in reason
+
+    def test_undecodable_bytes_rejected(self, thresholds):
+        """Garbage bytes are rejected without raising"""
+        metrics, reason = check_image_quality(b'not an image', thresholds)
+
+        assert metrics is None
+        assert "decode" in reason
+
+    def test_pillow_fallback_agrees(self, thresholds):
+        """The Pillow fallback reaches the same decisions without NumPy"""
+        good = _encode(_textured_image())
+        dark = _encode(_textured_image(low=0, high=40))
+
+        with patch('shared.image_quality.np', None):
+            assert check_image_quality(good, thresholds)[1] is None
+            assert "too dark" in check_image_quality(dark, thresholds)[1]
+
+    def test_thresholds_from_env(self):
+        """Thresholds can be tuned per function"""
+        with patch.dict(os.environ, {'IMAGE_QUALITY_MIN_BRIGHTNESS': '10'}):
+            assert QualityThresholds.from_env().min_brightness == 10.0
@@ -10,6 +10,7 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timedelta, timezone
 import json
+from botocore.exceptions import ClientError
 
 # Import the service
 import sys
@@ -22,7 +23,8 @@ from liveness_service import (
     LivenessServiceError,
     SessionNotFoundError,
     SessionExpiredError,
-    ConfidenceThresholdError
+    ConfidenceThresholdError,
+    MetricsBuffer
 )
 
 
@@ -320,5 +322,253 @@ class TestLivenessService:
         assert liveness_service._validate_confidence(0.0) is False
 
 
+class TestMetricsBuffer:
+    """Buffered CloudWatch metrics tests"""
+    
+    @pytest.fixture
+    def mock_clients(self):
+        """Create mock AWS clients including CloudWatch"""
+        return {
+            'rekognition': Mock(),
+            'dynamodb': Mock(),
+            's3': Mock(),
+            'cloudwatch': Mock()
+        }
+    
+    def _create_service(self, mock_clients):
+        return LivenessService(
+            rekognition_client=mock_clients['rekognition'],
+            dynamodb_client=mock_clients['dynamodb'],
+            s3_client=mock_clients['s3'],
+            cloudwatch_client=mock_clients['cloudwatch'],
+            liveness_sessions_table='test-liveness-sessions',
+            face_auth_bucket='test-bucket'
+        )
+    
+    def _arrange_live_session(self, mock_clients, session_id='test-session-123'):
+        expires_at = int((datetime.now(timezone.utc) + timedelta(minutes=5)).timestamp())
+        mock_clients['dynamodb'].get_item.return_value = {
+            'Item': {
+                'session_id': {'S': session_id},
+                'expires_at': {'N': str(expires_at)}
+            }
+        }
+        mock_clients['rekognition'].get_face_liveness_session_results.return_value = {
+            'SessionId': session_id,
+            'Status': 'SUCCEEDED',
+            'Confidence': 97.0
+        }
+    
+    def test_emf_mode_no_api_calls(self, mock_clients, capsys):
+        """
+        Test: EMFモードではPutMetricDataを呼ばずにstdoutへ出力
+        """
+        with patch.dict(os.environ, {'LIVENESS_METRICS_MODE': 'emf'}):
+            service = self._create_service(mock_clients)
+        self._arrange_live_session(mock_clients)
+        
+        service.get_session_result('test-session-123')
+        
+        mock_clients['cloudwatch'].put_metric_data.assert_not_called()
+        documents = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        metric_names = {
+            metric['Name']
+            for document in documents
+            for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']
+        }
+        assert {'SessionCount', 'ConfidenceScore', 'VerificationTime', 'SuccessCount'} <= metric_names
+        
+        status_document = next(d for d in documents if 'Status' in d)
+        assert status_document['Status'] == 'SUCCESS'
+        assert status_document['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Status']]
+        assert status_document['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'FaceAuth/Liveness'
+        assert service.metrics.pending_count() == 0
+    
+    def test_api_mode_single_batched_call(self, mock_clients):
+        """
+        Test: APIモードでは1回のPutMetricDataにまとめて送信
+        """
+        with patch.dict(os.environ, {'LIVENESS_METRICS_MODE': 'api'}):
+            service = self._create_service(mock_clients)
+        self._arrange_live_session(mock_clients)
+        
+        service.get_session_result('test-session-123')
+        
+        mock_clients['cloudwatch'].put_metric_data.assert_called_once()
+        metric_data = mock_clients['cloudwatch'].put_metric_data.call_args[1]['MetricData']
+        assert len(metric_data) == 4
+        session_count = next(d for d in metric_data if d['MetricName'] == 'SessionCount')
+        assert session_count['Dimensions'] == [{'Name': 'Status', 'Value': 'SUCCESS'}]
+    
+    def test_flush_on_error_path(self, mock_clients):
+        """
+        Test: エラー時もメトリクスをフラッシュ
+        """
+        with patch.dict(os.environ, {'LIVENESS_METRICS_MODE': 'api'}):
+            service = self._create_service(mock_clients)
+        mock_clients['dynamodb'].get_item.return_value = {}
+        
+        with pytest.raises(SessionNotFoundError):
+            service.get_session_result('missing-session')
+        
+        metric_data = mock_clients['cloudwatch'].put_metric_data.call_args[1]['MetricData']
+        assert [d['MetricName'] for d in metric_data] == ['SessionNotFound']
+    
+    def test_repeated_metrics_aggregated(self):
+        """
+        Test: 同一メトリクスは値の配列に集約
+        """
+        cloudwatch = Mock()
+        buffer = MetricsBuffer('FaceAuth/Test', cloudwatch_client=cloudwatch, mode='api')
+        
+        buffer.add('Latency', 0.1, 'Seconds')
+        buffer.add('Latency', 0.3, 'Seconds')
+        
+        assert buffer.flush() == 2
+        assert buffer.flush() == 0
+        metric_data = cloudwatch.put_metric_data.call_args[1]['MetricData']
+        assert metric_data[0]['Values'] == [0.1, 0.3]
+    
+    def test_flush_failure_does_not_raise(self):
+        """
+        Test: 送信失敗は処理を止めない
+        """
+        cloudwatch = Mock()
+        cloudwatch.put_metric_data.side_effect = Exception('throttled')
+        buffer = MetricsBuffer('FaceAuth/Test', cloudwatch_client=cloudwatch, mode='api')
+        buffer.add('SessionCreated', 1.0, 'Count')
+        
+        assert buffer.flush() == 1
+        assert buffer.pending_count() == 0
+
+
+class TestLivenessResultCache:
+    """Persisted liveness verdict tests"""
+    
+    @pytest.fixture
+    def mock_clients(self):
+        """Create mock AWS clients"""
+        return {
+            'rekognition': Mock(),
+            'dynamodb': Mock(),
+            's3': Mock(),
+            'cloudwatch': Mock()
+        }
+    
+    @pytest.fixture
+    def liveness_service(self, mock_clients):
+        """Create LivenessService instance with mocked clients"""
+        return LivenessService(
+            rekognition_client=mock_clients['rekognition'],
+            dynamodb_client=mock_clients['dynamodb'],
+            s3_client=mock_clients['s3'],
+            cloudwatch_client=mock_clients['cloudwatch'],
+            liveness_sessions_table='test-liveness-sessions',
+            face_auth_bucket='test-bucket'
+        )
+    
+    def _session_item(self, **attributes):
+        expires_at = int((datetime.now(timezone.utc) + timedelta(minutes=5)).timestamp())
+        item = {
+            'session_id': {'S': 'test-session-123'},
+            'status': {'S': 'PENDING'},
+            'expires_at': {'N': str(expires_at)}
+        }
+        item.update(attributes)
+        return {'Item': item}
+    
+    def test_first_evaluation_persists_verdict(self, liveness_service, mock_clients):
+        """
+        Test: 初回評価で結果を条件付き書き込み
+        """
+        mock_clients['dynamodb'].get_item.return_value = self._session_item()
+        mock_clients['rekognition'].get_face_liveness_session_results.return_value = {
+            'Status': 'SUCCEEDED',
+            'Confidence': 96.0,
+            'ReferenceImage': {'S3Object': {'Bucket': 'test-bucket', 'Name': 'liveness-audit/ref.jpg'}}
+        }
+        
+        result = liveness_service.get_session_result('test-session-123')
+        
+        assert result.is_live is True
+        assert mock_clients['dynamodb'].get_item.call_args[1]['ConsistentRead'] is True
+        update_kwargs = mock_clients['dynamodb'].update_item.call_args[1]
+        assert update_kwargs['ConditionExpression'] == 'attribute_not_exists(rekognition_status)'
+        assert update_kwargs['ExpressionAttributeValues'][':rekognition_status'] == {'S': 'SUCCEEDED'}
+        assert update_kwargs['ExpressionAttributeValues'][':ref_key'] == {'S': 'liveness-audit/ref.jpg'}
+    
+    def test_repeat_check_served_from_record(self, liveness_service, mock_clients):
+        """
+        Test: 評価済みセッションはDynamoDB 1回の読み取りのみ
+        """
+        mock_clients['dynamodb'].get_item.return_value = self._session_item(**{
+            'status': {'S': 'SUCCESS'},
+            'confidence': {'N': '96.0'},
+            'reference_image_s3_key': {'S': 'liveness-audit/ref.jpg'},
+            'audit_image_s3_key': {'S': ''},
+            'rekognition_status': {'S': 'SUCCEEDED'}
+        })
+        
+        result = liveness_service.get_session_result('test-session-123')
+        
+        assert result.is_live is True
+        assert result.confidence == 96.0
+        assert result.status == 'SUCCESS'
+        assert result.reference_image_s3_key == 'liveness-audit/ref.jpg'
+        assert result.audit_image_s3_key is None
+        mock_clients['rekognition'].get_face_liveness_session_results.assert_not_called()
+        mock_clients['dynamodb'].update_item.assert_not_called()
+        assert mock_clients['dynamodb'].get_item.call_count == 1
+    
+    def test_failed_verdict_served_from_record(self, liveness_service, mock_clients):
+        """
+        Test: 失敗判定も保存済み結果から返す
+        """
+        mock_clients['dynamodb'].get_item.return_value = self._session_item(**{
+            'status': {'S': 'FAILED'},
+            'confidence': {'N': '40.0'},
+            'rekognition_status': {'S': 'SUCCEEDED'},
+            'error_message': {'S': 'Confidence 40.00% below threshold 90.0%'}
+        })
+        
+        result = liveness_service.get_session_result('test-session-123')
+        
+        assert result.is_live is False
+        assert 'below threshold' in result.error_message
+        mock_clients['rekognition'].get_face_liveness_session_results.assert_not_called()
+    
+    def test_in_progress_session_not_persisted(self, liveness_service, mock_clients):
+        """
+        Test: 未完了セッションの結果は保存しない
+        """
+        mock_clients['dynamodb'].get_item.return_value = self._session_item()
+        mock_clients['rekognition'].get_face_liveness_session_results.return_value = {
+            'Status': 'IN_PROGRESS'
+        }
+        
+        result = liveness_service.get_session_result('test-session-123')
+        
+        assert result.is_live is False
+        mock_clients['dynamodb'].update_item.assert_not_called()
+    
+    def test_concurrent_verdict_tolerated(self, liveness_service, mock_clients):
+        """
+        Test: 他のハンドラが先に保存した場合もエラーにしない
+        """
+        mock_clients['dynamodb'].get_item.return_value = self._session_item()
+        mock_clients['rekognition'].get_face_liveness_session_results.return_value = {
+            'Status': 'SUCCEEDED',
+            'Confidence': 96.0
+        }
+        mock_clients['dynamodb'].update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+            'UpdateItem'
+        )
+        
+        result = liveness_service.get_session_result('test-session-123')
+        
+        assert result.is_live is True
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -583,5 +583,92 @@ class TestErrorHandling:
         assert 'employee_id' not in extracted_data or extracted_data['employee_id'] == ''
 
 
+class TestSharedTextDetection:
+    """Test cases for evaluating all templates against a single DetectText call"""
+    
+    @pytest.fixture
+    def ocr_service(self):
+        """OCRService with mocked Rekognition client and DynamoDB service"""
+        with patch('boto3.client') as mock_boto, \
+             patch('shared.ocr_service.DynamoDBService') as mock_db:
+            mock_boto.return_value = Mock()
+            mock_db.return_value = Mock()
+            service = OCRService('us-east-1')
+            yield service
+    
+    @pytest.fixture
+    def detect_text_response(self):
+        """Rekognition DetectText response with ID, name and department lines"""
+        return {
+            'TextDetections': [
+                {'Type': 'LINE', 'DetectedText': '1234567', 'Confidence': 99.0},
+                {'Type': 'LINE', 'DetectedText': '山田太郎', 'Confidence': 98.0},
+                {'Type': 'LINE', 'DetectedText': '営業部門', 'Confidence': 97.0},
+                {'Type': 'WORD', 'DetectedText': '1234567', 'Confidence': 99.0}
+            ]
+        }
+    
+    def _template(self, pattern_id, fields):
+        return CardTemplate(
+            pattern_id=pattern_id,
+            card_type=pattern_id,
+            logo_position={},
+            fields=fields,
+            created_at=datetime.now(),
+            is_active=True
+        )
+    
+    def test_detect_text_called_once_for_all_templates(self, ocr_service, detect_text_response):
+        """DetectText must be invoked once regardless of the number of templates"""
+        templates = [
+            self._template('contractor', [
+                {'field_name': 'employee_id', 'expected_format': r'C\d{5}'},
+                {'field_name': 'employee_name'}
+            ]),
+            self._template('legacy', [
+                {'field_name': 'employee_id', 'expected_format': r'\d{6}$'},
+                {'field_name': 'employee_name'}
+            ]),
+            self._template('standard', [
+                {'field_name': 'employee_id', 'expected_format': r'\d{7}'},
+                {'field_name': 'employee_name'}
+            ])
+        ]
+        ocr_service.db_service.get_active_card_templates.return_value = templates
+        ocr_service.rekognition.detect_text.return_value = detect_text_response
+        
+        with patch.object(EmployeeInfo, 'validate', return_value=True):
+            employee_info, error = ocr_service.extract_id_card_info(b'image', 'req-1')
+        
+        assert error is None
+        assert employee_info.employee_id == '1234567'
+        assert employee_info.card_type == 'standard'
+        ocr_service.rekognition.detect_text.assert_called_once_with(Image={'Bytes': b'image'})
+    
+    def test_most_specific_matching_template_wins(self, ocr_service, detect_text_response):
+        """When several templates match, the one validating more fields is chosen"""
+        templates = [
+            self._template('generic', [
+                {'field_name': 'employee_id'},
+                {'field_name': 'employee_name'}
+            ]),
+            self._template('with_department', [
+                {'field_name': 'employee_id', 'expected_format': r'\d{7}'},
+                {'field_name': 'employee_name'},
+                {'field_name': 'department'}
+            ])
+        ]
+        ocr_service.db_service.get_active_card_templates.return_value = templates
+        ocr_service.rekognition.detect_text.return_value = detect_text_response
+        
+        with patch.object(EmployeeInfo, 'validate', return_value=True):
+            employee_info, error = ocr_service.extract_id_card_info(b'image', 'req-2')
+        
+        assert error is None
+        assert employee_info.card_type == 'with_department'
+        assert employee_info.department == '営業部門'
+        assert ocr_service.rekognition.detect_text.call_count == 1
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
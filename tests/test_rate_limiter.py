@@ -0,0 +1,168 @@
+"""
+Unit tests for the atomic rate limiter
+
+Tests cover:
+- Allowing attempts up to the limit and blocking after it
+- Weighting the previous window (sliding-window counter)
+- Short-circuiting locally known blocks without calling DynamoDB
+- Failing open on DynamoDB errors
+- Counting concurrent attempts without undercounting
+"""
+
+import pytest
+import boto3
+import threading
+from unittest.mock import Mock
+from concurrent.futures import ThreadPoolExecutor
+from moto import mock_aws
+import sys
+import os
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.rate_limiter import RateLimiter
+
+
+WINDOW_SECONDS = 60
+
+
+class FakeClock:
+    """Settable epoch clock"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def dynamodb():
+    """Rate limit table in mock DynamoDB"""
+    with mock_aws():
+        resource = boto3.resource('dynamodb', region_name='us-east-1')
+        resource.create_table(
+            TableName='test-rate-limit',
+            KeySchema=[{'AttributeName': 'identifier', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'identifier', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield resource
+
+
+class SerializedTable:
+    """
+    Table wrapper applying writes one at a time, as DynamoDB does for a single item
+
+    moto evaluates the condition and applies the update without a lock, so
+    concurrent UpdateItem calls can interleave in a way the real service never allows.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, table):
+        self._table = table
+
+    def update_item(self, **kwargs):
+        with self._lock:
+            return self._table.update_item(**kwargs)
+
+    def delete_item(self, **kwargs):
+        with self._lock:
+            return self._table.delete_item(**kwargs)
+
+
+def _limiter(dynamodb, clock, max_attempts=5):
+    return RateLimiter('test-rate-limit', max_attempts, WINDOW_SECONDS, 'us-east-1',
+                       dynamodb_resource=dynamodb, clock=clock)
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter"""
+
+    def test_blocks_after_limit(self, dynamodb):
+        """Attempts up to the limit pass; the next one is blocked until the window ends"""
+        clock = FakeClock(WINDOW_SECONDS * 1000)
+        limiter = _limiter(dynamodb, clock)
+
+        decisions = [limiter.check('emergency#10.0.0.1') for _ in range(6)]
+
+        assert [d.allowed for d in decisions] == [True] * 5 + [False]
+        assert decisions[4].attempts == 5
+        assert decisions[5].retry_after == WINDOW_SECONDS + 1
+        # Other identifiers are unaffected
+        assert limiter.check('emergency#10.0.0.2').allowed
+
+    def test_previous_window_is_weighted(self, dynamodb):
+        """Half way into the next window, half of the previous window still counts"""
+        clock = FakeClock(WINDOW_SECONDS * 1000)
+        limiter = _limiter(dynamodb, clock, max_attempts=4)
+        for _ in range(4):
+            limiter.check('face_login#10.0.0.1')
+
+        clock.now += WINDOW_SECONDS * 1.5
+        limiter._blocked_until.clear()
+
+        decisions = [limiter.check('face_login#10.0.0.1') for _ in range(3)]
+
+        assert [d.allowed for d in decisions] == [True, True, False]
+        assert decisions[0].attempts == pytest.approx(3.0)
+
+    def test_local_block_skips_dynamodb(self, dynamodb):
+        """A blocked key is rejected in the warm container without another UpdateItem"""
+        clock = FakeClock(WINDOW_SECONDS * 1000)
+        limiter = _limiter(dynamodb, clock, max_attempts=1)
+        limiter.check('emergency#10.0.0.1')
+        assert not limiter.check('emergency#10.0.0.1').allowed
+
+        limiter.table = Mock()
+        assert not limiter.check('emergency#10.0.0.1').allowed
+        limiter.table.update_item.assert_not_called()
+
+        # The block lapses when the window rolls over
+        clock.now += WINDOW_SECONDS * 2
+        limiter.table.update_item.return_value = {'Attributes': {}}
+        assert limiter.check('emergency#10.0.0.1').allowed
+
+    def test_reset_clears_counters(self, dynamodb):
+        """reset() lets a blocked identifier try again"""
+        clock = FakeClock(WINDOW_SECONDS * 1000)
+        limiter = _limiter(dynamodb, clock, max_attempts=1)
+        limiter.check('emergency#10.0.0.1')
+        assert not limiter.check('emergency#10.0.0.1').allowed
+
+        limiter.reset('emergency#10.0.0.1')
+
+        assert limiter.check('emergency#10.0.0.1').allowed
+
+    def test_fails_open_on_dynamodb_error(self):
+        """A DynamoDB failure must not block authentication"""
+        from botocore.exceptions import ClientError
+
+        resource = Mock()
+        resource.Table.return_value.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ResourceNotFoundException', 'Message': 'missing'}}, 'UpdateItem'
+        )
+        limiter = RateLimiter('missing', 5, WINDOW_SECONDS, dynamodb_resource=resource)
+
+        assert limiter.check('emergency#10.0.0.1').allowed
+
+    def test_concurrent_attempts_are_not_undercounted(self, dynamodb):
+        """Every concurrent attempt is counted and exactly max_attempts get through"""
+        clock = FakeClock(WINDOW_SECONDS * 1000)
+        limiter = _limiter(dynamodb, clock, max_attempts=10)
+        # A second container sharing the table, without the first one's local cache
+        other_container = _limiter(dynamodb, clock, max_attempts=10)
+        limiter.table = SerializedTable(limiter.table)
+        other_container.table = SerializedTable(other_container.table)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            decisions = list(pool.map(
+                lambda i: (limiter if i % 2 else other_container).check('emergency#10.0.0.1'),
+                range(40)
+            ))
+
+        assert sum(d.allowed for d in decisions) == 10
+        item = dynamodb.Table('test-rate-limit').get_item(Key={'identifier': 'emergency#10.0.0.1'})['Item']
+        assert item[f"w_{1000}"] == 10
@@ -0,0 +1,178 @@
+"""
+Unit tests for ServiceRegistry
+
+Tests cover:
+- Tuned botocore client configuration per service
+- Client and service reuse across warm invocations
+- Test injection of fakes and registry reset
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+import sys
+import os
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.service_registry import (
+    ServiceRegistry,
+    budget_bucket,
+    build_client_config,
+    get_registry,
+    reset_registry
+)
+from shared.timeout_manager import DeadlineExceededError
+
+
+class TestBuildClientConfig:
+    """Test cases for build_client_config"""
+
+    def test_shared_settings(self):
+        """All profiles use standard retries, keep-alive and a shared pool size"""
+        for profile in ('rekognition', 'dynamodb', 'cognito-idp', 's3', 'cloudwatch'):
+            config = build_client_config(profile)
+
+            assert config.retries['mode'] == 'standard'
+            assert config.tcp_keepalive is True
+            assert config.max_pool_connections == 20
+
+    def test_per_service_timeouts(self):
+        """Timeouts and attempts differ per service profile"""
+        dynamodb_config = build_client_config('dynamodb')
+        ocr_config = build_client_config('rekognition-ocr')
+
+        assert dynamodb_config.connect_timeout == 1
+        assert dynamodb_config.read_timeout == 3
+        assert ocr_config.retries['max_attempts'] == 1
+
+    def test_budget_caps_timeouts_and_retries(self):
+        """Timeouts and attempts shrink to fit a time budget"""
+        roomy = build_client_config('dynamodb', 13)
+        tight = build_client_config('rekognition', 3)
+
+        assert roomy.read_timeout == 3
+        assert roomy.retries['max_attempts'] == 3
+        assert tight.connect_timeout == 2
+        assert tight.read_timeout == 3
+        assert tight.retries['max_attempts'] == 1
+
+    def test_budget_bucket(self):
+        """Budgets round down to a small set of client buckets"""
+        assert budget_bucket(None) is None
+        assert budget_bucket(0.8) == 0.5
+        assert budget_bucket(4.9) == 3
+        assert budget_bucket(60) == 13
+
+    def test_budget_bucket_rejects_tiny_budgets(self):
+        """Budgets below the smallest bucket are never rounded up past the deadline"""
+        with pytest.raises(DeadlineExceededError):
+            budget_bucket(0.2)
+
+    def test_pool_size_from_environment(self):
+        """Pool size can be tuned per function via environment"""
+        with patch.dict(os.environ, {'AWS_MAX_POOL_CONNECTIONS': '5'}):
+            assert build_client_config('s3').max_pool_connections == 5
+
+
+class TestServiceRegistry:
+    """Test cases for ServiceRegistry class"""
+
+    @pytest.fixture
+    def session(self):
+        """Fake boto3 session returning a new Mock per client"""
+        session = Mock()
+        session.client.side_effect = lambda *args, **kwargs: Mock()
+        session.resource.side_effect = lambda *args, **kwargs: Mock()
+        return session
+
+    @pytest.fixture
+    def registry(self, session):
+        """Registry backed by the fake session"""
+        return ServiceRegistry(region_name='ap-northeast-1', session=session)
+
+    def test_client_created_once(self, registry, session):
+        """Clients are built once per service and region"""
+        first = registry.client('s3')
+        second = registry.client('s3')
+        other_region = registry.client('s3', 'us-east-1')
+
+        assert first is second
+        assert other_region is not first
+        assert session.client.call_count == 2
+
+        args, kwargs = session.client.call_args_list[0]
+        assert args == ('s3',)
+        assert kwargs['region_name'] == 'ap-northeast-1'
+        assert kwargs['config'].tcp_keepalive is True
+
+    def test_ocr_profile_uses_rekognition(self, registry, session):
+        """Profile aliases map onto the real boto3 service name"""
+        ocr_client = registry.client('rekognition-ocr')
+
+        assert ocr_client is not registry.client('rekognition')
+        assert session.client.call_args_list[0][0] == ('rekognition',)
+
+    def test_services_reused_and_share_clients(self, registry):
+        """Services are cached by arguments and share the registry's clients"""
+        db_service = registry.dynamodb_service('CardTemplates', 'EmployeeFaces', 'AuthSessions')
+        ocr_service = registry.ocr_service('CardTemplates', 'EmployeeFaces', 'AuthSessions')
+        face_service = registry.face_recognition_service('collection-a')
+
+        assert registry.dynamodb_service('CardTemplates', 'EmployeeFaces', 'AuthSessions') is db_service
+        assert ocr_service.db_service is db_service
+        assert registry.face_recognition_service('collection-a') is face_service
+        assert registry.face_recognition_service('collection-b') is not face_service
+        assert face_service.rekognition is registry.client('rekognition')
+        assert db_service.dynamodb is registry.dynamodb_resource()
+
+    def test_budgeted_clients_cached_per_bucket(self, registry):
+        """Services built for a budget get their own client, shared within a bucket"""
+        face_service = registry.face_recognition_service('collection-a', budget_seconds=4.2)
+
+        assert registry.face_recognition_service('collection-a', budget_seconds=3.9) is face_service
+        assert registry.face_recognition_service('collection-a') is not face_service
+        assert face_service.rekognition is registry.client('rekognition', budget_seconds=3)
+        assert face_service.rekognition is not registry.client('rekognition')
+
+    def test_liveness_clients_share_budget(self, registry):
+        """Every client of a budgeted LivenessService is built for the same bucket"""
+        liveness_service = registry.liveness_service(budget_seconds=5)
+
+        assert liveness_service.rekognition is registry.client('rekognition', budget_seconds=5)
+        assert liveness_service.dynamodb is registry.client('dynamodb', budget_seconds=5)
+        assert liveness_service.s3 is registry.client('s3', budget_seconds=5)
+        assert liveness_service.dynamodb is not registry.client('dynamodb')
+
+    def test_register_injects_fake(self, registry):
+        """Tests can replace a client before services are built"""
+        fake_s3 = Mock()
+        registry.register(('client', 's3', 'ap-northeast-1'), fake_s3)
+
+        processor = registry.thumbnail_processor('face-auth-bucket')
+
+        assert processor.s3_client is fake_s3
+        assert processor.bucket_name == 'face-auth-bucket'
+
+    def test_reset_drops_instances(self, registry):
+        """Reset forces clients to be rebuilt"""
+        first = registry.client('dynamodb')
+        registry.reset()
+
+        with patch('boto3.session.Session') as mock_session:
+            mock_session.return_value.client.return_value = Mock()
+            second = registry.client('dynamodb')
+
+        assert second is not first
+
+
+def test_get_registry_singleton():
+    """get_registry returns one registry per container until reset"""
+    reset_registry()
+    registry = get_registry()
+
+    assert get_registry() is registry
+
+    reset_registry()
+    assert get_registry() is not registry
+    reset_registry()
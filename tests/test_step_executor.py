@@ -0,0 +1,119 @@
+"""
+Unit tests for the concurrent step executor
+
+Tests cover:
+- Independent steps overlapping instead of running back to back
+- Dependency ordering and result passing
+- Cancelling pending steps after the first failure
+- Per-step timings and deadlines
+"""
+
+import pytest
+import threading
+import time
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add lambda directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from shared.step_executor import StepGraph, StepFailedError
+from shared.timeout_manager import DeadlineExceededError
+
+
+class TestStepGraph:
+    """Test cases for StepGraph"""
+
+    def test_independent_steps_overlap(self):
+        """Wall time approaches the longest step, not the sum"""
+        steps = StepGraph()
+        steps.add('ocr', lambda: time.sleep(0.2) or 'employee')
+        steps.add('liveness', lambda: time.sleep(0.2) or 'live')
+
+        started = time.perf_counter()
+        results = steps.run()
+        elapsed = time.perf_counter() - started
+
+        assert results == {'ocr': 'employee', 'liveness': 'live'}
+        assert elapsed < 0.35
+        assert set(steps.timings) == {'ocr', 'liveness'}
+        assert all(duration >= 0.2 for duration in steps.timings.values())
+
+    def test_dependencies_receive_results(self):
+        """A dependent step starts after its dependencies and gets their results"""
+        steps = StepGraph()
+        steps.add('ocr', lambda: 'EMP001')
+        steps.add('liveness', lambda: True)
+        steps.add('index', lambda ocr, liveness: f"{ocr}:{liveness}", depends_on=['ocr', 'liveness'])
+
+        assert steps.run()['index'] == 'EMP001:True'
+
+    def test_failure_cancels_pending_steps(self):
+        """The first failure is raised and steps that have not started are cancelled"""
+        dependent_ran = threading.Event()
+
+        def fail():
+            raise ValueError("OCR failed")
+
+        steps = StepGraph(ThreadPoolExecutor(max_workers=1))
+        steps.add('ocr', fail)
+        steps.add('index', lambda ocr: dependent_ran.set(), depends_on=['ocr'])
+        steps.add('liveness', lambda: dependent_ran.set())
+
+        with pytest.raises(StepFailedError) as exc_info:
+            steps.run()
+
+        assert exc_info.value.step == 'ocr'
+        assert isinstance(exc_info.value.error, ValueError)
+        assert not dependent_ran.is_set()
+
+        with pytest.raises(StepFailedError):
+            steps.result('liveness')
+
+    def test_result_reraises_step_exception(self):
+        """result() raises the step's own exception for the caller's error handling"""
+        def fail():
+            raise KeyError('session')
+
+        steps = StepGraph()
+        steps.add('liveness', fail)
+        steps.start()
+
+        with pytest.raises(KeyError):
+            steps.result('liveness')
+
+    def test_deadline(self):
+        """Steps still running at the deadline raise DeadlineExceededError"""
+        release = threading.Event()
+        steps = StepGraph()
+        steps.add('ad', lambda: release.wait(2))
+
+        try:
+            with pytest.raises(DeadlineExceededError):
+                steps.run(timeout_seconds=0.05)
+        finally:
+            release.set()
+
+    def test_result_deadline(self):
+        """Waiting on one step past its timeout raises DeadlineExceededError"""
+        release = threading.Event()
+        steps = StepGraph()
+        steps.add('search', lambda: release.wait(2))
+        steps.start()
+
+        try:
+            with pytest.raises(DeadlineExceededError, match="search"):
+                steps.result('search', timeout_seconds=0.05)
+        finally:
+            release.set()
+
+    def test_invalid_declarations(self):
+        """Duplicate names and unknown dependencies are rejected"""
+        steps = StepGraph()
+        steps.add('ocr', lambda: None)
+
+        with pytest.raises(ValueError):
+            steps.add('ocr', lambda: None)
+        with pytest.raises(ValueError):
+            steps.add('index', lambda ad: None, depends_on=['ad'])
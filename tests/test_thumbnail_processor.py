@@ -15,6 +15,7 @@ import pytest
 import boto3
 from moto import mock_aws
 from PIL import Image
+from PIL.JpegImagePlugin import JpegImageFile
 from io import BytesIO
 import os
 from datetime import datetime
@@ -24,8 +25,9 @@ import sys
 import os
 import importlib.util
 
-# Add project root to path
+# Add project root and shared modules to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared'))
 
 # Import the thumbnail processor module using importlib
 spec = importlib.util.spec_from_file_location(
@@ -419,6 +421,34 @@ class TestThumbnailProcessorEdgeCases:
         with Image.open(BytesIO(thumbnail_bytes)) as img:
             assert img.size == (200, 200)
     
+    def test_large_jpeg_uses_draft_decoding(self, thumbnail_processor):
+        """Test large JPEGs are decoded at a reduced scale"""
+        img = Image.new('L', (1600, 1200), color=128)
+        output = BytesIO()
+        img.save(output, format='JPEG')
+        large_image_bytes = output.getvalue()
+
+        with patch.object(JpegImageFile, 'draft', autospec=True, side_effect=JpegImageFile.draft) as mock_draft:
+            thumbnail_bytes = thumbnail_processor.create_thumbnail(large_image_bytes)
+
+        assert mock_draft.call_args_list[0][0][1:] == ('RGB', (200, 200))
+        with Image.open(BytesIO(thumbnail_bytes)) as img:
+            assert img.size == (200, 200)
+            assert img.mode == 'RGB'
+
+    def test_png_skips_draft_decoding(self, thumbnail_processor):
+        """Test non-JPEG images are decoded normally"""
+        img = Image.new('RGB', (800, 600), color='green')
+        output = BytesIO()
+        img.save(output, format='PNG')
+
+        with patch.object(JpegImageFile, 'draft', autospec=True) as mock_draft:
+            thumbnail_bytes = thumbnail_processor.create_thumbnail(output.getvalue())
+
+        mock_draft.assert_not_called()
+        with Image.open(BytesIO(thumbnail_bytes)) as img:
+            assert img.size == (200, 200)
+
     def test_corrupted_image_data(self, thumbnail_processor):
         """Test processing corrupted image data"""
         # Create partially corrupted JPEG data
@@ -14,13 +14,18 @@ Requirements: 4.2, 4.3
 
 import pytest
 import time
+import concurrent.futures
 import sys
 import os
 
 # Add lambda directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'lambda'))
 
-from shared.timeout_manager import TimeoutManager
+from unittest.mock import Mock
+
+from botocore.exceptions import ReadTimeoutError
+
+from shared.timeout_manager import DeadlineExceededError, TimeoutManager, is_timeout_error
 
 
 class TestTimeoutManager:
@@ -392,3 +397,56 @@ class TestTimeoutManager:
         assert manager.check_lambda_timeout() is True
         
         # This allows for graceful shutdown before hard timeout
+
+
+class TestDeadlinePropagation:
+    """Test suite for Lambda-context deadlines and phase budgets"""
+    
+    def test_deadline_from_lambda_context(self):
+        """The deadline follows the context's remaining time"""
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 6000
+        
+        manager = TimeoutManager.from_lambda_context(context)
+        
+        assert 5.9 < manager.get_remaining_time() <= 6.0
+        assert manager.should_continue(buffer_seconds=7.0) is False
+    
+    def test_deadline_capped_at_api_gateway_limit(self):
+        """A long Lambda timeout is capped at the API Gateway limit"""
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 900000
+        
+        manager = TimeoutManager.from_lambda_context(context)
+        
+        assert manager.get_remaining_time() <= TimeoutManager.API_GATEWAY_TIMEOUT
+    
+    def test_context_without_remaining_time(self):
+        """Contexts without a usable remaining time fall back to LAMBDA_TIMEOUT"""
+        manager = TimeoutManager.from_lambda_context(Mock())
+        
+        assert manager.lambda_timeout == TimeoutManager.LAMBDA_TIMEOUT
+    
+    def test_phase_budgets(self):
+        """Budgets are capped per phase and by the remaining time minus the reserve"""
+        manager = TimeoutManager(lambda_timeout=6.0)
+        
+        assert manager.budget('session') == pytest.approx(4.0)
+        assert manager.budget('ocr') == pytest.approx(5.0, abs=0.05)
+        assert manager.budget('unknown') == pytest.approx(5.0, abs=0.05)
+    
+    def test_require_budget_fails_fast(self):
+        """A phase without enough time left raises DeadlineExceededError"""
+        manager = TimeoutManager(start_time=time.time() - 14.8)
+        
+        assert manager.budget('search') == 0.0
+        with pytest.raises(DeadlineExceededError, match="search"):
+            manager.require_budget('search')
+    
+    def test_is_timeout_error(self):
+        """Deadline, socket and botocore timeouts are recognized"""
+        assert is_timeout_error(DeadlineExceededError("no time"))
+        assert is_timeout_error(TimeoutError())
+        assert is_timeout_error(concurrent.futures.TimeoutError())
+        assert is_timeout_error(ReadTimeoutError(endpoint_url='https://rekognition'))
+        assert not is_timeout_error(ValueError("bad image"))